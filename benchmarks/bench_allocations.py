@@ -0,0 +1,64 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+from funlib.geometry import Coordinate, Roi
+
+from sub_volume import WrappingBuffer
+
+from .synthetic import BACKENDS, BUFFER_SHAPE_IN_CHUNKS, CHUNK_SHAPE
+
+# the same 2x2x2 chunk block as test_load_into_buffer
+BUFFER_ROI_IN_CHUNKS = Roi((1, 1, 1), (2, 2, 2))
+LOGICAL_ROI_IN_CHUNKS = Roi((3, 3, 3), (2, 2, 2))
+
+# uint8 data is uploaded as is, while int16 data has to be converted to float32 on the way into the texture
+DTYPES = {"uint8": np.uint8, "int16": np.int16}
+
+
+def load_staged(buffer: WrappingBuffer):
+    # how chunks were loaded before they were read straight into the textures, and how they still are with a
+    # chunk cache: read into new arrays, convert, then copy into the textures
+    buffer.write_into_buffer(
+        BUFFER_ROI_IN_CHUNKS, buffer.read_logical_roi(LOGICAL_ROI_IN_CHUNKS)
+    )
+
+
+def load_direct(buffer: WrappingBuffer):
+    buffer.load_into_buffer(BUFFER_ROI_IN_CHUNKS, LOGICAL_ROI_IN_CHUNKS)
+
+
+LOADS = {"staged": load_staged, "direct": load_direct}
+
+
+def peak_allocated_bytes(load, buffer: WrappingBuffer) -> int:
+    """Measure the most memory that was allocated at once during a load."""
+    # tracemalloc sees everything numpy allocates, but not the internal buffers of zarr's codecs or TensorStore
+    tracemalloc.start()
+    try:
+        load(buffer)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("load", list(LOADS))
+@pytest.mark.parametrize("dtype", list(DTYPES))
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_load_allocations(benchmark, record_property, data, backend, dtype, load):
+    to_backend = BACKENDS[backend]
+    backing_data, segmentations = data
+    buffer = WrappingBuffer(
+        to_backend(backing_data.astype(DTYPES[dtype])),
+        to_backend(segmentations),
+        Coordinate(BUFFER_SHAPE_IN_CHUNKS),
+        Coordinate(CHUNK_SHAPE),
+    )
+    load = LOADS[load]
+    # once to warm up any caches of the backend, so that only the load itself is measured
+    load(buffer)
+    peak = peak_allocated_bytes(load, buffer)
+    # saved with the benchmark, and listed at the end of the run by conftest.py
+    benchmark.extra_info["peak_allocated_bytes"] = peak
+    record_property("peak_allocated_bytes", peak)
+    benchmark(load, buffer)
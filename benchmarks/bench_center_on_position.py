@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from .synthetic import DATA_SHAPE
+
+FRAMES = 60
+
+
+def camera_path(kind: str) -> np.ndarray:
+    """Get the world positions a camera moves through over FRAMES frames."""
+    center = np.array(DATA_SHAPE[::-1], dtype=np.float64) / 2
+    t = np.linspace(0, 1, FRAMES)[:, np.newaxis]
+    if kind == "idle":
+        return np.repeat(center[np.newaxis], FRAMES, axis=0)
+    if kind == "jitter":
+        # small moves that stay within a chunk, like a hand on a trackpad
+        rng = np.random.default_rng(0)
+        return center + rng.uniform(-2, 2, (FRAMES, 3))
+    if kind == "pan":
+        return center + (t - 0.5) * np.array([48.0, 0.0, 0.0])
+    if kind == "diagonal":
+        return center + (t - 0.5) * np.array([32.0, 32.0, 32.0])
+    if kind == "orbit":
+        angle = 2 * np.pi * t[:, 0]
+        return center + 24 * np.stack(
+            [np.cos(angle), np.sin(angle), np.zeros_like(angle)], axis=1
+        )
+    raise ValueError(f"unknown camera path {kind!r}")
+
+
+@pytest.mark.parametrize("kind", ["idle", "jitter", "pan", "diagonal", "orbit"])
+def test_center_on_position(benchmark, make_volume, kind):
+    path = camera_path(kind)
+
+    def setup():
+        volume = make_volume()
+        volume.center_on_position(tuple(path[0]))
+        return (volume,), {}
+
+    def follow_path(volume):
+        for position in path:
+            volume.center_on_position(tuple(position))
+            volume.commit_uniforms()
+
+    benchmark.pedantic(follow_path, setup=setup, rounds=10)
@@ -0,0 +1,38 @@
+import pytest
+from funlib.geometry import Coordinate, Roi
+
+# noinspection PyProtectedMember
+from sub_volume._wrapping_buffer import chunk_coordinates, subtract_rois
+
+from .synthetic import BUFFER_SHAPE_IN_CHUNKS
+
+CURRENT_ROI = Roi((10, 10, 10), (6, 6, 6))
+
+# the kinds of moves the camera makes from one frame to the next, in chunks
+SUBTRACT_CASES = {
+    "same": CURRENT_ROI,
+    "one_axis": CURRENT_ROI + Coordinate(1, 0, 0),
+    "diagonal": CURRENT_ROI + Coordinate(1, -1, 1),
+    "disjoint": CURRENT_ROI + Coordinate(20, 0, 0),
+}
+
+WRAP_CASES = {
+    "aligned": Roi((0, 0, 0), BUFFER_SHAPE_IN_CHUNKS),
+    "one_axis": Roi((3, 0, 0), BUFFER_SHAPE_IN_CHUNKS),
+    "all_axes": Roi((3, 4, 5), BUFFER_SHAPE_IN_CHUNKS),
+}
+
+
+@pytest.mark.parametrize("case", list(SUBTRACT_CASES))
+def test_subtract_rois(benchmark, case):
+    benchmark(subtract_rois, SUBTRACT_CASES[case], CURRENT_ROI)
+
+
+@pytest.mark.parametrize("case", list(WRAP_CASES))
+def test_wrap_logical_roi_into_buffer_rois(benchmark, make_buffer, case):
+    buffer = make_buffer()
+    benchmark(buffer.wrap_logical_roi_into_buffer_rois, WRAP_CASES[case])
+
+
+def test_chunk_coordinates(benchmark):
+    benchmark(chunk_coordinates, Roi((0, 0, 0), (32, 32, 32)))
@@ -0,0 +1,62 @@
+import pytest
+from funlib.geometry import Coordinate, Roi
+
+from .synthetic import BUFFER_SHAPE_IN_CHUNKS, CHUNK_SHAPE
+
+# one chunk smaller than the buffer, like center_on_position requests, so that moves never overflow the buffer
+START_ROI = Roi(
+    (32, 32, 32),
+    (Coordinate(BUFFER_SHAPE_IN_CHUNKS) - Coordinate(1, 1, 1))
+    * Coordinate(CHUNK_SHAPE),
+)
+
+# moves of one chunk, given in C/numpy style (x, y, z) like the rois
+DIRECTIONS = {
+    "+x": (1, 0, 0),
+    "-x": (-1, 0, 0),
+    "+y": (0, 1, 0),
+    "-y": (0, -1, 0),
+    "+z": (0, 0, 1),
+    "-z": (0, 0, -1),
+    "diagonal": (1, 1, 1),
+}
+
+
+@pytest.mark.parametrize("direction", list(DIRECTIONS))
+def test_load_logical_roi(benchmark, make_buffer, direction):
+    moved_roi = START_ROI + Coordinate(DIRECTIONS[direction]) * Coordinate(CHUNK_SHAPE)
+
+    def setup():
+        buffer = make_buffer()
+        buffer.load_logical_roi(START_ROI)
+        return (buffer,), {}
+
+    benchmark.pedantic(
+        lambda buffer: buffer.load_logical_roi(moved_roi),
+        setup=setup,
+        rounds=20,
+    )
+
+
+def test_request_logical_roi_with_pending_chunks(benchmark, make_buffer):
+    # moving before the chunks of the last request arrived, which filters every pending chunk
+    moved_roi = START_ROI + Coordinate(CHUNK_SHAPE)
+
+    def setup():
+        buffer = make_buffer()
+        buffer.request_logical_roi(START_ROI)
+        return (buffer,), {}
+
+    benchmark.pedantic(
+        lambda buffer: buffer.request_logical_roi(moved_roi),
+        setup=setup,
+        rounds=50,
+    )
+
+
+def test_load_into_buffer(benchmark, make_buffer, backend_data):
+    # a 2x2x2 chunk block that lands in the middle of the buffer
+    buffer = make_buffer(*backend_data)
+    benchmark(
+        buffer.load_into_buffer, Roi((1, 1, 1), (2, 2, 2)), Roi((3, 3, 3), (2, 2, 2))
+    )
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from funlib.geometry import Coordinate
+
+from sub_volume import SubVolume, SubVolumeMaterial, WrappingBuffer
+
+from .synthetic import BACKENDS, BUFFER_SHAPE_IN_CHUNKS, CHUNK_SHAPE, make_data
+
+
+@pytest.fixture(scope="session")
+def data() -> tuple[np.ndarray, np.ndarray]:
+    return make_data()
+
+
+@pytest.fixture(scope="session", params=list(BACKENDS))
+def backend_data(request, data):
+    to_backend = BACKENDS[request.param]
+    return tuple(to_backend(array) for array in data)
+
+
+@pytest.fixture
+def make_buffer(data):
+    def make_buffer(backing_data=None, segmentations=None) -> WrappingBuffer:
+        if backing_data is None:
+            backing_data, segmentations = data
+        return WrappingBuffer(
+            backing_data,
+            segmentations,
+            Coordinate(BUFFER_SHAPE_IN_CHUNKS),
+            Coordinate(CHUNK_SHAPE),
+        )
+
+    return make_buffer
+
+
+@pytest.fixture
+def make_volume(data):
+    def make_volume() -> SubVolume:
+        pairs = [data, tuple(array[::2, ::2, ::2] for array in data)]
+        return SubVolume(
+            SubVolumeMaterial(0.5),
+            pairs,
+            [BUFFER_SHAPE_IN_CHUNKS] * len(pairs),
+            [CHUNK_SHAPE] * len(pairs),
+        )
+
+    return make_volume
+
+
+def pytest_terminal_summary(terminalreporter):
+    # pytest-benchmark only tabulates timings, so list the allocations recorded by bench_allocations.py separately
+    reports = [
+        (report.nodeid.split("::")[-1], dict(report.user_properties))
+        for report in terminalreporter.stats.get("passed", [])
+        if report.when == "call"
+    ]
+    reports = [
+        (name, properties["peak_allocated_bytes"])
+        for name, properties in reports
+        if "peak_allocated_bytes" in properties
+    ]
+    if reports:
+        terminalreporter.section("peak allocated bytes")
+        for name, peak in reports:
+            terminalreporter.write_line(f"{name:<60} {peak:>12,}")
@@ -0,0 +1,50 @@
+import numpy as np
+import tensorstore as ts
+import zarr
+
+# the benchmarks use small synthetic volumes so that a full run takes well under a minute, but the chunk and buffer
+# shapes are large enough that the per-chunk python overhead shows up like it does on real data.
+DATA_SHAPE = (128, 128, 128)
+CHUNK_SHAPE = (16, 16, 16)
+BUFFER_SHAPE_IN_CHUNKS = (6, 6, 6)
+
+
+def make_data() -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 256, DATA_SHAPE, dtype=np.uint8)
+    # a handful of labels per chunk, so that label compaction has some work to do
+    segmentations = (np.arange(np.prod(DATA_SHAPE)) % 7).astype(np.uint32)
+    return data, segmentations.reshape(DATA_SHAPE)
+
+
+def to_zarr(array: np.ndarray) -> zarr.Array:
+    store = zarr.create_array(
+        zarr.storage.MemoryStore(),
+        shape=array.shape,
+        chunks=CHUNK_SHAPE,
+        dtype=array.dtype,
+    )
+    store[...] = array
+    return store
+
+
+def to_tensorstore(array: np.ndarray) -> ts.TensorStore:
+    store = ts.open(
+        {
+            "driver": "zarr",
+            "kvstore": {"driver": "memory"},
+            "metadata": {"chunks": list(CHUNK_SHAPE)},
+        },
+        create=True,
+        dtype=array.dtype,
+        shape=array.shape,
+    ).result()
+    store[...].write(array).result()
+    return store
+
+
+BACKENDS = {
+    "numpy": lambda array: array,
+    "zarr": to_zarr,
+    "tensorstore": to_tensorstore,
+}
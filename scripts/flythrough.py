@@ -0,0 +1,341 @@
+"""
+Replay a camera trajectory against SubVolume.center_on_position without a window and report the loading cost.
+
+The trajectory is either generated (see CAMERA_PATHS) or read from a JSON file of world positions, like one
+written with --save-path. By default nothing is rendered, so texture uploads are scheduled but never submitted and
+no GPU is needed. With --render, every frame is also rendered to an offscreen canvas, which works with a software
+adapter (see --adapter).
+
+Example:
+    python scripts/flythrough.py --path orbit --frames 300 --loader-workers 4 --output report.json
+"""
+
+import argparse
+import json
+import platform
+import time
+from pathlib import Path
+
+import numpy as np
+import pygfx as gfx
+import wgpu
+
+from sub_volume import FrameLoadStats, SubVolume, SubVolumeMaterial
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def synthetic_scales(shape, num_scales, seed=0):
+    """Create uint8 data with some structure at every scale, and downsample it by 2 for each coarser scale."""
+    rng = np.random.default_rng(seed)
+    # blobs of constant intensity, so that empty space skipping and compression have something to work with
+    blocks = rng.integers(0, 256, tuple(-(-s // 8) for s in shape), dtype=np.uint8)
+    data = np.repeat(np.repeat(np.repeat(blocks, 8, 0), 8, 1), 8, 2)
+    data = data[: shape[0], : shape[1], : shape[2]]
+    data = np.ascontiguousarray(data // 2 + rng.integers(0, 128, shape, dtype=np.uint8))
+    return [
+        np.ascontiguousarray(data[:: 2**i, :: 2**i, :: 2**i]) for i in range(num_scales)
+    ]
+
+
+def open_scales(paths, use_tensorstore):
+    """Open one zarr array per scale, highest resolution first."""
+    if use_tensorstore:
+        import tensorstore as ts
+
+        return [
+            ts.open(
+                {
+                    "driver": "zarr3"
+                    if (Path(path) / "zarr.json").exists()
+                    else "zarr",
+                    "kvstore": {"driver": "file", "path": str(path)},
+                }
+            ).result()
+            for path in paths
+        ]
+
+    import zarr
+
+    return [zarr.open_array(path, mode="r") for path in paths]
+
+
+def camera_path(kind, frames, volume_shape, speed, seed=0):
+    """
+    Generate world positions for a camera moving through a volume of the given (x, y, z) numpy shape.
+
+    speed is in pixels of the highest resolution per frame.
+    """
+    # world positions are in (z, y, x) order, the reverse of the numpy shape
+    extent = np.array(volume_shape[::-1], dtype=np.float64)
+    center = extent / 2
+    steps = np.arange(frames, dtype=np.float64)[:, np.newaxis]
+    if kind == "pan":
+        # along the first world axis, through the center
+        direction = np.array([1.0, 0.0, 0.0])
+        start = center - direction * speed * frames / 2
+        return start + steps * speed * direction
+    if kind == "dolly":
+        # along the diagonal, through the center
+        direction = np.ones(3) / np.sqrt(3)
+        start = center - direction * speed * frames / 2
+        return start + steps * speed * direction
+    if kind == "orbit":
+        # a circle around the center, in the plane of the first two world axes
+        radius = min(extent[:2]) / 4
+        angles = steps[:, 0] * speed / radius
+        return center + np.stack(
+            [radius * np.cos(angles), radius * np.sin(angles), np.zeros(frames)],
+            axis=1,
+        )
+    if kind == "random_walk":
+        # a random walk with some momentum, kept inside the volume
+        rng = np.random.default_rng(seed)
+        positions = np.empty((frames, 3))
+        position = center.copy()
+        velocity = np.zeros(3)
+        for i in range(frames):
+            velocity = 0.9 * velocity + 0.1 * rng.normal(size=3)
+            velocity *= speed / max(np.linalg.norm(velocity), 1e-9)
+            position = np.clip(position + velocity, 0, extent)
+            positions[i] = position
+        return positions
+    raise ValueError(f"unknown camera path {kind!r}")
+
+
+CAMERA_PATHS = ("pan", "dolly", "orbit", "random_walk")
+
+
+def summarize(values):
+    """Summarize per-frame values with their mean, max, and PERCENTILES."""
+    values = np.asarray(values, dtype=np.float64)
+    summary = {"mean": float(values.mean()), "max": float(values.max())}
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}"] = float(np.percentile(values, percentile))
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    data = parser.add_argument_group("data")
+    data.add_argument(
+        "--data",
+        nargs="+",
+        type=Path,
+        help="zarr arrays to load, one per scale, highest resolution first. Defaults to synthetic data.",
+    )
+    data.add_argument(
+        "--tensorstore",
+        action="store_true",
+        help="open --data with TensorStore instead of zarr",
+    )
+    data.add_argument(
+        "--shape",
+        nargs=3,
+        type=int,
+        default=(512, 512, 512),
+        help="shape of the synthetic data",
+    )
+    data.add_argument(
+        "--scales", type=int, default=3, help="number of synthetic scales"
+    )
+
+    config = parser.add_argument_group("sub volume")
+    config.add_argument("--chunk-shape", nargs=3, type=int, default=(32, 32, 32))
+    config.add_argument(
+        "--buffer-shape-in-chunks", nargs=3, type=int, default=(8, 8, 8)
+    )
+    config.add_argument("--loader-workers", type=int)
+    config.add_argument("--chunk-cache-size-in-bytes", type=int)
+    config.add_argument("--prefetch-horizon-in-seconds", type=float)
+    config.add_argument("--max-upload-bytes-per-frame", type=int)
+    config.add_argument("--max-upload-milliseconds-per-frame", type=float)
+
+    path = parser.add_argument_group("camera path")
+    path.add_argument(
+        "--path",
+        default="orbit",
+        help=f"one of {', '.join(CAMERA_PATHS)}, or a JSON file of world positions",
+    )
+    path.add_argument("--frames", type=int, default=300)
+    path.add_argument(
+        "--speed",
+        type=float,
+        default=4.0,
+        help="pixels of the highest resolution the camera moves per frame",
+    )
+    path.add_argument(
+        "--fps",
+        type=float,
+        help="replay at this frame rate, which gives background loading time between frames. "
+        "Defaults to replaying as fast as possible.",
+    )
+    path.add_argument(
+        "--save-path", type=Path, help="write the camera path to this JSON file"
+    )
+
+    output = parser.add_argument_group("output")
+    output.add_argument(
+        "--render",
+        action="store_true",
+        help="also render every frame to an offscreen canvas",
+    )
+    output.add_argument(
+        "--adapter",
+        help="with --render, use the first GPU adapter whose summary contains this, e.g. llvmpipe",
+    )
+    output.add_argument("--size", nargs=2, type=int, default=(480, 480))
+    output.add_argument(
+        "--output", type=Path, help="write the JSON report here instead of stdout"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.data:
+        scales = open_scales(args.data, args.tensorstore)
+    else:
+        scales = synthetic_scales(tuple(args.shape), args.scales)
+
+    volume = SubVolume(
+        SubVolumeMaterial(lmip_threshold=0.5),
+        scales,
+        [tuple(args.buffer_shape_in_chunks)] * len(scales),
+        [tuple(args.chunk_shape)] * len(scales),
+        loader_workers=args.loader_workers,
+        chunk_cache_size_in_bytes=args.chunk_cache_size_in_bytes,
+        prefetch_horizon_in_seconds=args.prefetch_horizon_in_seconds,
+        max_upload_bytes_per_frame=args.max_upload_bytes_per_frame,
+        max_upload_milliseconds_per_frame=args.max_upload_milliseconds_per_frame,
+    )
+    frames: list[FrameLoadStats] = []
+    volume.load_stats_callback = frames.append
+
+    if args.path in CAMERA_PATHS:
+        positions = camera_path(args.path, args.frames, scales[0].shape, args.speed)
+    else:
+        positions = np.array(json.loads(Path(args.path).read_text())["positions"])
+    if args.save_path is not None:
+        args.save_path.write_text(json.dumps({"positions": positions.tolist()}))
+
+    adapter = None
+    if args.render:
+        from rendercanvas.offscreen import RenderCanvas
+
+        if args.adapter is not None:
+            adapters = [
+                a
+                for a in wgpu.gpu.enumerate_adapters_sync()
+                if args.adapter.lower() in a.summary.lower()
+            ]
+            if not adapters:
+                raise ValueError(f"no adapter matches {args.adapter!r}")
+            selected_adapter = adapters[0]
+        else:
+            selected_adapter = wgpu.gpu.request_adapter_sync(
+                power_preference="high-performance"
+            )
+        gfx.renderers.wgpu.select_adapter(selected_adapter)
+        # software adapters usually can't filter float32 textures, which pygfx asks for by default. we only need
+        # it for float32 data anyway.
+        if "float32-filterable" not in selected_adapter.features:
+            gfx.renderers.wgpu.enable_wgpu_features("!float32-filterable")
+        canvas = RenderCanvas(size=tuple(args.size))
+        renderer = gfx.renderers.WgpuRenderer(canvas)
+        adapter = selected_adapter.summary
+        camera = gfx.PerspectiveCamera(fov=45)
+        scene = gfx.Scene()
+        scene.add(volume)
+        canvas.request_draw(lambda: renderer.render(scene, camera))
+        volume.prewarm_pipeline(renderer)
+
+    render_times_in_seconds = []
+    started_at = time.perf_counter()
+    for i, position in enumerate(positions):
+        if args.fps is not None:
+            # wait for this frame's slot, so that background reads get the time they would get in a viewer
+            time.sleep(max(0.0, started_at + i / args.fps - time.perf_counter()))
+        volume.center_on_position(tuple(position))
+        if args.render:
+            camera.world.position = position
+            # look where we are heading
+            heading = positions[min(i + 1, len(positions) - 1)] - position
+            if np.linalg.norm(heading) > 0:
+                camera.look_at(tuple(position + heading))
+            render_started_at = time.perf_counter()
+            canvas.draw()
+            render_times_in_seconds.append(time.perf_counter() - render_started_at)
+    elapsed_in_seconds = time.perf_counter() - started_at
+
+    # the first frame loads the whole starting view, which would skew the percentiles of the moving ones
+    moving = frames[1:] or frames
+    report = {
+        "config": {
+            "data": [str(path) for path in args.data]
+            if args.data
+            else f"synthetic {tuple(args.shape)}",
+            "data_shapes": [list(scale.shape) for scale in scales],
+            "chunk_shape": list(args.chunk_shape),
+            "buffer_shape_in_chunks": list(args.buffer_shape_in_chunks),
+            "loader_workers": args.loader_workers,
+            "chunk_cache_size_in_bytes": args.chunk_cache_size_in_bytes,
+            "prefetch_horizon_in_seconds": args.prefetch_horizon_in_seconds,
+            "max_upload_bytes_per_frame": args.max_upload_bytes_per_frame,
+            "max_upload_milliseconds_per_frame": args.max_upload_milliseconds_per_frame,
+            "path": args.path,
+            "frames": len(positions),
+            "speed": args.speed,
+            "fps": args.fps,
+            "render": args.render,
+        },
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "processor": platform.processor(),
+            "adapter": adapter,
+        },
+        "elapsed_in_seconds": elapsed_in_seconds,
+        "first_frame_in_milliseconds": frames[0].center_on_position_time_in_seconds
+        * 1000,
+        "center_on_position_in_milliseconds": summarize(
+            [frame.center_on_position_time_in_seconds * 1000 for frame in moving]
+        ),
+        "render_in_milliseconds": summarize(
+            [seconds * 1000 for seconds in render_times_in_seconds[1:]]
+        )
+        if len(render_times_in_seconds) > 1
+        else None,
+        "bytes_uploaded_per_frame": summarize(
+            [frame.total.bytes_uploaded for frame in moving]
+        ),
+        "backlog_in_chunks": summarize([frame.backlog_in_chunks for frame in moving]),
+        "totals": {
+            field: sum(getattr(frame.total, field) for frame in frames)
+            for field in frames[0].total.FIELDS
+        },
+        "per_frame": [
+            {
+                "center_on_position_in_milliseconds": frame.center_on_position_time_in_seconds
+                * 1000,
+                "backlog_in_chunks": frame.backlog_in_chunks,
+                "scales": [scale.as_dict() for scale in frame.scales],
+            }
+            for frame in frames
+        ],
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+    volume.close(wait=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,22 @@ This package provides volume rendering with multi-scale data support using
 large datasets.
 """
 
+from ._chunk_cache import ChunkCache
+from ._chunk_source import (
+    ArraySource,
+    ChunkSource,
+    MemmapSource,
+    ProceduralSource,
+    SourceRead,
+    TensorStoreSource,
+    ZarrSource,
+    as_chunk_source,
+)
+from ._interactive_quality import InteractiveQuality
+from ._label_table import LabelTable
+from ._load_stats import FrameLoadStats, ScaleLoadStats
 from ._material import SubVolumeMaterial
+from ._render_on_demand import RenderOnDemand
 from ._wobject import SubVolume
 from ._wrapping_buffer import WrappingBuffer
 
@@ -15,7 +30,21 @@ from ._wrapping_buffer import WrappingBuffer
 from ._shader import SubVolumeShader  # noqa: F401 # isort: skip
 
 __all__ = [
+    "ArraySource",
+    "ChunkCache",
+    "ChunkSource",
+    "FrameLoadStats",
+    "InteractiveQuality",
+    "LabelTable",
+    "MemmapSource",
+    "ProceduralSource",
+    "RenderOnDemand",
+    "ScaleLoadStats",
+    "SourceRead",
     "SubVolume",
     "SubVolumeMaterial",
+    "TensorStoreSource",
     "WrappingBuffer",
+    "ZarrSource",
+    "as_chunk_source",
 ]
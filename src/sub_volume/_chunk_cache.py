@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+from threading import Lock
+
+import numpy as np
+import numpy.typing as npt
+
+
+class ChunkCache:
+    """
+    A host-side LRU cache of decoded chunks with a hard byte budget.
+
+    Entries are keyed by (scale index, chunk coordinate) and hold the chunk's intensity and segmentation data
+    already converted to the texture dtypes (or None for levels without segmentations), so a cache hit only costs a
+    copy into the texture. A single cache is shared by all WrappingBuffers of a SubVolume, and it is safe to use
+    from background loader threads.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes (int):
+                The maximum number of bytes the cached arrays may take up in total.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        if max_bytes < 0:
+            raise ValueError(f"max_bytes must be non-negative, not {max_bytes}")
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # least recently used entries are at the front
+        self._entries: OrderedDict[Hashable, tuple[npt.NDArray | None, ...]] = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> tuple[npt.NDArray | None, ...] | None:
+        """
+        Look up a chunk and mark it as recently used.
+
+        Args:
+            key (Hashable):
+                The (scale index, chunk coordinate) key of the chunk.
+
+        Returns:
+            The cached arrays for the chunk, or None if the chunk is not cached.
+
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: tuple[npt.NDArray | None, ...]):
+        """
+        Add a chunk to the cache, evicting the least recently used chunks until it fits in the byte budget.
+
+        Chunks that are larger than the whole budget are not cached. Arrays that are views of other numpy arrays
+        (e.g. reads from numpy or memmap sources) are copied first, so the cache holds its own decoded chunks and
+        its byte budget reflects the host memory it actually uses. The cached arrays are marked read-only since
+        they are shared with every future reader of the chunk.
+
+        Args:
+            key (Hashable):
+                The (scale index, chunk coordinate) key of the chunk.
+            value (tuple[npt.NDArray or None, ...]):
+                The arrays to cache for the chunk. None entries are kept as is and take up no space.
+
+        """
+        value_nbytes = _nbytes(value)
+        if value_nbytes > self.max_bytes:
+            return
+        value = tuple(_own(array) for array in value)
+        for array in value:
+            if array is not None:
+                array.flags.writeable = False
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= _nbytes(previous)
+            self._entries[key] = value
+            self.nbytes += value_nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= _nbytes(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every chunk from the cache. The hit/miss/eviction counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+def _own(array: npt.NDArray | None) -> npt.NDArray | None:
+    # views keep their base array alive (and share its writeable flag), so we copy them. other arrays that don't
+    # own their memory, like TensorStore reads, already hold a buffer of their own.
+    if isinstance(array, np.ndarray) and isinstance(array.base, np.ndarray):
+        return array.copy()
+    return array
+
+
+def _nbytes(value: tuple[npt.NDArray | None, ...]) -> int:
+    return sum(array.nbytes for array in value if array is not None)
@@ -0,0 +1,344 @@
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import tensorstore as ts
+import zarr
+from funlib.geometry import Roi
+from zarr.core.buffer.cpu import NDBuffer
+
+from ._roi_array import roi_to_slices
+
+
+class SourceRead:
+    """
+    A read from a ChunkSource that might still be in progress.
+
+    This has the same done/result interface as a concurrent.futures.Future, so reads from every source are waited
+    on the same way.
+    """
+
+    def __init__(
+        self,
+        value: npt.NDArray | ts.Future | None,
+        out: npt.NDArray | None = None,
+    ):
+        """
+        Args:
+            value (npt.NDArray or ts.Future or None):
+                The data that was read, or a TensorStore future for it.
+            out (npt.NDArray, optional):
+                The array the data is being read into. If provided, this is the result.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self._value = value
+        self._out = out
+
+    def done(self) -> bool:
+        """Whether result can be called without blocking."""
+        return not isinstance(self._value, ts.Future) or self._value.done()
+
+    def result(self) -> npt.NDArray:
+        """Wait for the read to finish and return the data."""
+        value = (
+            self._value.result() if isinstance(self._value, ts.Future) else self._value
+        )
+        return self._out if self._out is not None else value
+
+
+class ChunkSource(ABC):
+    """
+    Where a WrappingBuffer reads the chunks of its data or segmentations from.
+
+    A source knows its shape, dtype, and native chunk grid, and reads Rois in pixels (in numpy/C style (x, y, z)
+    order, within the bounds of the source) either into a new array or into an array the caller provides. Sources
+    that can read in the background return from start_read right away and set reads_concurrently, so the loader can
+    issue many reads before waiting on any of them. Subclasses implement shape, dtype, and start_read.
+
+    WrappingBuffer and SubVolume accept numpy, zarr, and TensorStore arrays as is and wrap them with
+    as_chunk_source. Pass a source explicitly for anything else, e.g. a ProceduralSource.
+    """
+
+    #: whether start_read returns before the data has been read
+    reads_concurrently: bool = False
+
+    @property
+    @abstractmethod
+    def shape(self) -> tuple[int, ...]:
+        """The shape of the data in pixels."""
+
+    @property
+    @abstractmethod
+    def dtype(self) -> np.dtype:
+        """The dtype the data is stored in."""
+
+    @property
+    def ndim(self) -> int:
+        """The number of dimensions of the data."""
+        return len(self.shape)
+
+    @property
+    def chunk_shape(self) -> tuple[int, ...] | None:
+        """The shape of the chunks the data is stored in, or None if it isn't chunked."""
+        return None
+
+    @abstractmethod
+    def start_read(
+        self, roi_in_pixels: Roi, out: npt.NDArray | None = None
+    ) -> SourceRead:
+        """
+        Start reading a Roi of the data.
+
+        Args:
+            roi_in_pixels (Roi):
+                The Roi to read, within the bounds of the data.
+            out (npt.NDArray, optional):
+                An array with the shape of the Roi to read into. The data is converted to its dtype. If not
+                provided, the result is in the source's dtype and might be a view of the source's memory, so don't
+                write to it.
+
+        Returns:
+            A SourceRead whose result is the data.
+
+        """
+
+    def read(self, roi_in_pixels: Roi, out: npt.NDArray | None = None) -> npt.NDArray:
+        """Read a Roi of the data and wait for it. See start_read."""
+        return self.start_read(roi_in_pixels, out).result()
+
+
+class ArraySource(ChunkSource):
+    """
+    Reads from anything that can be sliced into numpy arrays, like numpy arrays, memmaps, or h5py datasets.
+
+    Slicing a numpy array is free, so reads without an out array return views instead of copies.
+    """
+
+    def __init__(self, array, chunk_shape: tuple[int, ...] | None = None):
+        """
+        Args:
+            array (npt.ArrayLike):
+                The array to read from. Slicing it must return something np.asarray accepts.
+            chunk_shape (tuple[int, ...], optional):
+                The shape of the chunks the array is stored in, if it is chunked.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self.array = array
+        self._chunk_shape = None if chunk_shape is None else tuple(chunk_shape)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return tuple(self.array.shape)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self.array.dtype)
+
+    @property
+    def chunk_shape(self) -> tuple[int, ...] | None:
+        return self._chunk_shape
+
+    def start_read(
+        self, roi_in_pixels: Roi, out: npt.NDArray | None = None
+    ) -> SourceRead:
+        data = np.asarray(self.array[roi_to_slices(roi_in_pixels)])
+        if out is None:
+            return SourceRead(data)
+        np.copyto(out, data, casting="unsafe")
+        return SourceRead(out)
+
+
+class MemmapSource(ArraySource):
+    """Reads from a raw binary file on disk through a read-only numpy memmap, so only the pages we read are loaded."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        dtype: npt.DTypeLike,
+        shape: tuple[int, ...],
+        offset: int = 0,
+        chunk_shape: tuple[int, ...] | None = None,
+    ):
+        """
+        Args:
+            path (str or Path):
+                The file to read from.
+            dtype (npt.DTypeLike):
+                The dtype the data is stored in.
+            shape (tuple[int, ...]):
+                The shape of the data, stored in C order.
+            offset (int, optional):
+                The offset of the data in the file in bytes. Defaults to 0.
+            chunk_shape (tuple[int, ...], optional):
+                The shape of the chunks the data is stored in, if it is chunked.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        super().__init__(
+            np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape),
+            chunk_shape,
+        )
+
+
+class ZarrSource(ChunkSource):
+    """
+    Reads from a zarr array, including sharded zarr v3 arrays.
+
+    Reads into an out array go straight through zarr's decoding into it, without an intermediate array.
+    """
+
+    def __init__(self, array: zarr.Array):
+        """
+        Args:
+            array (zarr.Array):
+                The array to read from.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self.array = array
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return tuple(self.array.shape)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self.array.dtype)
+
+    @property
+    def chunk_shape(self) -> tuple[int, ...]:
+        # for sharded arrays, these are the chunks within a shard, which are the smallest unit zarr can read
+        return tuple(self.array.chunks)
+
+    @property
+    def shard_shape(self) -> tuple[int, ...] | None:
+        """The shape of the shards the chunks are grouped into, or None if the array isn't sharded."""
+        shards = getattr(self.array, "shards", None)
+        return None if shards is None else tuple(shards)
+
+    def start_read(
+        self, roi_in_pixels: Roi, out: npt.NDArray | None = None
+    ) -> SourceRead:
+        slices = roi_to_slices(roi_in_pixels)
+        if out is None:
+            return SourceRead(np.asarray(self.array[slices]))
+        self.array.get_basic_selection(slices, out=NDBuffer.from_numpy_array(out))
+        return SourceRead(out)
+
+
+class TensorStoreSource(ChunkSource):
+    """
+    Reads from a TensorStore in the background.
+
+    Reads are issued as futures, so many chunks (and their segmentations) can wait on storage at the same time.
+    Reads into an out array are written into it by TensorStore, converting the dtype on its own threads.
+    """
+
+    reads_concurrently = True
+
+    def __init__(self, store: ts.TensorStore):
+        """
+        Args:
+            store (ts.TensorStore):
+                The TensorStore to read from. Its domain may have any origin, which is where our Rois start.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self.store = store
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return tuple(self.store.domain.shape)
+
+    @property
+    def dtype(self) -> np.dtype:
+        # tensorstore dtypes wrap a numpy dtype
+        return np.dtype(self.store.dtype.numpy_dtype)
+
+    @property
+    def chunk_shape(self) -> tuple[int, ...] | None:
+        read_chunk_shape = self.store.chunk_layout.read_chunk.shape
+        return None if read_chunk_shape is None else tuple(read_chunk_shape)
+
+    def start_read(
+        self, roi_in_pixels: Roi, out: npt.NDArray | None = None
+    ) -> SourceRead:
+        origin = self.store.domain.origin
+        view = self.store[
+            tuple(
+                slice(o + s.start, o + s.stop)
+                for o, s in zip(origin, roi_to_slices(roi_in_pixels))
+            )
+        ]
+        if out is None:
+            return SourceRead(view.read())
+        if out.dtype != self.dtype:
+            view = ts.cast(view, ts.dtype(out.dtype.name))
+        target = ts.array(out, copy=False, write=True)
+        # the write is done once it is committed to out
+        return SourceRead(target.write(view).commit, out)
+
+
+class ProceduralSource(ChunkSource):
+    """Generates data on the fly instead of reading it, e.g. for synthetic test data or volumes too large to store."""
+
+    def __init__(
+        self,
+        shape: tuple[int, ...],
+        dtype: npt.DTypeLike,
+        function: Callable[[Roi], npt.NDArray],
+        chunk_shape: tuple[int, ...] | None = None,
+    ):
+        """
+        Args:
+            shape (tuple[int, ...]):
+                The shape of the generated data.
+            dtype (npt.DTypeLike):
+                The dtype of the generated data.
+            function (Callable[[Roi], npt.NDArray]):
+                Generates the data of a Roi in pixels. It must return an array with the shape of the Roi, and must
+                be safe to call from background threads if the buffer has an executor.
+            chunk_shape (tuple[int, ...], optional):
+                The chunk shape to report, if the data should be loaded in chunks of a particular shape.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self._shape = tuple(shape)
+        self._dtype = np.dtype(dtype)
+        self.function = function
+        self._chunk_shape = None if chunk_shape is None else tuple(chunk_shape)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self._shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._dtype
+
+    @property
+    def chunk_shape(self) -> tuple[int, ...] | None:
+        return self._chunk_shape
+
+    def start_read(
+        self, roi_in_pixels: Roi, out: npt.NDArray | None = None
+    ) -> SourceRead:
+        data = np.asarray(self.function(roi_in_pixels), dtype=self.dtype)
+        if out is None:
+            return SourceRead(data)
+        np.copyto(out, data, casting="unsafe")
+        return SourceRead(out)
+
+
+def as_chunk_source(array) -> ChunkSource:
+    """Wrap a numpy, zarr, or TensorStore array (or anything else that slices into numpy arrays) in a ChunkSource."""
+    if isinstance(array, ChunkSource):
+        return array
+    if isinstance(array, ts.TensorStore):
+        return TensorStoreSource(array)
+    if isinstance(array, zarr.Array):
+        return ZarrSource(array)
+    # numpy arrays and memmaps aren't chunked, but some other arrays (e.g. h5py datasets) tell us their chunks
+    chunks = getattr(array, "chunks", None)
+    if chunks is not None and not all(isinstance(c, int) for c in chunks):
+        # dask gives the sizes of every chunk along each axis instead
+        chunks = None
+    return ArraySource(array, chunks)
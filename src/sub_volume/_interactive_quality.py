@@ -0,0 +1,136 @@
+import time
+
+import numpy as np
+import pygfx as gfx
+
+from ._material import STEP_SIZE_PRESETS
+from ._wobject import SubVolume
+
+
+class InteractiveQuality:
+    """
+    Lowers the render quality of a SubVolume while the camera moves or chunks are loading.
+
+    While anything changes, the volume is rendered with a coarser step size and the renderer at a lower internal
+    resolution. Once nothing has changed for settle_time_in_seconds, the full quality settings are restored.
+    The full quality settings are captured when interactive quality starts, so change them while the volume
+    is settled.
+    """
+
+    def __init__(
+        self,
+        volume: SubVolume,
+        renderer: gfx.renderers.WgpuRenderer | None = None,
+        settle_time_in_seconds: float = 0.25,
+        interactive_quality: str = "low",
+        interactive_resolution_scale: float = 0.5,
+        automatic_pixel_ratio: bool = True,
+    ):
+        """
+        Args:
+            volume (SubVolume):
+                The volume to render at interactive quality.
+            renderer (gfx.renderers.WgpuRenderer, optional):
+                The renderer to lower the resolution of. If not provided, only the step size is changed.
+            settle_time_in_seconds (float, optional):
+                How long nothing must change before full quality is restored. Defaults to 0.25.
+            interactive_quality (str, optional):
+                The step size preset to use while interactive. See STEP_SIZE_PRESETS. Defaults to "low".
+            interactive_resolution_scale (float, optional):
+                The factor to scale the renderer's pixel ratio by while interactive. Defaults to 0.5.
+            automatic_pixel_ratio (bool, optional):
+                Whether the renderer uses pygfx's automatic pixel ratio (a pixel_ratio of None), which follows the
+                screen. If so, full quality goes back to the automatic pixel ratio. Otherwise, it goes back to the
+                pixel ratio the renderer had when interactive quality started. Defaults to True.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        if interactive_quality not in STEP_SIZE_PRESETS:
+            raise ValueError(
+                f"interactive_quality must be one of {list(STEP_SIZE_PRESETS)}, not {interactive_quality!r}"
+            )
+        if interactive_resolution_scale <= 0:
+            raise ValueError(
+                f"interactive_resolution_scale must be positive, not {interactive_resolution_scale}"
+            )
+        self.volume = volume
+        self.renderer = renderer
+        self.settle_time_in_seconds = settle_time_in_seconds
+        self.interactive_quality = interactive_quality
+        self.interactive_resolution_scale = interactive_resolution_scale
+        self.automatic_pixel_ratio = automatic_pixel_ratio
+
+        self._last_camera_matrix = None
+        self._last_change_time = None
+        # the full quality settings, while we are interactive
+        self._full_quality_settings = None
+
+    @property
+    def interactive(self) -> bool:
+        """Whether the volume is currently rendered at interactive quality."""
+        return self._full_quality_settings is not None
+
+    def update(self, camera: gfx.Camera, timestamp: float | None = None) -> bool:
+        """
+        Switch between interactive and full quality. Call this once per frame, before rendering.
+
+        Args:
+            camera (gfx.Camera):
+                The camera the volume is rendered with.
+            timestamp (float, optional):
+                The current time in seconds. Defaults to time.perf_counter().
+
+        Returns:
+            Whether the volume is rendered at interactive quality. While this is True, keep requesting draws so
+            that full quality is restored once the volume settles.
+
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        # the camera matrix covers the view and the projection, so zooming, changing the fov or resizing the
+        # viewport count as movement too
+        camera_matrix = np.array(camera.camera_matrix)
+        camera_moved = self._last_camera_matrix is not None and not np.array_equal(
+            camera_matrix, self._last_camera_matrix
+        )
+        self._last_camera_matrix = camera_matrix
+
+        if camera_moved or self.volume.has_pending_loads:
+            self._last_change_time = timestamp
+            self._enter_interactive()
+        elif (
+            self.interactive
+            and timestamp - self._last_change_time >= self.settle_time_in_seconds
+        ):
+            self._exit_interactive()
+        return self.interactive
+
+    def _enter_interactive(self):
+        if self.interactive:
+            return
+        material = self.volume.material
+        self._full_quality_settings = (
+            material.step_size,
+            material.quality,
+            self.renderer.pixel_ratio if self.renderer is not None else None,
+        )
+        material.quality = self.interactive_quality
+        if self.renderer is not None:
+            self.renderer.pixel_ratio = (
+                self.renderer.pixel_ratio * self.interactive_resolution_scale
+            )
+
+    def _exit_interactive(self):
+        step_size, quality, pixel_ratio = self._full_quality_settings
+        self._full_quality_settings = None
+        material = self.volume.material
+        if quality is not None:
+            material.quality = quality
+        else:
+            material.step_size = step_size
+        if self.renderer is not None:
+            # pygfx only tells us the pixel ratio it resolved to, so we go back to the automatic one (None) with
+            # its own setting, to keep following the screen
+            self.renderer.pixel_ratio = (
+                None if self.automatic_pixel_ratio else pixel_ratio
+            )
@@ -0,0 +1,192 @@
+import warnings
+
+import numpy as np
+import numpy.typing as npt
+import pygfx as gfx
+from funlib.geometry import Coordinate, Roi
+
+from ._roi_array import roi_to_slices
+
+
+class LabelTable:
+    """
+    Maps the label ids that are resident in the segmentation textures to small, dense indices.
+
+    The segmentation textures then only have to hold the compact indices (uint8 or uint16 instead of uint32), and
+    the shader looks the label ids back up in a small GPU buffer. Indices are reference counted by the wrapping
+    buffer slots that hold them, so an index is reused once no slot holds its label anymore. A single table is
+    shared by all WrappingBuffers of a SubVolume.
+
+    Label 0 is the background and always has index 0.
+    """
+
+    def __init__(self, capacity: int = 2**16):
+        """
+        Args:
+            capacity (int, optional):
+                The maximum number of distinct labels (including the background) that can be resident at once.
+                This decides the dtype of the segmentation textures: up to 256 labels fit in uint8, and up to
+                65536 (the most a uint16 texture can address) fit in uint16. Defaults to 65536.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        if not 2 <= capacity <= 2**16:
+            raise ValueError(f"capacity must be between 2 and 2**16, not {capacity}")
+        self.capacity = capacity
+        self.index_dtype = np.dtype(np.uint8 if capacity <= 2**8 else np.uint16)
+
+        # the shader colors labels by their lower 32 bits, just like it did before the labels were compacted
+        # noinspection PyTypeChecker
+        self.buffer = gfx.Buffer(np.zeros(capacity, np.uint32))
+        self._index_of_label: dict[int, int] = {0: 0}
+        self._label_of_index = np.zeros(capacity, np.uint64)
+        self._reference_counts = np.zeros(capacity, np.int64)
+        # indices below this have been handed out at least once, and the ones that were released since are reused
+        # before any new ones
+        self._next_index = 1
+        self._released_indices: list[int] = []
+        self._warned_full = False
+
+    def __len__(self) -> int:
+        """The number of labels that currently have an index, including the background."""
+        return len(self._index_of_label)
+
+    def acquire(self, labels: npt.NDArray) -> npt.NDArray:
+        """
+        Get the compact indices of some labels, assigning new indices to labels that don't have one yet.
+
+        Every call must be balanced by a call to release with the returned indices once they are no longer used.
+        If the table is full, new labels get the background index and a warning is issued.
+
+        Args:
+            labels (npt.NDArray):
+                The unique label ids to look up. Signed ids are reinterpreted as unsigned, just like when they are
+                uploaded to a uint32 texture.
+
+        Returns:
+            The compact index of each label, in the index dtype.
+
+        """
+        indices = np.empty(len(labels), self.index_dtype)
+        changed = []
+        # negative ids can't be stored in the uint64 label lookup, so they wrap around like in a cast to uint32
+        labels = np.asarray(labels).astype(np.uint64, copy=False)
+        for i, label in enumerate(labels.tolist()):
+            index = self._index_of_label.get(label)
+            if index is None:
+                if self._released_indices:
+                    index = self._released_indices.pop()
+                elif self._next_index < self.capacity:
+                    index = self._next_index
+                    self._next_index += 1
+                else:
+                    self._warn_full()
+                    index = 0
+                if index != 0:
+                    self._index_of_label[label] = index
+                    self._label_of_index[index] = label
+                    self.buffer.data[index] = label & 0xFFFFFFFF
+                    changed.append(index)
+            indices[i] = index
+        np.add.at(self._reference_counts, indices, 1)
+        if changed:
+            self.buffer.update_range(min(changed), max(changed) - min(changed) + 1)
+        return indices
+
+    def release(self, indices: npt.NDArray):
+        """
+        Release indices returned by acquire. Indices that are no longer used by anyone can be reused.
+
+        Args:
+            indices (npt.NDArray):
+                The indices to release.
+
+        """
+        np.subtract.at(self._reference_counts, indices, 1)
+        for index in np.unique(indices).tolist():
+            # the background index is never freed
+            if index == 0 or self._reference_counts[index] > 0:
+                continue
+            del self._index_of_label[int(self._label_of_index[index])]
+            self._released_indices.append(index)
+
+    def label_of(self, indices: npt.NDArray) -> npt.NDArray:
+        """Map compact indices back to their label ids."""
+        return self._label_of_index[indices]
+
+    def _warn_full(self):
+        if self._warned_full:
+            return
+        self._warned_full = True
+        warnings.warn(
+            f"more than {self.capacity} distinct labels are resident, so the rest are drawn as background. "
+            "increase the label table capacity to fix this.",
+            stacklevel=3,
+        )
+
+
+class CompactLabels:
+    """
+    Segmentations compacted chunk by chunk, ready to be written into a buffer with a LabelTable.
+
+    Every chunk is reduced to the sorted labels it contains and the position of each voxel's label among them.
+    Finding the labels is the expensive part of compacting, and it doesn't need the LabelTable, so it is done
+    wherever the segmentations are read. Writing them into a buffer then only has to acquire each chunk's labels
+    and look up the indices of its voxels.
+    """
+
+    def __init__(
+        self,
+        shape: tuple[int, ...],
+        chunks: list[tuple[Roi, npt.NDArray, npt.NDArray]],
+    ):
+        """
+        Args:
+            shape (tuple[int, ...]):
+                The shape of the segmentations in pixels.
+            chunks (list[tuple[Roi, npt.NDArray, npt.NDArray]]):
+                For every chunk, a tuple (roi, labels, local_indices) where roi is the chunk's Roi in pixels
+                relative to the start of the segmentations, labels are the unique labels of the chunk, and
+                local_indices has the shape of the roi and holds the position of each voxel's label in labels.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self.shape = tuple(shape)
+        self.chunks = chunks
+
+    @classmethod
+    def from_segmentations(
+        cls, segmentation_data: npt.NDArray, chunk_shape_in_pixels: Coordinate
+    ) -> "CompactLabels":
+        """
+        Compact segmentations chunk by chunk.
+
+        Args:
+            segmentation_data (npt.NDArray):
+                The segmentations, starting on the chunk grid.
+            chunk_shape_in_pixels (Coordinate):
+                The shape of the chunks. Chunks at the end of the segmentations may be cut off.
+
+        Returns:
+            The CompactLabels of the segmentations.
+
+        """
+        shape_in_chunks = tuple(
+            -(-s // c) for s, c in zip(segmentation_data.shape, chunk_shape_in_pixels)
+        )
+        chunks = []
+        for chunk_coordinate in np.ndindex(*shape_in_chunks):
+            roi_in_pixels = (
+                Roi(chunk_coordinate, (1,) * len(shape_in_chunks))
+                * chunk_shape_in_pixels
+            ).intersect(Roi((0,) * segmentation_data.ndim, segmentation_data.shape))
+            labels, inverse = np.unique(
+                segmentation_data[roi_to_slices(roi_in_pixels)], return_inverse=True
+            )
+            local_indices = inverse.reshape(roi_in_pixels.shape).astype(
+                np.min_scalar_type(len(labels) - 1)
+            )
+            chunks.append((roi_in_pixels, labels, local_indices))
+        return cls(segmentation_data.shape, chunks)
+
+    def shifted(self, offset: Coordinate) -> list[tuple[Roi, npt.NDArray, npt.NDArray]]:
+        """The chunks with their Rois moved by offset, e.g. to combine the chunks of several CompactLabels."""
+        return [(roi + offset, labels, indices) for roi, labels, indices in self.chunks]
@@ -0,0 +1,146 @@
+from threading import Lock
+
+
+class ScaleLoadStats:
+    """
+    Loading statistics of a single scale level.
+
+    A WrappingBuffer with stats adds to them as it loads. Reads can finish on background threads, so the counters
+    are only ever changed through add. SubVolume takes the stats of every scale once per center_on_position, so
+    each snapshot covers everything that happened since the previous frame, including reads that finished in the
+    background in between.
+
+    Attributes:
+        scale_index (int | None):
+            The scale level these stats belong to, or None for the sum over all scale levels.
+        chunks_requested (int):
+            The number of chunks that were newly requested (and not already in the buffer).
+        sub_rois (int):
+            The number of disjoint Rois the newly requested chunks were split into.
+        chunks_hit (int):
+            The number of chunk reads served from the chunk cache.
+        chunks_missed (int):
+            The number of chunks read from the backing data, including prefetches.
+        chunks_uploaded (int):
+            The number of chunks written into the textures.
+        bytes_read (int):
+            The number of bytes read from the backing data, before converting them to the texture dtypes.
+        bytes_uploaded (int):
+            The number of bytes written into the textures.
+        read_latency_in_seconds (float):
+            The total time from issuing reads to their data being available. When reading chunk by chunk,
+            divide by chunks_missed for the mean latency.
+        conversion_time_in_seconds (float):
+            The total time spent converting read data to the texture dtypes. Sources that convert while reading
+            (see ChunkSource.start_read) count it towards read_latency_in_seconds instead.
+        staging_time_in_seconds (float):
+            The total time spent writing data into the textures' host memory, including label compaction and
+            occupancy.
+        update_range_time_in_seconds (float):
+            The total time spent scheduling texture uploads with update_range.
+    """
+
+    FIELDS = (
+        "chunks_requested",
+        "sub_rois",
+        "chunks_hit",
+        "chunks_missed",
+        "chunks_uploaded",
+        "bytes_read",
+        "bytes_uploaded",
+        "read_latency_in_seconds",
+        "conversion_time_in_seconds",
+        "staging_time_in_seconds",
+        "update_range_time_in_seconds",
+    )
+
+    def __init__(self, scale_index: int | None = None, **values):
+        """
+        Args:
+            scale_index (int, optional):
+                The scale level these stats belong to, or None for the sum over all scale levels.
+            **values:
+                Initial values for any of FIELDS. The others start at 0.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self.scale_index = scale_index
+        for field in self.FIELDS:
+            setattr(self, field, values.pop(field, 0))
+        if values:
+            raise TypeError(f"unknown load stats {list(values)}")
+        self._lock = Lock()
+
+    def add(self, **amounts):
+        """Add to any of FIELDS. This is safe to call from background threads."""
+        with self._lock:
+            for field, amount in amounts.items():
+                setattr(self, field, getattr(self, field) + amount)
+
+    def take(self) -> "ScaleLoadStats":
+        """Return a copy of the stats so far and reset them to 0."""
+        with self._lock:
+            snapshot = ScaleLoadStats(self.scale_index, **self.as_dict())
+            for field in self.FIELDS:
+                setattr(self, field, 0)
+        return snapshot
+
+    def as_dict(self) -> dict[str, int | float]:
+        """Return the stats as a dict from field name to value, e.g. for telemetry."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self) -> str:
+        values = ", ".join(
+            f"{field}={value!r}" for field, value in self.as_dict().items()
+        )
+        return f"ScaleLoadStats(scale_index={self.scale_index!r}, {values})"
+
+
+class FrameLoadStats:
+    """
+    Loading statistics of a single call to SubVolume.center_on_position.
+
+    Attributes:
+        scales (list[ScaleLoadStats]):
+            The stats of each scale level, ordered from highest to lowest resolution.
+        center_on_position_time_in_seconds (float):
+            How long center_on_position took, including requesting, reading, and uploading chunks.
+        backlog_in_chunks (int):
+            The number of requested chunks that were still not committed at the end of the call.
+    """
+
+    def __init__(
+        self,
+        scales: list[ScaleLoadStats],
+        center_on_position_time_in_seconds: float,
+        backlog_in_chunks: int,
+    ):
+        """
+        Args:
+            scales (list[ScaleLoadStats]):
+                The stats of each scale level, ordered from highest to lowest resolution.
+            center_on_position_time_in_seconds (float):
+                How long center_on_position took.
+            backlog_in_chunks (int):
+                The number of requested chunks that were still not committed at the end of the call.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self.scales = scales
+        self.center_on_position_time_in_seconds = center_on_position_time_in_seconds
+        self.backlog_in_chunks = backlog_in_chunks
+
+    @property
+    def total(self) -> ScaleLoadStats:
+        """The stats summed over all scale levels."""
+        return ScaleLoadStats(
+            None,
+            **{
+                field: sum(getattr(scale, field) for scale in self.scales)
+                for field in ScaleLoadStats.FIELDS
+            },
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"FrameLoadStats(center_on_position_time_in_seconds={self.center_on_position_time_in_seconds!r}, "
+            f"backlog_in_chunks={self.backlog_in_chunks!r}, scales={self.scales!r})"
+        )
@@ -1,6 +1,16 @@
 import numpy as np
 import pygfx as gfx
 
+# the step sizes of the rays in voxels of the base scale for each quality preset
+STEP_SIZE_PRESETS = {
+    "low": 1.0,
+    "medium": 0.5,
+    "high": 0.25,
+}
+
+# the ways a ray can be turned into a color, see SubVolumeMaterial.render_mode
+RENDER_MODES = ("lmip", "weighted_average")
+
 
 class SubVolumeMaterial(gfx.VolumeMipMaterial):
     uniform_type = dict(
@@ -12,15 +22,24 @@ class SubVolumeMaterial(gfx.VolumeMipMaterial):
         fog_density="f4",
         fog_color="3xf4",
         color_count="u4",
-        # an array is of type n*4xf4, where n is the number of colors
+        # an array is of type n*4xf4, where n is the capacity of the color table
         # pygfx does some string manipulation with the format
-        # since we change the type of the array when the shape changes, it will trigger a recompile!
+        # changing the type of the array triggers a recompile, so we only size it once (to color_capacity) and
+        # keep the number of colors in use in color_count. changing the colors is then just a buffer write.
         # IMPORTANT NOTE
         # wgpu expects each 3xf4 to be padded to 16 bytes, which pygfx will do if we pass in 3xf4 normally
         # however, when we pass in an array of n*3xf4, pygfx does NOT end up padding the vectors!
         # to get around this, we just use an array of n*4xf4 and ignore the last component.
         # all inputs are still expected to be 3-component tuples! this is just a lie we tell pygfx.
         colors="0*4xf4",
+        # a step size of 0 means the shader picks one from the volume size
+        step_size="f4",
+        # this should be a bool, but uniforms can't hold bools
+        adaptive_step_size="i4",
+        # the weighted average render mode
+        average_samples="i4",
+        average_spacing_growth="f4",
+        average_fall_off="f4",
     )
 
     def __init__(
@@ -31,10 +50,20 @@ class SubVolumeMaterial(gfx.VolumeMipMaterial):
         fog_density: float = 0.5,
         fog_color: tuple[float, float, float] = (0.5, 0.5, 0.5),
         colors: list[tuple[float, float, float]] | None = None,
+        color_capacity: int = 256,
         clim: tuple[float, float] = (0, 1),
         gamma: float = 1.0,
         opacity: float = 1.0,
+        step_size: float | None = None,
+        quality: str | None = None,
+        adaptive_step_size: bool = True,
+        render_mode: str = "lmip",
+        average_samples: int = 64,
+        average_spacing_growth: float = 1.05,
+        average_fall_off: float = 0.0,
     ):
+        # our setters only write to the host copy of the uniform buffer, which commit_uniforms uploads
+        self._uniforms_dirty = False
         # we need to super init so gfx.Material will create our uniform buffer
         super().__init__(
             clim=clim,
@@ -48,6 +77,9 @@ class SubVolumeMaterial(gfx.VolumeMipMaterial):
         self.lmip_max_samples = lmip_max_samples
         self.fog_density = fog_density
         self.fog_color = fog_color
+        if color_capacity < 1:
+            raise ValueError(f"color_capacity must be at least 1, not {color_capacity}")
+        self._set_size_of_uniform_array("colors", color_capacity)
         if colors is None:
             colors = [
                 (0.0, 1.0, 1.0),
@@ -56,6 +88,32 @@ class SubVolumeMaterial(gfx.VolumeMipMaterial):
                 (0.75, 1.0, 1.0),
             ]
         self.colors = colors
+        if step_size is not None and quality is not None:
+            raise ValueError("only one of step_size and quality can be passed")
+        self.step_size = step_size
+        if quality is not None:
+            self.quality = quality
+        self.adaptive_step_size = adaptive_step_size
+        self.render_mode = render_mode
+        self.average_samples = average_samples
+        self.average_spacing_growth = average_spacing_growth
+        self.average_fall_off = average_fall_off
+
+    @property
+    def has_uncommitted_uniforms(self) -> bool:
+        """Whether uniforms were changed since the last commit_uniforms."""
+        return self._uniforms_dirty
+
+    def commit_uniforms(self):
+        """
+        Upload the uniform changes made since the last call, all at once.
+
+        The setters of this material only write to the host copy of the uniform buffer, so setting several of them
+        uploads the buffer once. SubVolume calls this once per frame, right before the volume is drawn.
+        """
+        if self._uniforms_dirty:
+            self.uniform_buffer.update_full()
+            self._uniforms_dirty = False
 
     @property
     def lmip_threshold(self) -> float:
@@ -65,7 +123,7 @@ class SubVolumeMaterial(gfx.VolumeMipMaterial):
     @lmip_threshold.setter
     def lmip_threshold(self, value: float) -> None:
         self.uniform_buffer.data["lmip_threshold"] = float(value)
-        self.uniform_buffer.update_full()
+        self._uniforms_dirty = True
 
     @property
     def lmip_fall_off(self) -> float:
@@ -75,7 +133,7 @@ class SubVolumeMaterial(gfx.VolumeMipMaterial):
     @lmip_fall_off.setter
     def lmip_fall_off(self, value: float) -> None:
         self.uniform_buffer.data["lmip_fall_off"] = float(value)
-        self.uniform_buffer.update_full()
+        self._uniforms_dirty = True
 
     @property
     def lmip_max_samples(self) -> int:
@@ -85,7 +143,7 @@ class SubVolumeMaterial(gfx.VolumeMipMaterial):
     @lmip_max_samples.setter
     def lmip_max_samples(self, value: int) -> None:
         self.uniform_buffer.data["lmip_max_samples"] = int(value)
-        self.uniform_buffer.update_full()
+        self._uniforms_dirty = True
 
     @property
     def fog_density(self) -> float:
@@ -95,7 +153,7 @@ class SubVolumeMaterial(gfx.VolumeMipMaterial):
     @fog_density.setter
     def fog_density(self, value: float) -> None:
         self.uniform_buffer.data["fog_density"] = float(value)
-        self.uniform_buffer.update_full()
+        self._uniforms_dirty = True
 
     @property
     def fog_color(self) -> tuple[float, float, float]:
@@ -114,26 +172,144 @@ class SubVolumeMaterial(gfx.VolumeMipMaterial):
         if np.any(fog_color < 0) or np.any(fog_color > 1):
             raise ValueError("fog_color values must be in the range [0, 1]")
         self.uniform_buffer.data["fog_color"] = fog_color
-        self.uniform_buffer.update_full()
+        self._uniforms_dirty = True
+
+    @property
+    def step_size(self) -> float | None:
+        """
+        The distance between samples along a ray in voxels of the base scale.
+
+        Smaller values catch smaller structures at the cost of performance. If None, the step size is picked
+        from the size of the volume, between 0.1 and 0.8.
+        """
+        step_size = float(self.uniform_buffer.data["step_size"])
+        return step_size if step_size > 0 else None
+
+    @step_size.setter
+    def step_size(self, value: float | None) -> None:
+        if value is not None and value <= 0:
+            raise ValueError(f"step_size must be positive, not {value}")
+        self._quality = None
+        self.uniform_buffer.data["step_size"] = 0.0 if value is None else float(value)
+        self._uniforms_dirty = True
 
     @property
-    def _color_count(self) -> float:
-        """The length of the colors array."""
-        # we arent currently using this property, but it's a nice to have for later
-        return self.uniform_buffer.data["color_count"]
+    def quality(self) -> str | None:
+        """The quality preset the step size was set from, or None if it was set directly. See STEP_SIZE_PRESETS."""
+        return self._quality
+
+    @quality.setter
+    def quality(self, value: str) -> None:
+        if value not in STEP_SIZE_PRESETS:
+            raise ValueError(
+                f"quality must be one of {list(STEP_SIZE_PRESETS)}, not {value!r}"
+            )
+        self.step_size = STEP_SIZE_PRESETS[value]
+        self._quality = value
+
+    @property
+    def adaptive_step_size(self) -> bool:
+        """
+        Whether rays take longer steps through coarser scales.
+
+        A voxel of a coarser scale covers several voxels of the base scale, so sampling it at the base step size
+        mostly samples the same voxel again. With this on, a ray that samples a coarser scale moves on by the
+        size of its voxels instead.
+        """
+        return bool(self.uniform_buffer.data["adaptive_step_size"])
+
+    @adaptive_step_size.setter
+    def adaptive_step_size(self, value: bool) -> None:
+        self.uniform_buffer.data["adaptive_step_size"] = int(bool(value))
+        self._uniforms_dirty = True
+
+    @property
+    def render_mode(self) -> str:
+        """
+        How rays are turned into a color. One of RENDER_MODES.
+
+        "lmip" marches every step of the ray and shows the first local maximum above lmip_threshold.
+        "weighted_average" shows the average of average_samples samples spread along the ray, which bounds the cost
+        of a ray however large the volume is. Changing the render mode recompiles the shader.
+        """
+        return self._store.render_mode
+
+    @render_mode.setter
+    def render_mode(self, value: str) -> None:
+        if value not in RENDER_MODES:
+            raise ValueError(
+                f"render_mode must be one of {list(RENDER_MODES)}, not {value!r}"
+            )
+        # the render mode is a template variable of the shader, so it goes in the store to trigger a recompile
+        self._store.render_mode = value
+
+    @property
+    def average_samples(self) -> int:
+        """The number of samples per ray in the weighted average render mode."""
+        return int(self.uniform_buffer.data["average_samples"])
+
+    @average_samples.setter
+    def average_samples(self, value: int) -> None:
+        if value < 1:
+            raise ValueError(f"average_samples must be at least 1, not {value}")
+        self.uniform_buffer.data["average_samples"] = int(value)
+        self._uniforms_dirty = True
+
+    @property
+    def average_spacing_growth(self) -> float:
+        """
+        How much farther apart each sample is than the one before it in the weighted average render mode.
+
+        The samples are spread over the part of the ray that has data. With 1, they are evenly spaced. Larger
+        values put more of them close to the camera, where the finer scales are loaded.
+        """
+        return float(self.uniform_buffer.data["average_spacing_growth"])
+
+    @average_spacing_growth.setter
+    def average_spacing_growth(self, value: float) -> None:
+        if value < 1:
+            raise ValueError(f"average_spacing_growth must be at least 1, not {value}")
+        self.uniform_buffer.data["average_spacing_growth"] = float(value)
+        self._uniforms_dirty = True
+
+    @property
+    def average_fall_off(self) -> float:
+        """
+        How quickly the weight of a sample falls off with its distance along the ray, per voxel of the base scale.
+
+        A sample at distance d is weighted by exp(-average_fall_off * d), so 0 weights all samples the same.
+        """
+        return float(self.uniform_buffer.data["average_fall_off"])
+
+    @average_fall_off.setter
+    def average_fall_off(self, value: float) -> None:
+        if value < 0:
+            raise ValueError(f"average_fall_off must be non-negative, not {value}")
+        self.uniform_buffer.data["average_fall_off"] = float(value)
+        self._uniforms_dirty = True
+
+    @property
+    def _color_count(self) -> int:
+        """The number of colors in use in the colors array."""
+        return int(self.uniform_buffer.data["color_count"])
 
     @_color_count.setter
     def _color_count(self, value: int) -> None:
         self.uniform_buffer.data["color_count"] = int(value)
-        self.uniform_buffer.update_full()
+        self._uniforms_dirty = True
+
+    @property
+    def color_capacity(self) -> int:
+        """The maximum number of colors. Set once when the material is created, so changing colors never recompiles."""
+        return self.uniform_buffer.data["colors"].shape[0]
 
     @property
     def colors(self) -> list[tuple[float, float, float]]:
         """The list of colors used for rendering labels."""
         # noinspection PyTypeChecker
         return [
-            tuple(float(f) for f in plane.flat)
-            for plane in self.uniform_buffer.data["colors"]
+            tuple(float(f) for f in plane.flat[:3])
+            for plane in self.uniform_buffer.data["colors"][: self._color_count]
         ]
 
     @colors.setter
@@ -151,9 +327,13 @@ class SubVolumeMaterial(gfx.VolumeMipMaterial):
                 # Error
                 raise TypeError(f"Each color must be an hsv tuple, not {color}")
 
+        if len(colors2) > self.color_capacity:
+            raise ValueError(
+                f"got {len(colors2)} colors, but the color table only holds {self.color_capacity}"
+            )
+
         # Apply
-        self._set_size_of_uniform_array("colors", len(colors2))
         self._color_count = len(colors2)
         for i in range(len(colors2)):
             self.uniform_buffer.data["colors"][i] = colors2[i]
-        self.uniform_buffer.update_full()
+        self._uniforms_dirty = True
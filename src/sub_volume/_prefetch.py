@@ -0,0 +1,86 @@
+from collections import deque
+
+import numpy as np
+import numpy.typing as npt
+
+
+class CameraTrajectory:
+    """
+    A short history of camera positions used to estimate where the camera is heading.
+
+    Positions are expected in data coordinates (pixels of the base scale) in C/numpy style (x, y, z).
+    """
+
+    def __init__(self, history_length: int = 8, max_age_in_seconds: float = 0.5):
+        """
+        Args:
+            history_length (int, optional):
+                The maximum number of positions to remember. Defaults to 8.
+            max_age_in_seconds (float, optional):
+                Positions older than this are ignored when estimating the velocity, so a camera that stopped
+                moving is not extrapolated forever. Defaults to 0.5.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self.max_age_in_seconds = max_age_in_seconds
+        self._history: deque[tuple[float, npt.NDArray]] = deque(maxlen=history_length)
+
+    def record(self, position: tuple[float, float, float], timestamp: float):
+        """
+        Add a camera position to the history.
+
+        Args:
+            position (tuple[float, float, float]):
+                The camera position in data coordinates in (x, y, z) order.
+            timestamp (float):
+                The time of the position in seconds. This must not decrease between calls.
+
+        """
+        self._history.append((timestamp, np.asarray(position, dtype=np.float64)))
+
+    @property
+    def velocity(self) -> npt.NDArray:
+        """The estimated camera velocity in pixels per second in (x, y, z) order."""
+        if not self._history:
+            return np.zeros(3)
+        newest_time, newest_position = self._history[-1]
+        # use the oldest position that is still recent enough. this smooths out jitter between frames.
+        for oldest_time, oldest_position in self._history:
+            if newest_time - oldest_time <= self.max_age_in_seconds:
+                break
+        elapsed = newest_time - oldest_time
+        if elapsed <= 0:
+            return np.zeros(3)
+        return (newest_position - oldest_position) / elapsed
+
+    def predict_displacement(
+        self,
+        horizon_in_seconds: float | None = None,
+        horizon_in_pixels: tuple[float, float, float] | None = None,
+    ) -> npt.NDArray:
+        """
+        Predict how far the camera will move along its current trajectory.
+
+        Exactly one of horizon_in_seconds and horizon_in_pixels must be passed.
+
+        Args:
+            horizon_in_seconds (float, optional):
+                Extrapolate the current velocity this many seconds ahead.
+            horizon_in_pixels (tuple[float, float, float], optional):
+                Look this far ahead along the direction of travel, measured per axis in (x, y, z) order. This is
+                useful to look a fixed number of chunks ahead regardless of speed.
+
+        Returns:
+            The predicted displacement in pixels in (x, y, z) order. This is zero if the camera is not moving.
+
+        """
+        if (horizon_in_seconds is None) == (horizon_in_pixels is None):
+            raise ValueError(
+                "exactly one of horizon_in_seconds and horizon_in_pixels must be passed"
+            )
+        velocity = self.velocity
+        if horizon_in_seconds is not None:
+            return velocity * horizon_in_seconds
+        speed = np.linalg.norm(velocity)
+        if speed == 0:
+            return np.zeros(3)
+        return velocity / speed * np.asarray(horizon_in_pixels, dtype=np.float64)
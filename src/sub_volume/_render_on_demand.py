@@ -0,0 +1,81 @@
+from collections.abc import Callable
+from functools import wraps
+
+import pygfx as gfx
+
+from ._wobject import SubVolume
+
+
+class RenderOnDemand:
+    """
+    Only requests draws from a canvas while a SubVolume needs to be redrawn.
+
+    Wrap the draw function with this instead of requesting a new draw every frame. After each frame, another draw is
+    only requested if the camera moved, chunks are still loading, or the volume's textures or uniforms changed, so an
+    idle viewer stops drawing altogether. Input that moves the camera (e.g. through a controller) requests draws as
+    usual, and changes made outside of the draw function (e.g. to the material) can be picked up with
+    request_draw_if_needed.
+    """
+
+    def __init__(
+        self,
+        volume: SubVolume,
+        canvas,
+        camera: gfx.Camera,
+        camera_threshold: float = 1e-4,
+    ):
+        """
+        Args:
+            volume (SubVolume):
+                The volume to redraw on demand.
+            canvas (rendercanvas.BaseRenderCanvas):
+                The canvas to request draws from.
+            camera (gfx.Camera):
+                The camera the volume is drawn with.
+            camera_threshold (float, optional):
+                How much the camera can move before it is redrawn. See SubVolume.needs_redraw. Defaults to 1e-4.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self.volume = volume
+        self.canvas = canvas
+        self.camera = camera
+        self.camera_threshold = camera_threshold
+
+    def __call__(self, draw_function: Callable[[], None]) -> Callable[[], None]:
+        """
+        Wrap a draw function so that it only requests another draw when the volume needs it.
+
+        Args:
+            draw_function (Callable[[], None]):
+                The function that renders the scene and centers the volume.
+
+        Returns:
+            The wrapped draw function, to pass to canvas.request_draw.
+
+        """
+
+        @wraps(draw_function)
+        def draw():
+            self.volume.mark_drawn(self.camera)
+            draw_function()
+            self.request_draw_if_needed()
+
+        return draw
+
+    @property
+    def needs_redraw(self) -> bool:
+        """Whether the volume needs to be drawn again."""
+        return self.volume.needs_redraw(self.camera, self.camera_threshold)
+
+    def request_draw_if_needed(self) -> bool:
+        """
+        Request a draw from the canvas if the volume needs to be drawn again.
+
+        Returns:
+            Whether a draw was requested.
+
+        """
+        if not self.needs_redraw:
+            return False
+        self.canvas.request_draw()
+        return True
@@ -0,0 +1,160 @@
+import numpy as np
+import numpy.typing as npt
+from funlib.geometry import Roi
+
+# array-backed roi algebra
+# a box is an integer array of shape (2, dims) holding the begin and end of a Roi, and a batch of boxes is an
+# array of shape (n, 2, dims). sets of chunks are arrays of shape (n, dims) with one chunk coordinate per row.
+# this lets the wrapping buffers split, subtract and enumerate rois with a handful of numpy operations instead of
+# building Roi and Coordinate objects in python loops. the functions here return their boxes and chunks in the
+# same order as the Roi based functions in _wrapping_buffer they back.
+
+
+def as_box(begin, end) -> npt.NDArray:
+    """Stack a begin and end into a box, as int64 unless the coordinates are too large for it."""
+    try:
+        return np.array([begin, end], dtype=np.int64)
+    except OverflowError:
+        # numpy can still do the same math on python ints, just not as fast
+        return np.array([begin, end], dtype=object)
+
+
+def roi_to_box(roi: Roi) -> npt.NDArray:
+    """Convert a Roi into a box."""
+    return as_box(tuple(roi.begin), tuple(roi.end))
+
+
+def box_to_roi(box: npt.NDArray) -> Roi:
+    """Convert a box into a Roi."""
+    begin, end = box.tolist()
+    return Roi(tuple(begin), tuple(e - b for b, e in zip(begin, end)))
+
+
+def is_empty(box: npt.NDArray) -> bool:
+    """Whether a box contains nothing."""
+    return bool(np.any(box[1] <= box[0]))
+
+
+def subtract_boxes(box_a: npt.NDArray, box_b: npt.NDArray) -> npt.NDArray:
+    """
+    Split the part of box_a that is not in box_b into disjoint slabs.
+
+    Args:
+        box_a (npt.NDArray):
+            The box to subtract from.
+        box_b (npt.NDArray):
+            The box to subtract.
+
+    Returns:
+        A batch of at most 2 * dims boxes that cover box_a without box_b.
+
+    """
+    dims = box_a.shape[1]
+    if is_empty(box_a):
+        return box_a[np.newaxis, :, :0].reshape(0, 2, dims)
+    a_begin, a_end = box_a
+    c_begin = np.maximum(a_begin, box_b[0])
+    c_end = np.minimum(a_end, box_b[1])
+    if is_empty(box_b) or np.any(c_end <= c_begin):
+        return box_a[np.newaxis]
+
+    # we cut slabs off of box_a one axis at a time. once we are at axis d, the axes before it have already been
+    # cut down to the intersection c, so row d of begin and end is what is left of box_a at that point.
+    axes = np.arange(dims)
+    cut = axes[:, np.newaxis] > axes[np.newaxis, :]
+    begin = np.where(cut, c_begin, a_begin)
+    end = np.where(cut, c_end, a_end)
+
+    # the slab before c ends where c begins on axis d, and the one after it begins where c ends
+    before_end = end.copy()
+    before_end[axes, axes] = c_begin
+    after_begin = begin.copy()
+    after_begin[axes, axes] = c_end
+    slabs = np.stack(
+        [np.stack([begin, before_end], axis=1), np.stack([after_begin, end], axis=1)],
+        axis=1,
+    ).reshape(2 * dims, 2, dims)
+    keep = np.stack([a_begin < c_begin, c_end < a_end], axis=1).reshape(2 * dims)
+    return slabs[keep]
+
+
+def wrap_box(
+    box: npt.NDArray, grid_shape: tuple[int, ...]
+) -> tuple[npt.NDArray, npt.NDArray]:
+    """
+    Split a box along the boundaries of a periodic grid, like a wrapping buffer.
+
+    Args:
+        box (npt.NDArray):
+            A logical box that is no larger than the grid, so it crosses each boundary at most once.
+        grid_shape (tuple[int, ...]):
+            The shape of the grid.
+
+    Returns:
+        A tuple (buffer_boxes, logical_boxes) of batches of boxes, where buffer_boxes[i] is where logical_boxes[i]
+        lands in the grid. No logical box crosses a grid boundary.
+
+    """
+    dims = box.shape[1]
+    if is_empty(box):
+        empty = box[np.newaxis, :, :0].reshape(0, 2, dims)
+        return empty, empty
+    begin, end = box
+    grid = np.asarray(grid_shape)
+
+    # each axis is split into the piece before the first boundary after begin, and the (possibly empty) piece
+    # after it
+    boundary = (begin // grid + 1) * grid
+    split = np.where(boundary < end, boundary, end)
+    piece_begins = np.stack([begin, split])
+    piece_ends = np.stack([split, end])
+
+    # every combination of pieces, with the first axis changing slowest
+    pieces = np.indices((2,) * dims).reshape(dims, -1).T
+    axes = np.arange(dims)
+    logical_boxes = np.stack(
+        [piece_begins[pieces, axes], piece_ends[pieces, axes]], axis=1
+    )
+    logical_boxes = logical_boxes[
+        np.all(logical_boxes[:, 1] > logical_boxes[:, 0], axis=1)
+    ]
+
+    buffer_boxes = logical_boxes.copy()
+    buffer_boxes[:, 0] = logical_boxes[:, 0] % grid
+    buffer_boxes[:, 1] = buffer_boxes[:, 0] + logical_boxes[:, 1] - logical_boxes[:, 0]
+    return buffer_boxes, logical_boxes
+
+
+def box_chunks(boxes: npt.NDArray) -> npt.NDArray:
+    """
+    List the coordinates of every chunk within a batch of boxes in chunk coordinates.
+
+    Args:
+        boxes (npt.NDArray):
+            A batch of boxes, or a single box.
+
+    Returns:
+        An (n, dims) int64 array of chunk coordinates, box by box, with the last axis changing fastest.
+
+    """
+    boxes = np.asarray(boxes, dtype=np.int64)
+    if boxes.ndim == 2:
+        boxes = boxes[np.newaxis]
+    dims = boxes.shape[2]
+    chunks = [
+        np.indices(tuple(np.maximum(end - begin, 0))).reshape(dims, -1).T + begin
+        for begin, end in boxes
+    ]
+    if not chunks:
+        return np.empty((0, dims), np.int64)
+    return np.concatenate(chunks)
+
+
+def chunks_in_box(chunks: npt.NDArray, box: npt.NDArray) -> npt.NDArray:
+    """Get a mask of the chunks in an (n, dims) array that lie within a box."""
+    return np.all((box[0] <= chunks) & (chunks < box[1]), axis=1)
+
+
+def roi_to_slices(roi: Roi) -> tuple[slice, ...]:
+    """Convert a Roi into a tuple of slices, ensuring all indices are ints."""
+    return tuple(slice(int(o), int(o) + int(s)) for o, s in zip(roi.offset, roi.shape))
@@ -0,0 +1,178 @@
+import time
+
+import numpy as np
+
+from ._wrapping_buffer import WrappingBuffer
+
+
+class ChunkLoadScheduler:
+    """
+    Loads the pending chunks of every scale level in a single priority order.
+
+    Coarser scales cover more physical space per chunk, so they always come first. Within a scale, chunks closer
+    to the camera come first. This gives the order
+
+        low res near > low res far > high res near > high res far
+
+    so that with limited bandwidth we get a coarse but complete picture instead of a half loaded fine one.
+
+    Each call to load can be limited to a per-frame budget, so that large moves are spread across as many frames
+    as needed instead of stalling a single frame. At least one chunk is always uploaded per call, so loading makes
+    progress with any budget.
+    """
+
+    def __init__(
+        self,
+        wrapping_buffers: list[WrappingBuffer],
+        max_reads_in_flight: int | None = None,
+        max_upload_bytes_per_frame: int | None = None,
+        max_upload_milliseconds_per_frame: float | None = None,
+    ):
+        """
+        Args:
+            wrapping_buffers (list[WrappingBuffer]):
+                The buffers for each scale level, ordered from highest to lowest resolution.
+            max_reads_in_flight (int, optional):
+                When the buffers load in the background, the maximum number of chunks that can be submitted to
+                the executor at once. Chunks that don't fit wait for a later frame, where they are prioritized
+                again against the camera's new position. If not provided, every pending chunk is submitted at once.
+            max_upload_bytes_per_frame (int, optional):
+                The maximum number of bytes to write into the textures per call to load. If not provided, there is
+                no limit.
+            max_upload_milliseconds_per_frame (float, optional):
+                The maximum time to spend loading and committing chunks per call to load. If not provided, there
+                is no limit.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self.wrapping_buffers = wrapping_buffers
+        self.max_reads_in_flight = max_reads_in_flight
+        self.max_upload_bytes_per_frame = max_upload_bytes_per_frame
+        self.max_upload_milliseconds_per_frame = max_upload_milliseconds_per_frame
+
+    def prioritized_chunks(
+        self, camera_data_pos: tuple[float, float, float]
+    ) -> list[tuple[WrappingBuffer, tuple[int, int, int]]]:
+        """
+        List the pending chunks of all scale levels, highest priority first.
+
+        Args:
+            camera_data_pos (tuple[float, float, float]):
+                The camera position in pixels of the base scale in (x, y, z) order.
+
+        Returns:
+            A list of (buffer, chunk coordinate) tuples.
+
+        """
+        return self._prioritize(
+            camera_data_pos,
+            [(buffer, buffer.pending_chunks) for buffer in self.wrapping_buffers],
+        )
+
+    def _prioritize(
+        self,
+        camera_data_pos: tuple[float, float, float],
+        chunks_per_buffer: list[tuple[WrappingBuffer, list[tuple[int, int, int]]]],
+    ) -> list[tuple[WrappingBuffer, tuple[int, int, int]]]:
+        keyed_chunks = []
+        camera = np.asarray(camera_data_pos, dtype=np.float64)
+        for buffer, chunks in chunks_per_buffer:
+            if not chunks:
+                continue
+            scale_index = self.wrapping_buffers.index(buffer)
+            # the centers of the chunks in pixels of the base scale
+            chunk_shape = np.asarray(buffer.chunk_shape_in_pixels, dtype=np.float64)
+            scale_factor = np.asarray(buffer.scale_factor, dtype=np.float64)
+            centers = (np.asarray(chunks) + 0.5) * chunk_shape / scale_factor
+            distances = np.linalg.norm(centers - camera, axis=1)
+            keyed_chunks.extend(
+                # higher scale indices are coarser, so they sort first
+                ((-scale_index, float(distance)), buffer, chunk_coordinate)
+                for distance, chunk_coordinate in zip(distances, chunks)
+            )
+        keyed_chunks.sort(key=lambda keyed_chunk: keyed_chunk[0])
+        return [
+            (buffer, chunk_coordinate) for _, buffer, chunk_coordinate in keyed_chunks
+        ]
+
+    @property
+    def backlog_in_chunks(self) -> int:
+        """The number of requested chunks across all scale levels that have not been committed yet."""
+        return sum(buffer.backlog_in_chunks for buffer in self.wrapping_buffers)
+
+    def load(self, camera_data_pos: tuple[float, float, float]):
+        """
+        Load, commit, and submit the chunks of all scale levels in priority order, within the per-frame budget.
+
+        Background reads that have finished are committed first. Then, buffers with an executor submit their
+        pending chunks to be committed in a later call. Buffers without one read and write their pending chunks
+        in this call, where TensorStore sources issue all of their reads before waiting on any of them. Chunks
+        that don't fit in the budget stay pending (or submitted) for the next call.
+
+        Args:
+            camera_data_pos (tuple[float, float, float]):
+                The camera position in pixels of the base scale in (x, y, z) order.
+
+        """
+        start = time.perf_counter()
+        uploaded_bytes = 0
+        uploaded_chunks = 0
+
+        def within_budget() -> bool:
+            # we always let one chunk through so that we make progress with any budget
+            if uploaded_chunks == 0:
+                return True
+            if (
+                self.max_upload_bytes_per_frame is not None
+                and uploaded_bytes >= self.max_upload_bytes_per_frame
+            ):
+                return False
+            if self.max_upload_milliseconds_per_frame is not None:
+                elapsed_milliseconds = (time.perf_counter() - start) * 1000
+                if elapsed_milliseconds >= self.max_upload_milliseconds_per_frame:
+                    return False
+            return True
+
+        # commit finished background reads first since they only need to be uploaded
+        for buffer, chunk_coordinate in self._prioritize(
+            camera_data_pos,
+            [(buffer, buffer.finished_chunks) for buffer in self.wrapping_buffers],
+        ):
+            if not within_budget():
+                break
+            uploaded_bytes += buffer.commit_chunk(chunk_coordinate)
+            uploaded_chunks += 1
+
+        reads_in_flight = sum(
+            buffer.reads_in_flight for buffer in self.wrapping_buffers
+        )
+        for buffer, chunk_coordinate in self.prioritized_chunks(camera_data_pos):
+            if not buffer.reads_concurrently:
+                if not within_budget():
+                    continue
+                uploaded_bytes += buffer.load_chunk(chunk_coordinate)
+                uploaded_chunks += 1
+                continue
+            # submitting a chunk doesn't upload anything, so it isn't limited by the budget
+            if (
+                self.max_reads_in_flight is not None
+                and reads_in_flight >= self.max_reads_in_flight
+            ):
+                continue
+            buffer.submit_chunk(chunk_coordinate)
+            reads_in_flight += 1
+
+        # buffers without an executor (e.g. TensorStore sources) read concurrently but need us to wait on them.
+        # every read of this step has been issued by now, so waiting costs about as long as the slowest read
+        # instead of the sum of all of them. reads that don't fit in the budget are committed in a later call.
+        for buffer, chunk_coordinate in self._prioritize(
+            camera_data_pos,
+            [
+                (buffer, buffer.submitted_chunks)
+                for buffer in self.wrapping_buffers
+                if buffer.executor is None
+            ],
+        ):
+            if not within_budget():
+                break
+            uploaded_bytes += buffer.commit_chunk(chunk_coordinate)
+            uploaded_chunks += 1
@@ -43,18 +43,22 @@ class SubVolumeShader(wgpu.shaders.volumeshader.VolumeRayShader):
         # Could maybe just remove the parameter from the template
         self["mode"] = "mip"
         # Set image format
+        # the textures of each scale keep the dtype of their source data, so each scale normalizes its own
+        # samples in sample_vol. by the time they reach sampled_value_to_color, they are all in the units
+        # of the source data (e.g. 0-255 for uint8), so clim and lmip_threshold work the same for every dtype.
         self["climcorrection"] = ""
+        scale_img_formats = []
+        scale_climcorrections = []
+        for texture in wobject.textures:
+            img_format, climcorrection = img_format_and_climcorrection(
+                to_texture_format(texture.format)
+            )
+            scale_img_formats.append(img_format)
+            scale_climcorrections.append(climcorrection)
+        self["img_format"] = scale_img_formats[0]
+        self["scale_img_formats"] = scale_img_formats
+        self["scale_climcorrections"] = scale_climcorrections
         fmt = to_texture_format(wobject.textures[0].format)
-        if "norm" in fmt or "float" in fmt:
-            self["img_format"] = "f32"
-            if "unorm" in fmt:
-                self["climcorrection"] = " * 255.0"
-            elif "snorm" in fmt:
-                self["climcorrection"] = " * 255.0 - 128.0"
-        elif "uint" in fmt:
-            self["img_format"] = "u32"
-        else:
-            self["img_format"] = "i32"
 
         # Set gamma
         self["gamma"] = material.gamma
@@ -69,6 +73,22 @@ class SubVolumeShader(wgpu.shaders.volumeshader.VolumeRayShader):
         if material.map is not None:
             self["colorspace"] = material.map.texture.colorspace
 
+        # Render mode
+        # the LMIP raycast or the weighted average of a fixed number of samples, see SubVolumeMaterial.render_mode
+        self["render_mode"] = material.render_mode
+
+        # Label compaction
+        self["compact_labels"] = wobject.label_table is not None
+
+        # Segmentations
+        # scales without segmentations have no segmentation texture, so we leave out their bindings and sampling.
+        # if no scale has segmentations, the volume is shaded with the colormap alone.
+        scale_has_segmentations = [
+            buffer.has_segmentations for buffer in wobject.wrapping_buffers
+        ]
+        self["scale_has_segmentations"] = scale_has_segmentations
+        self["has_segmentations"] = any(scale_has_segmentations)
+
         # Multi-scale support
         self["num_scales"] = len(wobject.wrapping_buffers)
 
@@ -101,12 +121,49 @@ class SubVolumeShader(wgpu.shaders.volumeshader.VolumeRayShader):
             )
 
             # Segmentations texture for this scale
-            t_segmentations_scale = wgpu.GfxTextureView(buffer.segmentations_texture)
+            if buffer.has_segmentations:
+                t_segmentations_scale = wgpu.GfxTextureView(
+                    buffer.segmentations_texture
+                )
+                bindings.append(
+                    wgpu.Binding(
+                        f"t_segmentations_scale_{i}",
+                        "texture/auto",
+                        t_segmentations_scale,
+                        vertex_and_fragment,
+                    )
+                )
+
+            # Residency texture for this scale
+            t_residency_scale = wgpu.GfxTextureView(buffer.residency_texture)
             bindings.append(
                 wgpu.Binding(
-                    f"t_segmentations_scale_{i}",
+                    f"t_residency_scale_{i}",
                     "texture/auto",
-                    t_segmentations_scale,
+                    t_residency_scale,
+                    vertex_and_fragment,
+                )
+            )
+
+            # Occupancy texture for this scale
+            # we only ever textureLoad from it, so it doesn't need the float32-filterable feature
+            t_occupancy_scale = wgpu.GfxTextureView(buffer.occupancy_texture)
+            bindings.append(
+                wgpu.Binding(
+                    f"t_occupancy_scale_{i}",
+                    "texture/unfilterable-float",
+                    t_occupancy_scale,
+                    vertex_and_fragment,
+                )
+            )
+
+        # Lookup table from compact label indices back to label ids
+        if wobject.label_table is not None:
+            bindings.append(
+                wgpu.Binding(
+                    "s_label_table",
+                    "buffer/read_only_storage",
+                    wobject.label_table.buffer,
                     vertex_and_fragment,
                 )
             )
@@ -125,3 +182,27 @@ class SubVolumeShader(wgpu.shaders.volumeshader.VolumeRayShader):
         return load_wgsl(
             "ring_buffer_volume_renderer.wgsl", package_name="sub_volume.shaders"
         )
+
+
+def img_format_and_climcorrection(fmt: str) -> tuple[str, str]:
+    """
+    Get the shader type of a texture format and the expression that maps its samples back to the source values.
+
+    Args:
+        fmt (str):
+            The wgpu texture format.
+
+    Returns:
+        A tuple (img_format, climcorrection) where img_format is "f32", "u32" or "i32", and climcorrection is
+        appended to a sample to undo the normalization of normalized formats.
+
+    """
+    if "norm" in fmt or "float" in fmt:
+        if "unorm" in fmt:
+            return "f32", " * 255.0"
+        elif "snorm" in fmt:
+            return "f32", " * 255.0 - 128.0"
+        return "f32", ""
+    elif "uint" in fmt:
+        return "u32", ""
+    return "i32", ""
@@ -1,3 +1,7 @@
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import numpy.typing as npt
 import pygfx as gfx
@@ -6,9 +10,21 @@ from funlib.geometry import Coordinate, Roi
 from pygfx import WorldObject
 from pygfx.utils.bounds import Bounds
 
+from ._chunk_cache import ChunkCache
+from ._chunk_source import ChunkSource, as_chunk_source
+from ._label_table import LabelTable
+from ._load_stats import FrameLoadStats, ScaleLoadStats
 from ._material import SubVolumeMaterial
+from ._prefetch import CameraTrajectory
+from ._scheduler import ChunkLoadScheduler
 from ._wrapping_buffer import WrappingBuffer
 
+# prefetches are read on a pool of this many threads, separate from the loader pool
+PREFETCH_WORKERS = 2
+# the most prefetch reads each scale level keeps in flight. chunks beyond this are prefetched on later frames, if
+# the camera is still heading towards them.
+MAX_PREFETCHES_IN_FLIGHT_PER_SCALE = 4 * PREFETCH_WORKERS
+
 
 class SubVolume(gfx.Volume):
     uniform_type = dict(
@@ -21,11 +37,31 @@ class SubVolume(gfx.Volume):
         self,
         material: SubVolumeMaterial,
         data_segmentation_pairs: list[
-            tuple[npt.NDArray | zarr.Array, npt.NDArray | zarr.Array]
+            tuple[
+                npt.NDArray | zarr.Array | ChunkSource,
+                npt.NDArray | zarr.Array | ChunkSource | None,
+            ]
+            | npt.NDArray
+            | zarr.Array
+            | ChunkSource
         ],
         buffer_shape_in_chunks: list[tuple[int, int, int]],
         chunk_shape_in_pixels: list[tuple[int, int, int]] | None = None,
+        loader_workers: int | None = None,
+        chunk_cache_size_in_bytes: int | None = None,
+        prefetch_horizon_in_seconds: float | None = None,
+        prefetch_horizon_in_chunks: int | None = None,
+        max_upload_bytes_per_frame: int | None = None,
+        max_upload_milliseconds_per_frame: float | None = None,
+        label_table_capacity: int | None = None,
     ):
+        # Levels without segmentations can be passed as just the data (or with None as the segmentations).
+        # Their buffers skip the segmentation texture and reads, and the shader skips sampling them.
+        data_segmentation_pairs = [
+            tuple(pair) if isinstance(pair, (tuple, list)) else (pair, None)
+            for pair in data_segmentation_pairs
+        ]
+
         # Use the first (highest resolution) data for base volume dimensions
         base_data = data_segmentation_pairs[0][0]
         num_scales = len(data_segmentation_pairs)
@@ -45,11 +81,12 @@ class SubVolume(gfx.Volume):
         # Handle per-scale or uniform chunk configurations
         if chunk_shape_in_pixels is None:
             # Try to infer from first data array
-            if hasattr(base_data, "chunks"):
-                chunk_shapes = [base_data.chunks] * num_scales
+            base_chunk_shape = as_chunk_source(base_data).chunk_shape
+            if base_chunk_shape is not None:
+                chunk_shapes = [base_chunk_shape] * num_scales
             else:
                 raise ValueError(
-                    "if chunk_shape_in_pixels is not provided, base data must have a 'chunks' attribute"
+                    "if chunk_shape_in_pixels is not provided, base data must be chunked"
                 )
         elif isinstance(chunk_shape_in_pixels, tuple):
             # Single configuration for all scales
@@ -69,6 +106,55 @@ class SubVolume(gfx.Volume):
                     f"chunk_shape_in_pixels[{i}] length must match data dimensions"
                 )
 
+        # If requested, extrapolate the camera's trajectory and read the chunks it is heading towards into the
+        # chunk cache ahead of time. The horizon is either a time or a number of chunks at each scale.
+        # We check this before starting any threads, so that invalid arguments don't leave a pool behind.
+        if (
+            prefetch_horizon_in_seconds is not None
+            and prefetch_horizon_in_chunks is not None
+        ):
+            raise ValueError(
+                "only one of prefetch_horizon_in_seconds and prefetch_horizon_in_chunks can be passed"
+            )
+        self.prefetch_horizon_in_seconds = prefetch_horizon_in_seconds
+        self.prefetch_horizon_in_chunks = prefetch_horizon_in_chunks
+        self.camera_trajectory = CameraTrajectory()
+        if self.prefetching and chunk_cache_size_in_bytes is None:
+            raise ValueError("prefetching requires chunk_cache_size_in_bytes")
+
+        # If requested, read chunks on a pool of background threads shared by all scales.
+        # The textures are only written to when we commit in center_on_position.
+        if loader_workers is not None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=loader_workers, thread_name_prefix="sub_volume_loader"
+            )
+        else:
+            self.executor = None
+
+        # Prefetches get a small pool of their own, so speculative reads never queue up in front of the chunks
+        # the scheduler needs for the current frame. Each scale only keeps a few of them in flight, so a fast
+        # camera doesn't pile up reads for places it has already left.
+        if self.prefetching:
+            self._prefetch_executor = ThreadPoolExecutor(
+                max_workers=PREFETCH_WORKERS, thread_name_prefix="sub_volume_prefetch"
+            )
+        else:
+            self._prefetch_executor = None
+
+        # If requested, keep decoded chunks around on the host after they leave the wrapping buffers.
+        # All scales share the same cache (and byte budget).
+        if chunk_cache_size_in_bytes is not None:
+            self.chunk_cache = ChunkCache(chunk_cache_size_in_bytes)
+        else:
+            self.chunk_cache = None
+
+        # If requested, the segmentation textures of all scales hold compact indices into a shared label table
+        # instead of the label ids, which lets them use uint8/uint16 textures whatever the dtype of the ids.
+        if label_table_capacity is not None:
+            self.label_table = LabelTable(label_table_capacity)
+        else:
+            self.label_table = None
+
         # Create multiple WrappingBuffers for each scale level
         self.wrapping_buffers = []
         for i, (scale_data, scale_segmentations) in enumerate(data_segmentation_pairs):
@@ -87,9 +173,24 @@ class SubVolume(gfx.Volume):
                 shape_in_chunks=buffer_shapes[i],
                 chunk_shape_in_pixels=chunk_shapes[i],
                 scale_factor=scale_factor,
+                executor=self.executor,
+                chunk_cache=self.chunk_cache,
+                scale_index=i,
+                label_table=self.label_table,
             )
             self.wrapping_buffers.append(buffer)
 
+        # Loads for all scales go through a single priority queue so coarse scales always land first.
+        # When loading in the background, we keep a few reads per worker in flight and prioritize the
+        # rest again on the next frame, when the camera might have moved. If a per-frame budget is set,
+        # whatever doesn't fit is spread across the following frames.
+        self.scheduler = ChunkLoadScheduler(
+            self.wrapping_buffers,
+            max_reads_in_flight=None if loader_workers is None else 4 * loader_workers,
+            max_upload_bytes_per_frame=max_upload_bytes_per_frame,
+            max_upload_milliseconds_per_frame=max_upload_milliseconds_per_frame,
+        )
+
         # we should probably use self.volume_dimensions here
         geometry = gfx.box_geometry(*base_data.shape)
         # but we need to call super().__init__() to set up our uniform buffer
@@ -100,6 +201,15 @@ class SubVolume(gfx.Volume):
         # and only then we can set self.volume_dimensions
         self.volume_dimensions = base_data.shape
 
+        # what the last drawn frame showed, so we can tell whether the next one would look any different
+        self._drawn_revision = None
+        self._drawn_view_matrix = None
+        # the chunks that bound the logical rois of the last center_on_position, see _logical_roi_keys
+        self._logical_roi_keys = None
+        # the loading statistics of the last center_on_position, see collect_load_stats
+        self.load_stats: FrameLoadStats | None = None
+        self._load_stats_callback = None
+
     @property
     def volume_dimensions(self) -> tuple[int, int, int]:
         """The dimensions of the volume in pixels in (x, y, z) order."""
@@ -128,10 +238,213 @@ class SubVolume(gfx.Volume):
         return [buffer.texture for buffer in self.wrapping_buffers]
 
     @property
-    def segmentations_textures(self) -> list[gfx.Texture]:
-        """Return all scale level segmentations textures."""
+    def segmentations_textures(self) -> list[gfx.Texture | None]:
+        """Return all scale level segmentations textures (None for scales without segmentations)."""
         return [buffer.segmentations_texture for buffer in self.wrapping_buffers]
 
+    @property
+    def prefetching(self) -> bool:
+        """Whether chunks ahead of the camera are prefetched into the chunk cache."""
+        return (
+            self.prefetch_horizon_in_seconds is not None
+            or self.prefetch_horizon_in_chunks is not None
+        )
+
+    @property
+    def has_pending_loads(self) -> bool:
+        """Whether any scale level has requested chunks that have not been committed yet."""
+        return any(buffer.has_pending_loads for buffer in self.wrapping_buffers)
+
+    @property
+    def backlog_in_chunks(self) -> int:
+        """The number of requested chunks across all scale levels that have not been committed yet."""
+        return self.scheduler.backlog_in_chunks
+
+    @property
+    def collect_load_stats(self) -> bool:
+        """
+        Whether loading statistics are collected.
+
+        While this is on, every call to center_on_position sets load_stats to a FrameLoadStats with what each
+        scale level requested, read, and uploaded since the previous call, and passes it to load_stats_callback.
+        This is off by default, in which case loading only pays for a few None checks.
+        """
+        return self.wrapping_buffers[0].stats is not None
+
+    @collect_load_stats.setter
+    def collect_load_stats(self, value: bool):
+        if value == self.collect_load_stats:
+            return
+        for buffer in self.wrapping_buffers:
+            buffer.stats = ScaleLoadStats(buffer.scale_index) if value else None
+        self.load_stats = None
+
+    @property
+    def load_stats_callback(self) -> Callable[[FrameLoadStats], None] | None:
+        """
+        Called with the FrameLoadStats of every center_on_position, e.g. to feed them into telemetry.
+
+        Setting a callback turns on collect_load_stats.
+        """
+        return self._load_stats_callback
+
+    @load_stats_callback.setter
+    def load_stats_callback(self, value: Callable[[FrameLoadStats], None] | None):
+        self._load_stats_callback = value
+        if value is not None:
+            self.collect_load_stats = True
+
+    def needs_redraw(
+        self, camera: gfx.Camera | None = None, camera_threshold: float = 1e-4
+    ) -> bool:
+        """
+        Whether a new frame would look different from the last one the volume was drawn in.
+
+        This is the case if any texture or uniform of the volume (including the material) changed since it was last
+        rendered, if chunks are still pending (they are only committed in center_on_position, which needs frames),
+        or if the camera moved since mark_drawn.
+
+        Args:
+            camera (gfx.Camera, optional):
+                The camera the volume is drawn with. If not provided, camera movement is ignored.
+            camera_threshold (float, optional):
+                How much any element of the combined model, view and projection matrix can change before the
+                camera counts as moved. Defaults to 1e-4.
+
+        Returns:
+            Whether the volume needs to be drawn again.
+
+        """
+        if (
+            self._drawn_revision != self._revision()
+            or self.has_uncommitted_uniforms
+            or self.has_pending_loads
+        ):
+            return True
+        if camera is None:
+            return False
+        if self._drawn_view_matrix is None:
+            return True
+        view_matrix = self._view_matrix(camera)
+        return bool(
+            np.max(np.abs(view_matrix - self._drawn_view_matrix)) > camera_threshold
+        )
+
+    def mark_drawn(self, camera: gfx.Camera):
+        """
+        Record the camera the volume is about to be drawn with, for needs_redraw.
+
+        The textures and uniforms are recorded by the renderer when it draws the volume, so this only needs to be
+        called once per frame with the camera that is rendered with.
+
+        Args:
+            camera (gfx.Camera):
+                The camera the volume is drawn with.
+
+        """
+        self._drawn_view_matrix = self._view_matrix(camera)
+
+    def _view_matrix(self, camera: gfx.Camera) -> npt.NDArray:
+        # moving the volume changes the view just like moving the camera does
+        return camera.camera_matrix @ self.world.matrix
+
+    def _revision(self) -> tuple:
+        # resource revisions are globally unique and only ever increase, so the largest one changes whenever any
+        # of the resources is updated
+        resources = [self.uniform_buffer, self.material.uniform_buffer]
+        if self.material.map is not None:
+            resources.append(self.material.map.texture)
+        if self.label_table is not None:
+            resources.append(self.label_table.buffer)
+        for buffer in self.wrapping_buffers:
+            resources.extend(buffer.resources)
+        # the render mode is a template variable of the shader rather than a uniform
+        return max(resource.rev for resource in resources), self.material.render_mode
+
+    @property
+    def has_uncommitted_uniforms(self) -> bool:
+        """Whether the material or any scale level has uniform changes that commit_uniforms has yet to upload."""
+        return self.material.has_uncommitted_uniforms or any(
+            buffer.has_uncommitted_uniforms for buffer in self.wrapping_buffers
+        )
+
+    def commit_uniforms(self):
+        """
+        Upload the uniform changes of the material and all scale levels made since the last call.
+
+        This is called right before the volume is drawn, so uniform changes are uploaded once per frame however
+        often they are set.
+        """
+        self.material.commit_uniforms()
+        for buffer in self.wrapping_buffers:
+            buffer.commit_uniforms()
+
+    def _update_object(self):
+        # the renderer calls this right before drawing the volume
+        self.commit_uniforms()
+        super()._update_object()
+        self._drawn_revision = self._revision()
+
+    def prewarm_pipeline(self, renderer: gfx.renderers.WgpuRenderer | None = None):
+        """
+        Compile the shader and render pipeline of this volume ahead of time, so the first frame doesn't hitch.
+
+        The volume is rendered once into a small off screen texture. Nothing needs to be loaded for this, so it can
+        be called right after creating the volume. The pipeline is kept for as long as the volume (and material)
+        live, and other volumes with the same number of scales, dtypes and material settings reuse its shader and
+        pipeline while it does. Changing a shader template setting later (e.g. the render mode) compiles again.
+
+        Args:
+            renderer (gfx.renderers.WgpuRenderer, optional):
+                The renderer the volume will be drawn with. Its blend mode is part of the pipeline, so pass it if
+                it doesn't use the default blend mode.
+
+        """
+        blend_mode = renderer.blend_mode if renderer is not None else "default"
+        target = gfx.Texture(dim=2, size=(1, 1, 1), format="rgba8unorm")
+        offscreen_renderer = gfx.renderers.WgpuRenderer(target, blend_mode=blend_mode)
+        camera = gfx.PerspectiveCamera()
+        camera.show_object(self)
+        # we render the volume on its own, so it stays wherever it is in the user's scene. nothing has been drawn
+        # to the user's canvas though, so we don't let this count as drawn for needs_redraw.
+        drawn_revision = self._drawn_revision
+        try:
+            offscreen_renderer.render(self, camera)
+        finally:
+            self._drawn_revision = drawn_revision
+
+    def commit_loads(self, wait: bool = False):
+        """
+        Write finished background reads for all scale levels into their textures, ignoring the per-frame budget.
+
+        center_on_position already commits within the per-frame budget, so this only needs to be called to flush
+        loads without moving (e.g. wait=True before taking a screenshot).
+
+        Args:
+            wait (bool):
+                If True, also load every chunk that is still pending and block until everything is committed.
+
+        """
+        for buffer in self.wrapping_buffers:
+            if wait:
+                for chunk_coordinate in buffer.pending_chunks:
+                    buffer.load_chunk(chunk_coordinate)
+            buffer.commit_loads(wait=wait)
+
+    def close(self, wait: bool = True):
+        """
+        Shut down the loader and prefetch thread pools. The volume can't load any more chunks afterwards.
+
+        Args:
+            wait (bool):
+                If True, block until reads that are already running have finished. Reads that haven't started yet
+                are cancelled either way.
+
+        """
+        for executor in (self.executor, self._prefetch_executor):
+            if executor is not None:
+                executor.shutdown(wait=wait, cancel_futures=True)
+
     def center_on_position(
         self,
         position: tuple[float, float, float],
@@ -148,6 +461,7 @@ class SubVolume(gfx.Volume):
                 If not passed, the sizes will be chosen to max out the available space in the wrapping buffers.
 
         """
+        started_at = time.perf_counter() if self.collect_load_stats else None
         if sizes is None:
             # If we cross chunk boundaries, the wrapping buffer will grow our selection to the next chunk boundary. We
             # need to ensure that our selection does not grow past the space available in the wrapping buffers. To do
@@ -188,24 +502,115 @@ class SubVolume(gfx.Volume):
         ]
         # we reverse the order here to get C/numpy style (x, y, z)
         camera_data_pos = camera_data_pos[::-1]
-        logical_rois = [
-            Roi(
-                offset=tuple(
-                    # c * f = camera position for a scale factor f
-                    # s // 2 = half the size of the buffer in pixels
-                    # size is already scaled to the buffer, which is why we don't need to multiply by f
-                    # size and scale_factor are already in C/numpy style (x, y, z)
-                    int(c * f - s // 2)
-                    for c, s, f in zip(camera_data_pos, size, buffer.scale_factor)
-                ),
-                shape=size,
-            )
+
+        # the rois we request only change once the camera moves far enough to cross a chunk boundary, so we
+        # compare cheap keys first and only build and request the rois if any of them changed
+        logical_roi_keys = [
+            self._logical_roi_key(buffer, camera_data_pos, size)
             for size, buffer in zip(sizes, self.wrapping_buffers)
         ]
-        # Update all wrapping buffers with scale-appropriate ROIs
-        for buffer, logical_roi in zip(self.wrapping_buffers, logical_rois):
-            if buffer.can_load_logical_roi(logical_roi):
-                buffer.load_logical_roi(logical_roi)
+        if logical_roi_keys != self._logical_roi_keys:
+            self._logical_roi_keys = logical_roi_keys
+            logical_rois = [
+                self._logical_roi_around(buffer, camera_data_pos, size)
+                for size, buffer in zip(sizes, self.wrapping_buffers)
+            ]
+            # Update all wrapping buffers with scale-appropriate ROIs
+            for buffer, logical_roi in zip(self.wrapping_buffers, logical_rois):
+                if buffer.can_load_logical_roi(logical_roi):
+                    buffer.request_logical_roi(logical_roi)
+        # and then load the chunks for every scale in priority order. this is also the per-frame commit point for
+        # background loads: anything that finished reading since the last frame gets written into the textures
+        # here (on the render thread).
+        if self.has_pending_loads:
+            self.scheduler.load(camera_data_pos)
+
+        if self.prefetching:
+            self.camera_trajectory.record(camera_data_pos, time.perf_counter())
+            self._prefetch(camera_data_pos, sizes)
+
+        if started_at is not None:
+            self.load_stats = FrameLoadStats(
+                [buffer.stats.take() for buffer in self.wrapping_buffers],
+                center_on_position_time_in_seconds=time.perf_counter() - started_at,
+                backlog_in_chunks=self.backlog_in_chunks,
+            )
+            if self._load_stats_callback is not None:
+                self._load_stats_callback(self.load_stats)
+
+    @staticmethod
+    def _logical_roi_around(
+        buffer: WrappingBuffer,
+        camera_data_pos: tuple[float, float, float],
+        size: tuple[int, int, int],
+    ) -> Roi:
+        return Roi(
+            offset=SubVolume._logical_offset_around(buffer, camera_data_pos, size),
+            shape=size,
+        )
+
+    @staticmethod
+    def _logical_offset_around(
+        buffer: WrappingBuffer,
+        camera_data_pos: tuple[float, float, float],
+        size: tuple[int, int, int],
+    ) -> tuple[int, int, int]:
+        # camera_data_pos is in C/numpy style (x, y, z) and in pixels of the base scale
+        # noinspection PyTypeChecker
+        return tuple(
+            # c * f = camera position for a scale factor f
+            # s // 2 = half the size of the buffer in pixels
+            # size is already scaled to the buffer, which is why we don't need to multiply by f
+            # size and scale_factor are already in C/numpy style (x, y, z)
+            int(c * f - s // 2)
+            for c, s, f in zip(camera_data_pos, size, buffer.scale_factor)
+        )
+
+    @staticmethod
+    def _logical_roi_key(
+        buffer: WrappingBuffer,
+        camera_data_pos: tuple[float, float, float],
+        size: tuple[int, int, int],
+    ) -> tuple[tuple[int, int], ...]:
+        # the wrapping buffer grows the roi to the chunks it touches, so two rois that start and end in the same
+        # chunks are requested the same way. this is the first and last chunk (and the size) of the roi on each axis.
+        offset = SubVolume._logical_offset_around(buffer, camera_data_pos, size)
+        return tuple(
+            (o // c, (o + s - 1) // c, s)
+            for o, s, c in zip(offset, size, buffer.chunk_shape_in_pixels)
+        )
+
+    def _prefetch(
+        self,
+        camera_data_pos: tuple[float, float, float],
+        sizes: list[tuple[int, int, int]],
+    ):
+        if self.prefetch_horizon_in_seconds is not None:
+            # the same for every scale
+            displacement = self.camera_trajectory.predict_displacement(
+                horizon_in_seconds=self.prefetch_horizon_in_seconds
+            )
+        for buffer, size in zip(self.wrapping_buffers, sizes):
+            if self.prefetch_horizon_in_chunks is not None:
+                # look the same number of chunks ahead at every scale. chunk shapes are in the pixels of
+                # each scale, so we convert them back into pixels of the base scale.
+                displacement = self.camera_trajectory.predict_displacement(
+                    horizon_in_pixels=tuple(
+                        self.prefetch_horizon_in_chunks * c / f
+                        for c, f in zip(
+                            buffer.chunk_shape_in_pixels, buffer.scale_factor
+                        )
+                    )
+                )
+            if not np.any(displacement):
+                continue
+            predicted_pos = tuple(np.asarray(camera_data_pos) + displacement)
+            predicted_roi = self._logical_roi_around(buffer, predicted_pos, size)
+            buffer.prefetch_logical_roi(
+                predicted_roi,
+                self._prefetch_executor,
+                max_in_flight=MAX_PREFETCHES_IN_FLIGHT_PER_SCALE,
+            )
 
     def _get_bounds_from_geometry(self):
         if self._bounds_geometry is not None:
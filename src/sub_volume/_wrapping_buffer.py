@@ -1,9 +1,27 @@
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, Future
+from itertools import product
+
 import numpy as np
 import numpy.typing as npt
 import pygfx as gfx
-import tensorstore as ts
 from funlib.geometry import Coordinate, Roi
 
+from ._chunk_cache import ChunkCache
+from ._chunk_source import ChunkSource, SourceRead, as_chunk_source
+from ._label_table import CompactLabels, LabelTable
+from ._load_stats import ScaleLoadStats
+from ._roi_array import (
+    box_chunks,
+    box_to_roi,
+    chunks_in_box,
+    roi_to_box,
+    roi_to_slices,
+    subtract_boxes,
+    wrap_box,
+)
+
 
 class WrappingBuffer:
     """
@@ -15,46 +33,118 @@ class WrappingBuffer:
     uniform_type = {
         "current_logical_offset_in_pixels": "3xi4",
         "current_logical_shape_in_pixels": "3xi4",
+        "chunk_shape_in_pixels": "3xi4",
         "scale_factor": "3xf4",
     }
 
     def __init__(
         self,
-        backing_data: npt.NDArray,
-        segmentations: npt.NDArray,
+        backing_data: npt.NDArray | ChunkSource,
+        segmentations: npt.NDArray | ChunkSource | None,
         shape_in_chunks: tuple[int, int, int] | Coordinate,
         chunk_shape_in_pixels: tuple[int, int, int] | Coordinate = None,
         scale_factor: tuple[float, float, float] = (1.0, 1.0, 1.0),
+        executor: Executor | None = None,
+        chunk_cache: ChunkCache | None = None,
+        scale_index: int = 0,
+        label_table: LabelTable | None = None,
     ):
         """
         Args:
-            backing_data (npt.NDArray):
-                The source data (numpy or zarr).
-            segmentations (npt.NDArray):
-                The segmentation data (numpy or zarr).
+            backing_data (npt.NDArray or ChunkSource):
+                The source data (numpy, zarr, TensorStore, or any ChunkSource).
+            segmentations (npt.NDArray or ChunkSource or None):
+                The segmentation data (numpy, zarr, TensorStore, or any ChunkSource), or None if this level has no
+                segmentations. Without segmentations, no segmentation texture is allocated and only the backing
+                data is read.
             shape_in_chunks (tuple[int, int, int] or Coordinate):
                 The shape of the wrapping buffer in chunks.
             chunk_shape_in_pixels (tuple[int, int, int] or Coordinate, optional):
-                The shape of a chunk in pixels. If not provided, it will be inferred from the backing array.
+                The shape of a chunk in pixels. If not provided, the chunk shape of the backing data is used.
             scale_factor (tuple[float, float, float] or Coordinate, optional):
                 The scale factor for this level relative to the base resolution. Defaults to (1.0, 1.0, 1.0).
+            executor (Executor, optional):
+                An executor to read chunks on. If provided, reads happen in the background and are only written
+                to the textures when commit_loads is called. If not provided, chunks are loaded synchronously.
+            chunk_cache (ChunkCache, optional):
+                A host-side cache to keep decoded chunks in after they leave the buffer. If not provided, every
+                load reads from the backing data.
+            scale_index (int, optional):
+                The scale level of this buffer. This keeps chunks from different scales apart in a shared
+                chunk_cache. Defaults to 0.
+            label_table (LabelTable, optional):
+                If provided, the segmentation texture holds compact indices from this table instead of the label
+                ids. The ids are compacted as chunks are written to the texture, so reads (and the chunk cache)
+                keep the full ids.
         """  # noqa: D205
         # D205 mistakes "Args:" as a summary
         self.backing_data = backing_data
         self.segmentations = segmentations
+        # every read goes through these, so the rest of the buffer doesn't care what kind of array it reads from
+        self.data_source = as_chunk_source(backing_data)
+        self.segmentations_source = (
+            None if segmentations is None else as_chunk_source(segmentations)
+        )
+        if chunk_shape_in_pixels is None:
+            chunk_shape_in_pixels = self.data_source.chunk_shape
+            if chunk_shape_in_pixels is None:
+                raise ValueError(
+                    "chunk_shape_in_pixels is required for backing data that isn't chunked"
+                )
         self.shape_in_chunks = Coordinate(shape_in_chunks)
         self.chunk_shape_in_pixels = Coordinate(chunk_shape_in_pixels)
         self.shape_in_pixels = self.shape_in_chunks * self.chunk_shape_in_pixels
 
+        # the textures keep the source dtype wherever the shader can normalize it (see SubVolumeShader), so uint8
+        # data takes a quarter of the host memory, uploads, and GPU memory that float32 would.
+        self.texture_dtype = texture_dtype(self.data_source.dtype)
+        self.label_table = label_table
+        if segmentations is None:
+            self.segmentations_texture_dtype = None
+            self._segmentations_read_dtype = None
+        elif label_table is not None:
+            self.segmentations_texture_dtype = label_table.index_dtype
+            self._segmentations_read_dtype = self.segmentations_source.dtype
+        else:
+            self.segmentations_texture_dtype = segmentations_texture_dtype(
+                self.segmentations_source.dtype
+            )
+            self._segmentations_read_dtype = self.segmentations_texture_dtype
+        # the compact label indices held by each slot of the buffer, keyed by buffer chunk coordinate
+        self._slot_label_indices: dict[tuple[int, int, int], npt.NDArray] = {}
+
         # noinspection PyTypeChecker
         self.texture = gfx.Texture(
-            data=np.zeros(self.shape_in_pixels, np.float32),
+            data=np.zeros(self.shape_in_pixels, self.texture_dtype),
             dim=3,
         )
 
+        # pygfx maps uint8 to a normalized format by default, but the shader needs the integer ids
+        if segmentations is not None:
+            # noinspection PyTypeChecker
+            self.segmentations_texture = gfx.Texture(
+                data=np.zeros(self.shape_in_pixels, self.segmentations_texture_dtype),
+                dim=3,
+                format=f"r{self.segmentations_texture_dtype.itemsize * 8}uint",
+            )
+        else:
+            self.segmentations_texture = None
+
+        # which logical chunk each slot of the buffer currently holds, so the shader can tell whether a slot has
+        # been written yet. each texel is the logical chunk coordinate in (z, y, x) order like all the other
+        # shader coordinates, and a w of 1 if the slot holds a chunk at all.
         # noinspection PyTypeChecker
-        self.segmentations_texture = gfx.Texture(
-            data=np.zeros(self.shape_in_pixels, np.uint32),
+        self.residency_texture = gfx.Texture(
+            data=np.zeros((*self.shape_in_chunks, 4), np.int32),
+            dim=3,
+        )
+
+        # the (min, max) intensity of the chunk in each slot, in the units of the source data. the ray marcher
+        # uses this to skip over chunks that can't reach the lmip threshold. it is only meaningful for slots that
+        # the residency texture marks as resident.
+        # noinspection PyTypeChecker
+        self.occupancy_texture = gfx.Texture(
+            data=np.zeros((*self.shape_in_chunks, 2), np.float32),
             dim=3,
         )
 
@@ -63,11 +153,36 @@ class WrappingBuffer:
         self.uniform_buffer = gfx.Buffer(
             gfx.utils.array_from_shadertype(self.uniform_type), force_contiguous=True
         )
+        # uniform backed properties only write to the host copy of the uniform buffer, which commit_uniforms
+        # uploads. a new buffer is uploaded in full anyway, so there is nothing to commit yet.
+        self._uniforms_dirty = False
 
+        self.executor = executor
+        self.chunk_cache = chunk_cache
+        self.scale_index = scale_index
+        # loading statistics, if someone is collecting them (see SubVolume.collect_load_stats). this is None
+        # otherwise, so that loading without stats only pays for a few None checks.
+        self.stats: ScaleLoadStats | None = None
+        # chunk cache keys that are currently being read by prefetch_logical_roi
+        self._prefetching: set[tuple[int, tuple[int, int, int]]] = set()
+        # chunks that have been requested but not read yet. this is a dict so that it keeps its order.
+        self._pending_chunks: dict[tuple[int, int, int], None] = {}
+        # chunks that have been submitted to the executor but not written to the textures yet
+        self._reading: dict[tuple[int, int, int], Future | ChunkRead] = {}
+
+        # the current logical rois are what we have asked the buffer to hold, while the committed
+        # logical roi is the part of it that has been completely written to the textures.
+        # when loading synchronously, these are always the same. the shader samples anywhere in the
+        # current logical roi, and relies on the residency texture to skip chunks that aren't there yet.
+        self._committed_logical_roi_in_pixels: Roi | None = None
+        self._current_logical_roi_in_chunks: Roi | None = None
         # this will fill our uniform buffer with data
         self._current_logical_roi_in_pixels = None
-        self._current_logical_roi_in_chunks: Roi | None = None
         self.scale_factor = tuple(float(x) for x in scale_factor)
+        self.uniform_buffer.data["chunk_shape_in_pixels"] = np.array(
+            self.chunk_shape_in_pixels
+        ).astype(int)[::-1]
+        self._uniforms_dirty = False
 
     @property
     def _current_logical_roi_in_pixels(self) -> Roi | None:
@@ -81,20 +196,22 @@ class WrappingBuffer:
         # all assume numpy/C style indexing (x, y, z). we pass the dimensions in Fortran
         # style to the shader so the shader completely operates in Fortran style.
         if value is not None:
-            self.uniform_buffer.data["current_logical_offset_in_pixels"] = np.array(
-                value.offset
-            ).astype(int)[::-1]
-            self.uniform_buffer.data["current_logical_shape_in_pixels"] = np.array(
-                value.shape
-            ).astype(int)[::-1]
+            offset = np.array(value.offset).astype(int)[::-1]
+            shape = np.array(value.shape).astype(int)[::-1]
         else:
-            self.uniform_buffer.data["current_logical_offset_in_pixels"] = np.array(
-                (0, 0, 0)
-            ).astype(int)[::-1]
-            self.uniform_buffer.data["current_logical_shape_in_pixels"] = np.array(
-                (0, 0, 0)
-            ).astype(int)[::-1]
-        self.uniform_buffer.update_full()
+            offset = np.array((0, 0, 0)).astype(int)[::-1]
+            shape = np.array((0, 0, 0)).astype(int)[::-1]
+        # the same roi is usually requested frame after frame, and committing it again would make the volume look
+        # like it changed (see SubVolume.needs_redraw)
+        if np.array_equal(
+            self.uniform_buffer.data["current_logical_offset_in_pixels"], offset
+        ) and np.array_equal(
+            self.uniform_buffer.data["current_logical_shape_in_pixels"], shape
+        ):
+            return
+        self.uniform_buffer.data["current_logical_offset_in_pixels"] = offset
+        self.uniform_buffer.data["current_logical_shape_in_pixels"] = shape
+        self._uniforms_dirty = True
 
     @property
     def scale_factor(self) -> tuple[float, float, float]:
@@ -113,7 +230,24 @@ class WrappingBuffer:
         self.uniform_buffer.data["scale_factor"] = np.array(
             value[::-1], dtype=np.float32
         )
-        self.uniform_buffer.update_full()
+        self._uniforms_dirty = True
+
+    @property
+    def has_uncommitted_uniforms(self) -> bool:
+        """Whether uniforms were changed since the last commit_uniforms."""
+        return self._uniforms_dirty
+
+    def commit_uniforms(self):
+        """
+        Upload the uniform changes made since the last call, all at once.
+
+        Uniform backed properties only write to the host copy of the uniform buffer, so a logical roi that is
+        requested several times a frame is uploaded once. SubVolume calls this once per frame, right before the
+        volume is drawn.
+        """
+        if self._uniforms_dirty:
+            self.uniform_buffer.update_full()
+            self._uniforms_dirty = False
 
     def get_snapped_roi_in_pixels(self, logical_roi_in_pixels: Roi) -> Roi:
         """
@@ -128,11 +262,8 @@ class WrappingBuffer:
                 A snapped Roi in pixels that is aligned with the chunk grid.
 
         """
-        data_shape = self.backing_data.shape
-        data_roi_shape_in_pixels = Roi((0, 0, 0), data_shape)
-
         intersected_roi_in_pixels = logical_roi_in_pixels.intersect(
-            data_roi_shape_in_pixels
+            self.data_roi_in_pixels
         )
         if intersected_roi_in_pixels.empty:
             return intersected_roi_in_pixels
@@ -161,6 +292,33 @@ class WrappingBuffer:
         """
         Update the buffer to contain all chunks that intersect with the volume and the given logical Roi.
 
+        This requests the Roi and then loads every pending chunk. TensorStore reads are all issued before waiting
+        on any of them. If the buffer has an executor, the chunks are only submitted for reading and still need to
+        be committed with commit_loads.
+
+        Args:
+            logical_roi_in_pixels (Roi):
+                A logical Roi in pixels that is within the bounds of the backing data.
+                This Roi may not be larger than the buffer Roi, but it may cross buffer boundaries.
+
+        """
+        self.request_logical_roi(logical_roi_in_pixels)
+        for chunk_coordinate in self.pending_chunks:
+            if self.reads_concurrently:
+                self.submit_chunk(chunk_coordinate)
+            else:
+                self.load_chunk(chunk_coordinate)
+        # without an executor, nobody else is going to wait for the reads we started here. otherwise, we commit
+        # anything that has already finished reading.
+        self.commit_loads(wait=self.executor is None)
+
+    def request_logical_roi(self, logical_roi_in_pixels: Roi):
+        """
+        Set the logical Roi the buffer should contain and queue up the chunks that need to be loaded for it.
+
+        No data is read here. The queued chunks are listed in pending_chunks and can be loaded in any order with
+        load_chunk or submit_chunk. Queued chunks that are no longer part of the logical Roi are dropped.
+
         Args:
             logical_roi_in_pixels (Roi):
                 A logical Roi in pixels that is within the bounds of the backing data.
@@ -175,23 +333,160 @@ class WrappingBuffer:
         # snapped_roi and logical_roi_in_chunks now represent the final region to be loaded
         # we don't assign to the current_rois though because we need still need to do a comparison
 
+        logical_box = roi_to_box(logical_roi_in_chunks)
         if self._current_logical_roi_in_chunks is None:
-            to_load = [logical_roi_in_chunks]
+            to_load = logical_box[np.newaxis]
         else:
-            to_load = subtract_rois(
-                logical_roi_in_chunks, self._current_logical_roi_in_chunks
+            to_load = subtract_boxes(
+                logical_box, roi_to_box(self._current_logical_roi_in_chunks)
             )
 
         # now we can update the current_rois
         self._current_logical_roi_in_pixels = snapped_roi
         self._current_logical_roi_in_chunks = logical_roi_in_chunks
 
-        for logical_roi_in_chunks in to_load:
-            for (
-                buffer_roi_in_chunks,
-                logical_roi_in_chunks,
-            ) in self.wrap_logical_roi_into_buffer_rois(logical_roi_in_chunks):
-                self.load_into_buffer(buffer_roi_in_chunks, logical_roi_in_chunks)
+        # chunks we haven't gotten to yet might not be needed anymore. we need to drop these since their slot in
+        # the buffer might now belong to a different chunk.
+        if self._pending_chunks:
+            pending = np.array(list(self._pending_chunks), dtype=np.int64)
+            still_needed = pending[chunks_in_box(pending, logical_box)]
+            self._pending_chunks = dict.fromkeys(map(tuple, still_needed.tolist()))
+        chunks_to_load = box_chunks(to_load)
+        self._pending_chunks.update(dict.fromkeys(map(tuple, chunks_to_load.tolist())))
+        if self.stats is not None:
+            self.stats.add(chunks_requested=len(chunks_to_load), sub_rois=len(to_load))
+
+        # only the part of the committed roi that we are keeping is still valid. everything else is either
+        # about to be overwritten or was never loaded in the first place.
+        if self._committed_logical_roi_in_pixels is not None:
+            still_valid = self._committed_logical_roi_in_pixels.intersect(snapped_roi)
+            self._committed_logical_roi_in_pixels = (
+                None if still_valid.empty else still_valid
+            )
+        # if there is nothing left to load, we can show the whole roi right away
+        self._update_committed_logical_roi()
+
+    @property
+    def pending_chunks(self) -> list[tuple[int, int, int]]:
+        """The logical chunk coordinates that have been requested but not loaded or submitted yet."""
+        return list(self._pending_chunks)
+
+    @property
+    def has_pending_loads(self) -> bool:
+        """Whether there are chunks that have been requested but not committed to the textures yet."""
+        return len(self._pending_chunks) > 0 or len(self._reading) > 0
+
+    @property
+    def backlog_in_chunks(self) -> int:
+        """The number of requested chunks that have not been committed to the textures yet."""
+        return len(self._pending_chunks) + len(self._reading)
+
+    @property
+    def reads_in_flight(self) -> int:
+        """The number of chunks that have been submitted to the executor but not committed yet."""
+        return len(self._reading)
+
+    @property
+    def reads_concurrently(self) -> bool:
+        """Whether submitted chunks are read in the background, either on the executor or by the sources."""
+        return self.executor is not None or (
+            self.data_source.reads_concurrently
+            and (
+                self.segmentations_source is None
+                or self.segmentations_source.reads_concurrently
+            )
+        )
+
+    @property
+    def submitted_chunks(self) -> list[tuple[int, int, int]]:
+        """The logical chunk coordinates that have been submitted but not committed yet."""
+        return list(self._reading)
+
+    @property
+    def finished_chunks(self) -> list[tuple[int, int, int]]:
+        """The logical chunk coordinates that have finished reading in the background and can be committed."""
+        return [
+            chunk_coordinate
+            for chunk_coordinate, future in self._reading.items()
+            if future.done()
+        ]
+
+    def load_chunk(self, chunk_coordinate: tuple[int, int, int]) -> int:
+        """
+        Read a pending chunk and write it into the textures right away.
+
+        Args:
+            chunk_coordinate (tuple[int, int, int]):
+                The logical chunk coordinate of a pending chunk.
+
+        Returns:
+            The number of bytes written to the textures.
+
+        """
+        del self._pending_chunks[chunk_coordinate]
+        nbytes = self.load_into_buffer(
+            Roi(self._buffer_chunk_coordinate(chunk_coordinate), (1, 1, 1)),
+            Roi(chunk_coordinate, (1, 1, 1)),
+        )
+        self._update_committed_logical_roi()
+        return nbytes
+
+    def submit_chunk(self, chunk_coordinate: tuple[int, int, int]):
+        """
+        Start reading a pending chunk. It will be written to the textures by commit_chunk.
+
+        The chunk is read on the executor if there is one. Otherwise, the read is started with start_read_chunk,
+        which only runs in the background for sources that support it (see reads_concurrently).
+
+        Args:
+            chunk_coordinate (tuple[int, int, int]):
+                The logical chunk coordinate of a pending chunk.
+
+        """
+        del self._pending_chunks[chunk_coordinate]
+        if self.executor is not None:
+            self._reading[chunk_coordinate] = self.executor.submit(
+                self.read_chunk, chunk_coordinate
+            )
+        else:
+            self._reading[chunk_coordinate] = self.start_read_chunk(chunk_coordinate)
+
+    def commit_chunk(self, chunk_coordinate: tuple[int, int, int]) -> int:
+        """
+        Write a chunk that was submitted with submit_chunk into the textures, waiting for its read if needed.
+
+        Args:
+            chunk_coordinate (tuple[int, int, int]):
+                The logical chunk coordinate of a submitted chunk.
+
+        Returns:
+            The number of bytes written to the textures.
+
+        """
+        future = self._reading.pop(chunk_coordinate)
+        nbytes = self.write_chunk(chunk_coordinate, future.result())
+        self._update_committed_logical_roi()
+        return nbytes
+
+    def commit_loads(self, wait: bool = False):
+        """
+        Write finished background reads into the textures.
+
+        Once every requested chunk has been written, the committed logical Roi catches up with the current
+        logical Roi.
+
+        Args:
+            wait (bool):
+                If True, block until every submitted read has finished and been committed.
+
+        """
+        for chunk_coordinate in list(self._reading) if wait else self.finished_chunks:
+            self.commit_chunk(chunk_coordinate)
+        self._update_committed_logical_roi()
+
+    def _update_committed_logical_roi(self):
+        if not self.has_pending_loads:
+            self._committed_logical_roi_in_pixels = self._current_logical_roi_in_pixels
 
     def wrap_logical_roi_into_buffer_rois(
         self, logical_roi_in_chunks: Roi
@@ -220,55 +515,23 @@ class WrappingBuffer:
                 f"Logical ROI shape {logical_roi_in_chunks.shape} cannot be larger than buffer shape {self.shape_in_chunks} in any dimension"
             )
 
-        if logical_roi_in_chunks.empty:
-            return []
-
-        from itertools import product
-
-        offset = logical_roi_in_chunks.offset
-        shape = logical_roi_in_chunks.shape
-        end = tuple(o + s for o, s in zip(offset, shape))
-        grid_shape = tuple(self.shape_in_chunks)
-        grid_offset = tuple(0 for _ in grid_shape)  # buffer always starts at 0
-
-        # For each dimension, find the points to split at (start, optional interior boundary, end)
-        split_coords = []
-        for d in range(len(offset)):
-            start = offset[d]
-            stop = end[d]
-            buffer = grid_shape[d]
-            # Compute first boundary after start
-            # The buffer is periodic, so boundaries are at multiples of buffer
-            # Find the first boundary after start
-            if buffer == 0:
-                split_coords.append([start, stop])
-                continue
-            boundary = ((start - grid_offset[d]) // buffer + 1) * buffer + grid_offset[
-                d
-            ]
-            if boundary < stop:
-                split_coords.append([start, boundary, stop])
-            else:
-                split_coords.append([start, stop])
-
-        # Now make all sub-ROIs from the split coordinates
-        result = []
-        for corner in product(*[range(len(s) - 1) for s in split_coords]):
-            sub_offset = tuple(split_coords[d][i] for d, i in enumerate(corner))
-            sub_end = tuple(split_coords[d][i + 1] for d, i in enumerate(corner))
-            sub_shape = tuple(e - o for o, e in zip(sub_offset, sub_end))
-            if any(s == 0 for s in sub_shape):
-                continue
-            logical_subroi = Roi(sub_offset, sub_shape)
-            buffer_offset = tuple((o % s) for o, s in zip(sub_offset, grid_shape))
-            buffer_roi = Roi(buffer_offset, sub_shape)
-            result.append((buffer_roi, logical_subroi))
-        return result
+        buffer_boxes, logical_boxes = wrap_box(
+            roi_to_box(logical_roi_in_chunks), tuple(self.shape_in_chunks)
+        )
+        return [
+            (box_to_roi(buffer_box), box_to_roi(logical_box))
+            for buffer_box, logical_box in zip(buffer_boxes, logical_boxes)
+        ]
 
-    def load_into_buffer(self, buffer_roi_in_chunks: Roi, logical_roi_in_chunks: Roi):
+    def load_into_buffer(
+        self, buffer_roi_in_chunks: Roi, logical_roi_in_chunks: Roi
+    ) -> int:
         """
         Load a section of the data into the buffer.
 
+        Without a chunk cache, nothing else needs a copy of the data, so it is read straight into the textures'
+        host memory with read_into_buffer.
+
         Args:
             buffer_roi_in_chunks (Roi):
                 A buffer Roi in chunk coordinates that is within the bounds of the buffer.
@@ -278,100 +541,668 @@ class WrappingBuffer:
                 This Roi MUST intersect with the backing data, and it MAY be partially outside the bounds of the
                 backing data. It MUST NOT cross any buffer boundaries and MUST NOT be larger than the buffer Roi.
 
+        Returns:
+            The number of bytes written to the textures.
+
+        """
+        if self.chunk_cache is None:
+            return self.write_into_buffer(
+                buffer_roi_in_chunks,
+                self.read_into_buffer(buffer_roi_in_chunks, logical_roi_in_chunks),
+                staged=True,
+            )
+        return self.write_into_buffer(
+            buffer_roi_in_chunks, self.read_logical_roi(logical_roi_in_chunks)
+        )
+
+    def read_into_buffer(
+        self, buffer_roi_in_chunks: Roi, logical_roi_in_chunks: Roi
+    ) -> tuple[Roi, npt.NDArray, npt.NDArray] | None:
+        """
+        Read a section of the backing data straight into the textures' host memory, converted to the texture dtypes.
+
+        The sources read into the textures without any intermediate arrays, converting while they read if the
+        dtypes differ. Segmentations that need to be compacted with a label table are
+        still read into a separate array and compacted into CompactLabels. The result has to be passed to write_into_buffer with staged=True, which records residency
+        and occupancy and schedules the uploads. This writes to the textures, so it must not be called from a
+        background thread.
+
+        Args:
+            buffer_roi_in_chunks (Roi):
+                A buffer Roi in chunk coordinates that is within the bounds of the buffer.
+            logical_roi_in_chunks (Roi):
+                A logical Roi in chunk coordinates corresponding to the buffer_roi_in_chunks, like for
+                load_into_buffer.
+
+        Returns:
+            The same as read_logical_roi, except that the data (and segmentations, without a label table) are
+            views of the textures' data.
+
         """
-        # Convert both ROIs to pixel space
-        buffer_roi_in_pixels = buffer_roi_in_chunks * self.chunk_shape_in_pixels
         logical_roi_in_pixels = logical_roi_in_chunks * self.chunk_shape_in_pixels
+        if logical_roi_in_pixels.empty:
+            return None
+        loadable_logical_roi_in_pixels = self.data_roi_in_pixels.intersect(
+            logical_roi_in_pixels
+        )
+        if loadable_logical_roi_in_pixels.empty:
+            return None
 
-        # Helper to ensure all indices are ints
-        def roi_to_slices(roi):
-            return tuple(
-                slice(int(o), int(o) + int(s)) for o, s in zip(roi.offset, roi.shape)
+        # like write_into_buffer, the data goes to the start of the buffer Roi
+        dst_slices = roi_to_slices(
+            Roi(
+                buffer_roi_in_chunks.offset * self.chunk_shape_in_pixels,
+                loadable_logical_roi_in_pixels.shape,
             )
+        )
+        return self._start_read_roi_in_pixels(
+            loadable_logical_roi_in_pixels,
+            data_out=self.texture.data[dst_slices],
+            segmentation_out=self.segmentations_texture.data[dst_slices]
+            if self.has_segmentations and self.label_table is None
+            else None,
+        ).result()
+
+    def read_logical_roi(
+        self, logical_roi_in_chunks: Roi
+    ) -> tuple[Roi, npt.NDArray, npt.NDArray] | None:
+        """
+        Read a section of the backing data and segmentations, converted to the texture dtypes.
+
+        This does not touch the textures, so it is safe to call from a background thread.
+
+        Args:
+            logical_roi_in_chunks (Roi):
+                A logical Roi in chunk coordinates. It MAY be partially outside the bounds of the backing data.
+
+        Returns:
+            A tuple (roi, data, segmentations) where roi is the logical Roi in pixels that was actually read, or
+            None if nothing could be read. segmentations is None if the buffer has no segmentations, and
+            CompactLabels if the buffer has a label table.
+
+        """
+        logical_roi_in_pixels = logical_roi_in_chunks * self.chunk_shape_in_pixels
 
         # Check for empty ROI
-        if logical_roi_in_pixels.empty or buffer_roi_in_pixels.empty:
-            return
+        if logical_roi_in_pixels.empty:
+            return None
 
         # Ensure we are only loading the portion within the backing data
-        loadable_logical_roi_in_pixels = Roi(
-            shape=self.backing_data.shape, offset=(0, 0, 0)
-        ).intersect(logical_roi_in_pixels)
+        loadable_logical_roi_in_pixels = self.data_roi_in_pixels.intersect(
+            logical_roi_in_pixels
+        )
         if loadable_logical_roi_in_pixels.empty:
-            return
+            return None
+
+        if self.chunk_cache is None:
+            return self._start_read_roi_in_pixels(
+                loadable_logical_roi_in_pixels
+            ).result()
+
+        # with a cache, we go chunk by chunk so that revisited chunks only cost a copy
+        data = np.empty(loadable_logical_roi_in_pixels.shape, self.texture_dtype)
+        if not self.has_segmentations:
+            segmentation_data = None
+        elif self.label_table is not None:
+            # the chunks are compacted as they are read, so we only have to collect them
+            segmentation_data = CompactLabels(loadable_logical_roi_in_pixels.shape, [])
+        else:
+            segmentation_data = np.empty(
+                loadable_logical_roi_in_pixels.shape, self._segmentations_read_dtype
+            )
+        chunk_reads = [
+            self.start_read_chunk(chunk_coordinate)
+            for chunk_coordinate in chunk_coordinates(logical_roi_in_chunks)
+        ]
+        for chunk_read in chunk_reads:
+            chunk_result = chunk_read.result()
+            if chunk_result is None:
+                continue
+            chunk_roi_in_pixels, chunk_data, chunk_segmentation_data = chunk_result
+            dst_slices = roi_to_slices(
+                chunk_roi_in_pixels - loadable_logical_roi_in_pixels.offset
+            )
+            data[dst_slices] = chunk_data
+            if isinstance(segmentation_data, CompactLabels):
+                segmentation_data.chunks.extend(
+                    chunk_segmentation_data.shifted(
+                        chunk_roi_in_pixels.offset
+                        - loadable_logical_roi_in_pixels.offset
+                    )
+                )
+            elif segmentation_data is not None:
+                segmentation_data[dst_slices] = chunk_segmentation_data
+
+        return loadable_logical_roi_in_pixels, data, segmentation_data
+
+    def read_chunk(
+        self, chunk_coordinate: tuple[int, int, int]
+    ) -> tuple[Roi, npt.NDArray, npt.NDArray] | None:
+        """
+        Read a single chunk, converted to the texture dtypes.
+
+        This does not touch the textures, so it is safe to call from a background thread.
+
+        Args:
+            chunk_coordinate (tuple[int, int, int]):
+                The logical chunk coordinate to read.
+
+        Returns:
+            The same as read_logical_roi for a Roi of one chunk.
+
+        """
+        return self.start_read_chunk(chunk_coordinate).result()
+
+    def start_read_chunk(self, chunk_coordinate: tuple[int, int, int]) -> "ChunkRead":
+        """
+        Start reading a single chunk without waiting for the read to finish.
+
+        Sources that read concurrently (like TensorStore) only issue the read, so many chunks can wait on storage
+        at the same time. Other sources are read right away. Chunks in the chunk cache are served from the cache,
+        and chunks that are read are added to it once the read finishes.
+
+        Args:
+            chunk_coordinate (tuple[int, int, int]):
+                The logical chunk coordinate to read.
+
+        Returns:
+            A ChunkRead whose result is the same as read_chunk.
+
+        """
+        chunk_roi_in_pixels = self.data_roi_in_pixels.intersect(
+            Roi(chunk_coordinate, (1, 1, 1)) * self.chunk_shape_in_pixels
+        )
+        if chunk_roi_in_pixels.empty:
+            return ChunkRead(None)
+        if self.chunk_cache is None:
+            return self._start_read_roi_in_pixels(chunk_roi_in_pixels)
+
+        key = (self.scale_index, chunk_coordinate)
+        cached = self.chunk_cache.get(key)
+        if cached is not None:
+            if self.stats is not None:
+                self.stats.add(chunks_hit=1)
+            return ChunkRead(
+                chunk_roi_in_pixels,
+                *cached,
+                dtypes=self._read_dtypes,
+                label_chunk_shape=self._label_chunk_shape,
+            )
+        return self._start_read_roi_in_pixels(
+            chunk_roi_in_pixels,
+            on_result=lambda result: self.chunk_cache.put(key, result[1:]),
+        )
+
+    def prefetch_logical_roi(
+        self,
+        logical_roi_in_pixels: Roi,
+        executor: Executor,
+        max_in_flight: int | None = None,
+    ) -> int:
+        """
+        Read the chunks of a logical Roi that we are about to need into the chunk cache.
+
+        Chunks that are already in the buffer, already cached, or already being prefetched are skipped. This never
+        touches the textures, so a later load_logical_roi of the same Roi only has to copy from the cache.
+
+        Args:
+            logical_roi_in_pixels (Roi):
+                A logical Roi in pixels that we expect to load soon.
+            executor (Executor):
+                The executor to read the chunks on.
+            max_in_flight (int, optional):
+                If provided, stop submitting once this many prefetches of this buffer are being read. If not
+                provided, every chunk is submitted.
+
+        Returns:
+            The number of chunks that were submitted for prefetching.
+
+        """
+        if self.chunk_cache is None:
+            raise RuntimeError("prefetching requires a chunk_cache")
+        snapped_roi = self.get_snapped_roi_in_pixels(logical_roi_in_pixels)
+        if snapped_roi.empty:
+            return 0
+        logical_roi_in_chunks = snapped_roi / self.chunk_shape_in_pixels
+        logical_box = roi_to_box(logical_roi_in_chunks)
+        if self._current_logical_roi_in_chunks is None:
+            to_prefetch = logical_box[np.newaxis]
+        else:
+            to_prefetch = subtract_boxes(
+                logical_box, roi_to_box(self._current_logical_roi_in_chunks)
+            )
+
+        submitted = 0
+        for chunk_coordinate in map(tuple, box_chunks(to_prefetch).tolist()):
+            if max_in_flight is not None and len(self._prefetching) >= max_in_flight:
+                break
+            key = (self.scale_index, chunk_coordinate)
+            if key in self.chunk_cache or key in self._prefetching:
+                continue
+            self._prefetching.add(key)
+            executor.submit(self._prefetch_chunk, chunk_coordinate)
+            submitted += 1
+        return submitted
+
+    def _prefetch_chunk(self, chunk_coordinate: tuple[int, int, int]):
+        try:
+            self.read_chunk(chunk_coordinate)
+        finally:
+            self._prefetching.discard((self.scale_index, chunk_coordinate))
+
+    @property
+    def resources(self) -> list[gfx.Resource]:
+        """The textures and uniform buffer the shader reads from this buffer."""
+        resources = [
+            self.uniform_buffer,
+            self.texture,
+            self.residency_texture,
+            self.occupancy_texture,
+        ]
+        if self.has_segmentations:
+            resources.append(self.segmentations_texture)
+        return resources
+
+    @property
+    def has_segmentations(self) -> bool:
+        """Whether this buffer holds segmentations next to its data."""
+        return self.segmentations_source is not None
+
+    @property
+    def _read_dtypes(self) -> tuple[np.dtype, np.dtype]:
+        return self.texture_dtype, self._segmentations_read_dtype
+
+    @property
+    def _label_chunk_shape(self) -> Coordinate | None:
+        # the shape of the chunks reads compact their segmentations in, if they are compacted
+        return self.chunk_shape_in_pixels if self.label_table is not None else None
+
+    @property
+    def data_roi_in_pixels(self) -> Roi:
+        """The Roi of the whole backing data in pixels."""
+        return Roi((0, 0, 0), self.data_source.shape)
+
+    def _start_read_roi_in_pixels(
+        self,
+        roi_in_pixels: Roi,
+        on_result: Callable[[tuple[Roi, npt.NDArray, npt.NDArray]], None] | None = None,
+        data_out: npt.NDArray | None = None,
+        segmentation_out: npt.NDArray | None = None,
+    ) -> "ChunkRead":
+        # roi_in_pixels must be within the bounds of the backing data. the reads go into data_out and
+        # segmentation_out if they are provided, which must already have the read dtypes.
+        read_started_at = None
+        bytes_read = None
+        if self.stats is not None:
+            read_started_at = time.perf_counter()
+            # the sources might convert while reading, so we count the bytes in the stored dtypes up front
+            bytes_read = roi_in_pixels.size * (
+                self.data_source.dtype.itemsize
+                + (
+                    self.segmentations_source.dtype.itemsize
+                    if self.has_segmentations
+                    else 0
+                )
+            )
+            self.stats.add(
+                chunks_missed=(
+                    roi_in_pixels.snap_to_grid(self.chunk_shape_in_pixels, mode="grow")
+                    / self.chunk_shape_in_pixels
+                ).size
+            )
+        # we only start the reads here and wait for them in ChunkRead, so the data and segmentation reads (and
+        # reads of other chunks) can be in flight at the same time with sources that read concurrently
+        data = start_source_read(
+            self.data_source, roi_in_pixels, self.texture_dtype, data_out
+        )
+        if self.has_segmentations:
+            segmentation_data = start_source_read(
+                self.segmentations_source,
+                roi_in_pixels,
+                self._segmentations_read_dtype,
+                segmentation_out,
+            )
+        else:
+            segmentation_data = None
+
+        return ChunkRead(
+            roi_in_pixels,
+            data,
+            segmentation_data,
+            on_result,
+            self._read_dtypes,
+            self.stats,
+            read_started_at,
+            bytes_read,
+            self._label_chunk_shape,
+        )
+
+    def write_chunk(
+        self,
+        chunk_coordinate: tuple[int, int, int],
+        read_result: tuple[Roi, npt.NDArray, npt.NDArray] | None,
+    ) -> int:
+        """
+        Write the result of read_chunk into the chunk's slot in the textures.
+
+        Chunks that are no longer part of the current logical Roi are skipped, since their slot in the buffer may
+        already belong to another chunk.
+
+        Args:
+            chunk_coordinate (tuple[int, int, int]):
+                The logical chunk coordinate that was read.
+            read_result (tuple[Roi, npt.NDArray, npt.NDArray] or None):
+                The result of read_chunk for chunk_coordinate.
+
+        Returns:
+            The number of bytes written to the textures.
+
+        """
+        if not self._current_logical_roi_in_chunks.contains(
+            Coordinate(chunk_coordinate)
+        ):
+            return 0
+        return self.write_into_buffer(
+            Roi(self._buffer_chunk_coordinate(chunk_coordinate), (1, 1, 1)),
+            read_result,
+        )
+
+    def _buffer_chunk_coordinate(
+        self, chunk_coordinate: tuple[int, int, int]
+    ) -> tuple[int, int, int]:
+        # the slot of the buffer a logical chunk wraps into
+        return tuple(c % s for c, s in zip(chunk_coordinate, self.shape_in_chunks))
+
+    def write_into_buffer(
+        self,
+        buffer_roi_in_chunks: Roi,
+        read_result: tuple[Roi, npt.NDArray, npt.NDArray] | None,
+        staged: bool = False,
+    ) -> int:
+        """
+        Write the result of read_logical_roi into the textures and schedule the texture uploads.
+
+        Args:
+            buffer_roi_in_chunks (Roi):
+                A buffer Roi in chunk coordinates that is within the bounds of the buffer.
+            read_result (tuple[Roi, npt.NDArray, npt.NDArray] or None):
+                The result of read_logical_roi for the logical Roi corresponding to buffer_roi_in_chunks.
+            staged (bool, optional):
+                Whether read_result comes from read_into_buffer, so the data is already in the textures and only
+                segmentations that need compacting are left to write. Defaults to False.
+
+        Returns:
+            The number of bytes written to the textures.
+
+        """
+        buffer_roi_in_pixels = buffer_roi_in_chunks * self.chunk_shape_in_pixels
+        if read_result is None or buffer_roi_in_pixels.empty:
+            return 0
+        loadable_logical_roi_in_pixels, data, segmentation_data = read_result
+        staging_started_at = time.perf_counter() if self.stats is not None else None
+
         # Shrink our destination Roi to match the shape
         actual_buffer_roi_in_pixels = Roi(
             offset=buffer_roi_in_pixels.offset,
             shape=loadable_logical_roi_in_pixels.shape,
         )
-        if isinstance(self.backing_data, ts.TensorStore):
-            src_slices = roi_to_slices(
-                loadable_logical_roi_in_pixels + Coordinate(self.backing_data.origin)
-            )
-        else:
-            src_slices = roi_to_slices(loadable_logical_roi_in_pixels)
         dst_slices = roi_to_slices(actual_buffer_roi_in_pixels)
 
-        # All the data here should be readable
-        data = self.backing_data[src_slices]
-        # we need to explicitly read the data if it's a tensorstore
-        if isinstance(data, ts.TensorStore):
-            data = data.read().result()
-        segmentation_data = self.segmentations[src_slices]
-        if isinstance(segmentation_data, ts.TensorStore):
-            segmentation_data = segmentation_data.read().result()
-
         # Write to both textures
-        self.texture.data[dst_slices] = np.array(data, dtype=np.float32)
-        self.texture.update_range(
-            actual_buffer_roi_in_pixels.offset, actual_buffer_roi_in_pixels.shape
-        )
+        if not staged:
+            self.texture.data[dst_slices] = data
+
+        segmentation_nbytes = 0
+        if self.has_segmentations:
+            if self.label_table is not None:
+                self._write_compact_labels(
+                    actual_buffer_roi_in_pixels, segmentation_data
+                )
+            elif not staged:
+                self.segmentations_texture.data[dst_slices] = segmentation_data
+            segmentation_nbytes = self.segmentations_texture.data[dst_slices].nbytes
 
-        self.segmentations_texture.data[dst_slices] = np.array(
-            segmentation_data, dtype=np.uint32
+        # the slots now hold the chunks we just read. this is uploaded together with the data, so the shader
+        # never sees a slot marked as resident before its data arrives. while we have the data at hand, we also
+        # record the intensity range of each chunk for empty space skipping.
+        logical_roi_in_chunks = (
+            loadable_logical_roi_in_pixels.snap_to_grid(
+                self.chunk_shape_in_pixels, mode="grow"
+            )
+            / self.chunk_shape_in_pixels
         )
-        self.segmentations_texture.update_range(
-            actual_buffer_roi_in_pixels.offset, actual_buffer_roi_in_pixels.shape
+        written_buffer_roi_in_chunks = Roi(
+            buffer_roi_in_chunks.offset, logical_roi_in_chunks.shape
         )
+        for slot, chunk_coordinate in zip(
+            chunk_coordinates(written_buffer_roi_in_chunks),
+            chunk_coordinates(logical_roi_in_chunks),
+        ):
+            self.residency_texture.data[slot] = (*chunk_coordinate[::-1], 1)
+            slot_roi_in_pixels = (
+                Roi(slot, (1, 1, 1)) * self.chunk_shape_in_pixels
+            ).intersect(actual_buffer_roi_in_pixels)
+            chunk_data = data[
+                roi_to_slices(slot_roi_in_pixels - actual_buffer_roi_in_pixels.offset)
+            ]
+            self.occupancy_texture.data[slot] = (chunk_data.min(), chunk_data.max())
+        staged_at = time.perf_counter() if self.stats is not None else None
 
+        update_texture_range(self.texture, actual_buffer_roi_in_pixels)
+        if self.has_segmentations:
+            update_texture_range(
+                self.segmentations_texture, actual_buffer_roi_in_pixels
+            )
+        update_texture_range(self.residency_texture, written_buffer_roi_in_chunks)
+        update_texture_range(self.occupancy_texture, written_buffer_roi_in_chunks)
+        nbytes = data.nbytes + segmentation_nbytes
+        if self.stats is not None:
+            self.stats.add(
+                chunks_uploaded=written_buffer_roi_in_chunks.size,
+                bytes_uploaded=nbytes,
+                staging_time_in_seconds=staged_at - staging_started_at,
+                update_range_time_in_seconds=time.perf_counter() - staged_at,
+            )
+        return nbytes
+
+    def _write_compact_labels(
+        self, buffer_roi_in_pixels: Roi, compact_labels: CompactLabels
+    ):
+        # the labels were already found where the segmentations were read, so all that is left is to swap them for
+        # their indices in the label table. we track the indices of every slot we write to, so the labels of the
+        # chunks we overwrite can be released.
+        for roi_in_pixels, labels, local_indices in compact_labels.chunks:
+            slot = tuple(
+                (buffer_roi_in_pixels.offset + roi_in_pixels.offset)
+                / self.chunk_shape_in_pixels
+            )
+            # acquire before releasing so that labels the old and new chunk share keep their index
+            indices = self.label_table.acquire(labels)
+            previous_indices = self._slot_label_indices.get(slot)
+            if previous_indices is not None:
+                self.label_table.release(previous_indices)
+            self._slot_label_indices[slot] = indices
+            self.segmentations_texture.data[
+                roi_to_slices(roi_in_pixels + buffer_roi_in_pixels.offset)
+            ] = indices[local_indices]
 
-def set_dim(coord: Coordinate, dim: int, value) -> Coordinate:
-    """Return a copy of coord with coord[dim] replaced by value."""
-    return Coordinate(*coord[:dim], value, *coord[dim + 1 :])
 
+class ChunkRead:
+    """
+    A read of a single chunk that might still be in progress.
 
-def subtract_rois(roi_a: Roi, roi_b: Roi) -> list[Roi]:
-    if roi_a.empty:
-        return []
-    if roi_b.empty or not roi_a.intersects(roi_b):
-        return [roi_a]
-
-    roi_b = roi_a.intersect(roi_b)
-    result = []
-
-    base_begin = roi_a.begin
-    base_end = roi_a.end
-
-    for d in range(roi_a.dims):
-        a0, a1 = roi_a.begin[d], roi_a.end[d]
-        b0, b1 = roi_b.begin[d], roi_b.end[d]
-
-        # Slab before B
-        if a0 < b0:
-            slab_begin = base_begin
-            slab_end = set_dim(base_end, d, b0)
-            result.append(
-                Roi(slab_begin, tuple(e - o for o, e in zip(slab_begin, slab_end)))
+    The data and segmentations are either arrays or SourceReads. This has the same done/result interface as a
+    concurrent.futures.Future, so reads on an executor and reads in the background of a source are committed the
+    same way.
+    """
+
+    def __init__(
+        self,
+        roi_in_pixels: Roi | None,
+        data: npt.NDArray | SourceRead | None = None,
+        segmentation_data: npt.NDArray | SourceRead | None = None,
+        on_result: Callable[[tuple[Roi, npt.NDArray, npt.NDArray]], None] | None = None,
+        dtypes: tuple[npt.DTypeLike, npt.DTypeLike] = (np.float32, np.uint32),
+        stats: ScaleLoadStats | None = None,
+        read_started_at: float | None = None,
+        bytes_read: int | None = None,
+        label_chunk_shape: Coordinate | None = None,
+    ):
+        """
+        Args:
+            roi_in_pixels (Roi or None):
+                The logical Roi in pixels that is being read, or None if there is nothing to read.
+            data (npt.NDArray or SourceRead, optional):
+                The data that is being read.
+            segmentation_data (npt.NDArray or SourceRead, optional):
+                The segmentations that are being read, or None if there are no segmentations.
+            on_result (Callable, optional):
+                Called with the converted result once, the first time result is called.
+            dtypes (tuple[npt.DTypeLike, npt.DTypeLike], optional):
+                The texture dtypes to convert the data and segmentations to. Defaults to (float32, uint32).
+            stats (ScaleLoadStats, optional):
+                If provided, the bytes read, read latency, and conversion time are added to these stats once the
+                read finishes.
+            read_started_at (float, optional):
+                The time.perf_counter() at which the read was issued. Required if stats is provided.
+            bytes_read (int, optional):
+                The number of bytes being read, in the dtypes the data is stored in. Defaults to the size of the
+                data and segmentations that were read.
+            label_chunk_shape (Coordinate, optional):
+                If provided, the segmentations are compacted into CompactLabels with chunks of this shape, after
+                on_result is called.
+        """  # noqa: D205
+        # D205 mistakes "Args:" as a summary
+        self.roi_in_pixels = roi_in_pixels
+        self.dtypes = dtypes
+        self._reads = (data, segmentation_data)
+        self._on_result = on_result
+        self._result = None
+        self._stats = stats
+        self._read_started_at = read_started_at
+        self._bytes_read = bytes_read
+        self._label_chunk_shape = label_chunk_shape
+
+    def done(self) -> bool:
+        """Whether result can be called without blocking."""
+        return all(
+            not isinstance(read, SourceRead) or read.done() for read in self._reads
+        )
+
+    def result(self) -> tuple[Roi, npt.NDArray, npt.NDArray] | None:
+        """
+        Wait for the read to finish and convert it to the texture dtypes.
+
+        Returns:
+            A tuple (roi, data, segmentations) like read_logical_roi, or None if there was nothing to read.
+            segmentations is None if no segmentations were read, and CompactLabels if they were compacted.
+
+        """
+        if self.roi_in_pixels is None:
+            return None
+        if self._result is None:
+            data, segmentation_data = (
+                read.result() if isinstance(read, SourceRead) else read
+                for read in self._reads
             )
-            base_begin = set_dim(base_begin, d, b0)
-
-        # Slab after B
-        if b1 < a1:
-            slab_begin = set_dim(base_begin, d, b1)
-            slab_end = base_end
-            result.append(
-                Roi(slab_begin, tuple(e - o for o, e in zip(slab_begin, slab_end)))
+            read_finished_at = time.perf_counter() if self._stats is not None else None
+            result = (
+                self.roi_in_pixels,
+                np.asarray(data, dtype=self.dtypes[0]),
+                None
+                if segmentation_data is None
+                else np.asarray(segmentation_data, dtype=self.dtypes[1]),
             )
-            base_end = set_dim(base_end, d, b1)
+            if self._on_result is not None:
+                self._on_result(result)
+            if result[2] is not None and self._label_chunk_shape is not None:
+                # finding the labels of each chunk sorts them, so we do it here instead of on the render thread
+                result = (
+                    *result[:2],
+                    CompactLabels.from_segmentations(
+                        result[2], self._label_chunk_shape
+                    ),
+                )
+            if self._stats is not None:
+                self._stats.add(
+                    bytes_read=self._bytes_read
+                    if self._bytes_read is not None
+                    else data.nbytes
+                    + (0 if segmentation_data is None else segmentation_data.nbytes),
+                    read_latency_in_seconds=read_finished_at - self._read_started_at,
+                    conversion_time_in_seconds=time.perf_counter() - read_finished_at,
+                )
+            self._result = result
+        return self._result
+
 
-    return result
+# intensity dtypes that can be uploaded as is. the shader normalizes them, so they all sample to the same values
+# a float32 copy would. everything else is converted to float32.
+TEXTURE_DTYPES = (
+    np.dtype(np.uint8),
+    np.dtype(np.uint16),
+    np.dtype(np.float16),
+    np.dtype(np.float32),
+)
+
+
+def texture_dtype(dtype: npt.DTypeLike) -> np.dtype:
+    """Get the dtype of the intensity texture for source data of the given dtype."""
+    dtype = np.dtype(dtype)
+    if dtype in TEXTURE_DTYPES:
+        return dtype
+    return np.dtype(np.float32)
+
+
+def segmentations_texture_dtype(dtype: npt.DTypeLike) -> np.dtype:
+    """Get the narrowest unsigned integer dtype (up to uint32) that holds segmentation ids of the given dtype."""
+    itemsize = np.dtype(dtype).itemsize
+    if itemsize <= 1:
+        return np.dtype(np.uint8)
+    if itemsize <= 2:
+        return np.dtype(np.uint16)
+    return np.dtype(np.uint32)
+
+
+def chunk_coordinates(roi_in_chunks: Roi) -> list[tuple[int, int, int]]:
+    """List the coordinates of every chunk within a Roi in chunk coordinates."""
+    # when we need tuples anyway, this is faster than building them from box_chunks
+    return list(
+        product(*(range(b, e) for b, e in zip(roi_in_chunks.begin, roi_in_chunks.end)))
+    )
+
+
+def start_source_read(
+    source: ChunkSource,
+    roi_in_pixels: Roi,
+    dtype: np.dtype,
+    out: npt.NDArray | None = None,
+) -> SourceRead:
+    """
+    Start reading a Roi in pixels from a source, converted to dtype by the source if it isn't stored in it.
+
+    If out is provided, the source reads into it and converts to its dtype instead.
+    """
+    if out is not None:
+        return source.start_read(roi_in_pixels, out)
+    # reads in the stored dtype can be views of the source (e.g. for numpy), so we only hand the source an array
+    # to read into when it has to convert anyway. TensorStore and zarr then convert while reading, without a copy
+    # in the stored dtype.
+    if source.dtype == dtype:
+        return source.start_read(roi_in_pixels)
+    return source.start_read(roi_in_pixels, np.empty(roi_in_pixels.shape, dtype))
+
+
+def update_texture_range(texture: gfx.Texture, roi: Roi):
+    """Schedule the upload of a Roi of a texture, given in numpy/C style (x, y, z) like the texture's data."""
+    # pygfx expects (width, height, depth), which is the reverse of numpy's shape
+    texture.update_range(
+        tuple(int(o) for o in roi.offset[::-1]), tuple(int(s) for s in roi.shape[::-1])
+    )
+
+
+def subtract_rois(roi_a: Roi, roi_b: Roi) -> list[Roi]:
+    """Split the part of roi_a that is not in roi_b into at most 2 * dims disjoint Rois."""
+    return [
+        box_to_roi(box) for box in subtract_boxes(roi_to_box(roi_a), roi_to_box(roi_b))
+    ]
@@ -15,9 +15,12 @@ fn fs_main(varyings: Varyings) -> FragmentOutput {
     // results at the cost of performance. With larger values you may miss
     // small structures (and corners of larger structures) because the step
     // may skip over them.
-    // We could make this a user-facing property. But for now we scale between
+    // The material can set this directly. Otherwise, we scale between
     // 0.1 and 0.8 based on the (sqrt of the) volume size.
-    let relative_step_size = clamp(sqrt(max(sizef.x, max(sizef.y, sizef.z))) / 20.0, 0.1, 0.8);
+    var relative_step_size = u_material.step_size;
+    if relative_step_size <= 0.0 {
+        relative_step_size = clamp(sqrt(max(sizef.x, max(sizef.y, sizef.z))) / 20.0, 0.1, 0.8);
+    }
 
     // Positions in data coordinates
     let back_pos = varyings.data_back_pos.xyz / varyings.data_back_pos.w;
@@ -48,7 +51,11 @@ fn fs_main(varyings: Varyings) -> FragmentOutput {
     let step_coord = ((back_pos - front_pos) / sizef) / f32(nsteps);
 
     // Render
-    let render_out = raycast(sizef, nsteps, start_coord, step_coord);
+    $$ if render_mode == 'weighted_average'
+        let render_out = weighted_average_raycast(sizef, nsteps, start_coord, step_coord);
+    $$ else
+        let render_out = raycast(sizef, nsteps, start_coord, step_coord);
+    $$ endif
 
     // Create fragment output.
     var out: FragmentOutput;
@@ -71,9 +78,19 @@ fn fs_main(varyings: Varyings) -> FragmentOutput {
         // offset used to sample from the texture, but that would require a different calculation from the current one.
         let depth: f32 = ndc_pos.z / max(ndc_pos.w, 0.001);
 
-        let i = render_out.segmentation;
-        let hsv: vec3<f32> = vec3<f32>(sample_hs_color(i), render_out.color.r);
-        let rgb: vec3<f32> = hsv_to_rgb(hsv);
+        $$ if has_segmentations
+            $$ if compact_labels
+                // the segmentation textures hold compact indices, so we look up the label they stand for
+                let i = s_label_table[render_out.segmentation];
+            $$ else
+                let i = render_out.segmentation;
+            $$ endif
+            let hsv: vec3<f32> = vec3<f32>(sample_hs_color(i), render_out.color.r);
+            let rgb: vec3<f32> = hsv_to_rgb(hsv);
+        $$ else
+            // without segmentations, there is nothing to color by, so we keep the colormapped color
+            let rgb: vec3<f32> = render_out.color;
+        $$ endif
 
         let fog_density: f32 = u_material.fog_density;
         let fog_color: vec3<f32> = u_material.fog_color;
@@ -9,8 +9,6 @@ struct RenderOutput {
 // most of the LMIP algorithim written by Claude Sonnet 4
 // watch out for issues, and be skeptical of the accuracy of the code
 fn raycast(sizef: vec3<f32>, nsteps: i32, start_coord: vec3<f32>, step_coord: vec3<f32>) -> RenderOutput {
-    let nstepsf = f32(nsteps);
-
     // Classic LMIP (Local Maximum Intensity Projection) algorithm
     // The minimum intensity threshold to consider a sample significant
     var lmip_threshold: f32 = u_material.lmip_threshold;
@@ -26,12 +24,43 @@ fn raycast(sizef: vec3<f32>, nsteps: i32, start_coord: vec3<f32>, step_coord: ve
     var found_significant_value = false;
     var samples_since_threshold = 0;
 
-    for (var iter = 0.0; iter < nstepsf; iter = iter + 1.0) {
+    // Samples outside of the logical rois of every scale are 0, so we only march the part of the ray that
+    // passes through them. We keep the same steps as marching the whole ray, so the result is the same.
+    // A threshold of 0 or less would count those 0 samples as significant, so then we march the whole ray.
+    var first_step = 0;
+    var last_step = nsteps;
+    if lmip_threshold > 0.0 {
+        let steps = logical_roi_steps(start_coord, step_coord, sizef, nsteps);
+        first_step = steps.x;
+        last_step = steps.y;
+    }
+    let last_stepf = f32(last_step);
+
+    // The ray is split into segments where the same scales are in bounds. We start each sample at the finest
+    // of these scales, and only work out the next segment once we leave the current one.
+    var first_scale = 0;
+    var segment_end = -1.0;
+
+    for (var iter = f32(first_step); iter < last_stepf; iter = iter + 1.0) {
         let offset = iter * step_coord;
         let coord = start_coord + offset;
-        let sample = sample_vol(coord, sizef);
+        if iter >= segment_end {
+            let segment = scale_segment(coord, step_coord, sizef);
+            first_scale = i32(segment.x);
+            segment_end = iter + segment.y;
+        }
+        let sample = sample_vol_from_scale(coord, sizef, first_scale);
         let sample_intensity = length(sample.rgb); // Use RGB magnitude as intensity
 
+        // Coarser scales have larger voxels, so we lengthen our step by the size of their voxels. This takes as
+        // many samples per coarse voxel as we take per base voxel, and keeps us on the same grid of steps.
+        var stride = 1.0;
+        if u_material.adaptive_step_size != 0 {
+            stride = max(floor(sample.w), 1.0);
+        }
+        // The number of steps to skip after this one
+        var skip_steps = stride - 1.0;
+
         if !found_significant_value {
             // Look for first sample above threshold
             if sample_intensity >= lmip_threshold {
@@ -41,6 +70,11 @@ fn raycast(sizef: vec3<f32>, nsteps: i32, start_coord: vec3<f32>, step_coord: ve
                 local_max_offset = offset;
                 local_max_coord = coord;
                 samples_since_threshold = 0;
+            } else {
+                // jump over the rest of any chunk that can't reach the threshold. we land on the first step of our
+                // stride past the chunk, so we sample the same places as if we had marched through it.
+                let empty_steps = f32(empty_space_steps(coord, step_coord, sizef, lmip_threshold));
+                skip_steps = max(skip_steps, ceil((empty_steps + 1.0) / stride) * stride - 1.0);
             }
         } else {
             // We've found a significant value, now find the local maximum
@@ -59,30 +93,39 @@ fn raycast(sizef: vec3<f32>, nsteps: i32, start_coord: vec3<f32>, step_coord: ve
                 break;
             }
         }
+
+        iter += skip_steps;
     }
 
     // The fragment shader should check if we set out.found before doing any operations
     // If out.found is false, the other fields will just be the default values.
-    var out: RenderOutput;
     if found_significant_value {
-        // Colormapping
-        let color = sampled_value_to_color(local_max_sample);
-        // Move to physical colorspace (linear photon count) so we can do math
-        $$ if colorspace == 'srgb'
-            let physical_color = srgb2physical(color.rgb);
-        $$ else
-            let physical_color = color.rgb;
-        $$ endif
-
-        out.found = true;
-        out.color = physical_color;
-        out.coord = local_max_coord;
-        out.offset = local_max_offset;
-        out.segmentation = sample_segmentations_vol(local_max_coord, sizef).r;
-    } else {
-        // No significant value found, return transparent
-        out.found = false;
+        return found_render_output(local_max_sample, local_max_coord, local_max_offset, sizef);
     }
+    // No significant value found, return transparent
+    var out: RenderOutput;
+    out.found = false;
+    return out;
+}
+
+// The output for a ray that found sample at coord (offset from the start of the ray)
+fn found_render_output(sample: vec4<f32>, coord: vec3<f32>, offset: vec3<f32>, sizef: vec3<f32>) -> RenderOutput {
+    // Colormapping
+    let color = sampled_value_to_color(sample);
+    // Move to physical colorspace (linear photon count) so we can do math
+    $$ if colorspace == 'srgb'
+        let physical_color = srgb2physical(color.rgb);
+    $$ else
+        let physical_color = color.rgb;
+    $$ endif
 
+    var out: RenderOutput;
+    out.found = true;
+    out.color = physical_color;
+    out.coord = coord;
+    out.offset = offset;
+    $$ if has_segmentations
+        out.segmentation = sample_segmentations_vol(coord, sizef).r;
+    $$ endif
     return out;
 }
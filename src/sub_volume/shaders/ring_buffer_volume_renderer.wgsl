@@ -16,4 +16,7 @@ $$ endif
 
 {$ include 'sub_volume.vs_main.wgsl' $}
 {$ include 'sub_volume.raycast.wgsl' $}
+$$ if render_mode == 'weighted_average'
+    {$ include 'sub_volume.weighted_average.wgsl' $}
+$$ endif
 {$ include 'sub_volume.fs_main.wgsl' $}
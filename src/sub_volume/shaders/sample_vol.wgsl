@@ -1,6 +1,23 @@
 // Multi-scale volume sampling with high-to-low fallthrough logic
 
 $$ for i in range(num_scales)
+fn is_resident_scale_{{ i }}(scaled_data_coord: vec3<f32>) -> bool {
+    let offset = u_wrapping_buffer_{{ i }}.current_logical_offset_in_pixels;
+    let shape = u_wrapping_buffer_{{ i }}.current_logical_shape_in_pixels;
+
+    let in_bounds = all(offset <= vec3<i32>(scaled_data_coord)) && all(vec3<i32>(scaled_data_coord) < offset + shape);
+    if !in_bounds {
+        return false;
+    }
+
+    // The slot this coordinate wraps into might still hold an older chunk (or nothing) while its chunk is
+    // loading, so we check which chunk the slot actually holds. If it's not ours, we fall through to a coarser scale.
+    let chunk = vec3<i32>(scaled_data_coord) / u_wrapping_buffer_{{ i }}.chunk_shape_in_pixels;
+    let slot = chunk % vec3<i32>(textureDimensions(t_residency_scale_{{ i }}));
+    let resident_chunk = textureLoad(t_residency_scale_{{ i }}, slot, 0);
+    return resident_chunk.w == 1 && all(resident_chunk.xyz == chunk);
+}
+
 fn try_sample_scale_{{ i }}(data_tex_coord: vec3<f32>, sizef: vec3<f32>) -> vec4<f32> {
     // Transform coordinates for this scale level
     let data_coord = data_tex_coord * sizef;
@@ -11,19 +28,20 @@ fn try_sample_scale_{{ i }}(data_tex_coord: vec3<f32>, sizef: vec3<f32>) -> vec4
     // Scale 0: scale_factor=1.0, Scale 1: scale_factor=0.5 (to make voxels appear 2x larger)
     let ring_buffer_dimensions = vec3<f32>(textureDimensions(t_scale_{{ i}}));
 
-    let offset = u_wrapping_buffer_{{ i }}.current_logical_offset_in_pixels;
-    let shape = u_wrapping_buffer_{{ i }}.current_logical_shape_in_pixels;
-
-    let in_bounds = all(offset <= vec3<i32>(scaled_data_coord)) && all(vec3<i32>(scaled_data_coord) < offset + shape);
-    if !in_bounds {
+    if !is_resident_scale_{{ i }}(scaled_data_coord) {
         return vec4<f32>(0.0, 0.0, 0.0, 0.0); // Invalid sample - w=0 indicates no data
     }
 
     let wrapped_scaled_data_coord = scaled_data_coord % ring_buffer_dimensions;
-    let result = textureLoad(t_scale_{{ i }}, vec3<i32>(wrapped_scaled_data_coord), 0);
-    return vec4<f32>(result.rgb, 1.0); // Valid sample - w=1 indicates data available
+    // the texture keeps the dtype of the source data, so we convert the sample back to the source values here.
+    // this way every scale returns samples in the same units, whatever their dtype.
+    let result = vec4<f32>(textureLoad(t_scale_{{ i }}, vec3<i32>(wrapped_scaled_data_coord), 0)){{ scale_climcorrections[i] }};
+    // Valid sample - w>0 indicates data available. w is the size of a voxel of this scale in voxels of the base
+    // scale, so the ray marcher can adapt its step size to the scale it samples.
+    return vec4<f32>(result.rgb, 1.0 / max(scale_factor.x, max(scale_factor.y, scale_factor.z)));
 }
 
+$$ if scale_has_segmentations[i]
 fn try_sample_segmentations_scale_{{ i }}(data_tex_coord: vec3<f32>, sizef: vec3<f32>) -> vec4<u32> {
     // Transform coordinates for this scale level
     let data_coord = data_tex_coord * sizef;
@@ -34,11 +52,7 @@ fn try_sample_segmentations_scale_{{ i }}(data_tex_coord: vec3<f32>, sizef: vec3
     // Scale 0: scale_factor=1.0, Scale 1: scale_factor=0.5 (to make voxels appear 2x larger)
     let ring_buffer_dimensions = vec3<f32>(textureDimensions(t_segmentations_scale_{{ i }}));
 
-    let offset = u_wrapping_buffer_{{ i }}.current_logical_offset_in_pixels;
-    let shape = u_wrapping_buffer_{{ i }}.current_logical_shape_in_pixels;
-
-    let in_bounds = all(offset <= vec3<i32>(scaled_data_coord)) && all(vec3<i32>(scaled_data_coord) < offset + shape);
-    if !in_bounds {
+    if !is_resident_scale_{{ i }}(scaled_data_coord) {
         return vec4<u32>(0, 0, 0, 0); // Invalid sample - w=0 indicates no data
     }
 
@@ -46,6 +60,7 @@ fn try_sample_segmentations_scale_{{ i }}(data_tex_coord: vec3<f32>, sizef: vec3
     let result = textureLoad(t_segmentations_scale_{{ i }}, vec3<i32>(wrapped_scaled_data_coord), 0);
     return vec4<u32>(result.rgb, 1); // Valid sample - w=1 indicates data available
 }
+$$ endif
 $$ endfor
 
 fn sample_vol_multi_scale(data_tex_coord: vec3<f32>, sizef: vec3<f32>) -> vec4<f32> {
@@ -62,19 +77,164 @@ fn sample_vol_multi_scale(data_tex_coord: vec3<f32>, sizef: vec3<f32>) -> vec4<f
     return vec4<f32>(0.0, 0.0, 0.0, 0.0);
 }
 
+// Like sample_vol_multi_scale, but skips the scales finer than first_scale. See scale_segment.
+fn sample_vol_from_scale(data_tex_coord: vec3<f32>, sizef: vec3<f32>, first_scale: i32) -> vec4<f32> {
+    var result: vec4<f32>;
+    $$ for i in range(num_scales)
+        if first_scale <= {{ i }} {
+            result = try_sample_scale_{{ i }}(data_tex_coord, sizef);
+            if result.w > 0.0 { // Valid sample found
+                return result;
+            }
+        }
+    $$ endfor
+
+    // No valid sample found at any scale
+    return vec4<f32>(0.0, 0.0, 0.0, 0.0);
+}
+
+$$ if has_segmentations
 fn sample_segmentations_vol_multi_scale(data_tex_coord: vec3<f32>, sizef: vec3<f32>) -> vec4<u32> {
-    // Try scales from highest to lowest resolution (0 to num_scales-1)
+    // Try scales from highest to lowest resolution (0 to num_scales-1), skipping scales without segmentations
     var result: vec4<u32>;
     $$ for i in range(num_scales)
+    $$ if scale_has_segmentations[i]
         result = try_sample_segmentations_scale_{{ i }}(data_tex_coord, sizef);
         if result.w > 0 { // Valid sample found
             return result;
         }
+    $$ endif
     $$ endfor
     
     // No valid sample found at any scale
     return vec4<u32>(0, 0, 0, 0);
 }
+$$ endif
+
+// Distance along a ray (in steps) until it leaves the box [lo, hi)
+fn ray_box_exit(pos: vec3<f32>, step: vec3<f32>, lo: vec3<f32>, hi: vec3<f32>) -> f32 {
+    let bound = select(lo, hi, step > vec3<f32>(0.0));
+    // axes we don't move along never make us exit
+    let t = select(vec3<f32>(1e30), (bound - pos) / step, step != vec3<f32>(0.0));
+    return min(t.x, min(t.y, t.z));
+}
+
+// Distance along a ray (in steps) until it enters the box [lo, hi), or 1e30 if it never does
+fn ray_box_entry(pos: vec3<f32>, step: vec3<f32>, lo: vec3<f32>, hi: vec3<f32>) -> f32 {
+    let moving = step != vec3<f32>(0.0);
+    let t0 = (lo - pos) / step;
+    let t1 = (hi - pos) / step;
+    // axes we don't move along are either always or never inside the box
+    let within = (lo <= pos) & (pos < hi);
+    let t_near = select(select(vec3<f32>(1e30), vec3<f32>(-1e30), within), min(t0, t1), moving);
+    let t_far = select(select(vec3<f32>(-1e30), vec3<f32>(1e30), within), max(t0, t1), moving);
+    let t_enter = max(t_near.x, max(t_near.y, t_near.z));
+    let t_leave = min(t_far.x, min(t_far.y, t_far.z));
+    if t_leave < max(t_enter, 0.0) {
+        return 1e30;
+    }
+    return t_enter;
+}
+
+// Split a ray into segments that each sample the same scales, so every sample doesn't have to try (and fail) the
+// finer scales first. Returns the finest scale whose logical roi contains data_tex_coord (num_scales if none), and
+// the number of steps until the ray crosses the boundary of any scale's logical roi.
+// The rois are grown a little, so rounding can only make us try a scale that turns out to be out of bounds (and
+// fall through), but never skip a scale that isn't.
+fn scale_segment(data_tex_coord: vec3<f32>, step_coord: vec3<f32>, sizef: vec3<f32>) -> vec2<f32> {
+    let data_coord = data_tex_coord * sizef;
+    let data_step = step_coord * sizef;
+    let margin = vec3<f32>(0.001);
+    var first_scale = {{ num_scales }};
+    var steps = 1e30;
+    $$ for i in range(num_scales)
+    {
+        // the bounds of the logical roi in data coordinates
+        let scale_factor = u_wrapping_buffer_{{ i }}.scale_factor;
+        let offset = vec3<f32>(u_wrapping_buffer_{{ i }}.current_logical_offset_in_pixels);
+        let shape = vec3<f32>(u_wrapping_buffer_{{ i }}.current_logical_shape_in_pixels);
+        let lo = offset / scale_factor - margin;
+        let hi = (offset + shape) / scale_factor + margin;
+        if all(lo <= data_coord) && all(data_coord < hi) {
+            first_scale = min(first_scale, {{ i }});
+            steps = min(steps, ray_box_exit(data_coord, data_step, lo, hi));
+        } else {
+            steps = min(steps, ray_box_entry(data_coord, data_step, lo, hi));
+        }
+    }
+    $$ endfor
+    return vec2<f32>(f32(first_scale), steps);
+}
+
+// The range of steps [first, last) of a ray that lie within the bounding box of the logical rois of all scales.
+// Samples outside of it are always 0, so rays only need to march through this range.
+fn logical_roi_steps(start_coord: vec3<f32>, step_coord: vec3<f32>, sizef: vec3<f32>, nsteps: i32) -> vec2<i32> {
+    var lo = vec3<f32>(1e30);
+    var hi = vec3<f32>(-1e30);
+    $$ for i in range(num_scales)
+    {
+        let scale_factor = u_wrapping_buffer_{{ i }}.scale_factor;
+        let offset = vec3<f32>(u_wrapping_buffer_{{ i }}.current_logical_offset_in_pixels);
+        let shape = vec3<f32>(u_wrapping_buffer_{{ i }}.current_logical_shape_in_pixels);
+        if all(shape > vec3<f32>(0.0)) {
+            lo = min(lo, offset / scale_factor);
+            hi = max(hi, (offset + shape) / scale_factor);
+        }
+    }
+    $$ endfor
+    if any(hi <= lo) {
+        return vec2<i32>(0, 0);
+    }
+    let data_coord = start_coord * sizef;
+    let data_step = step_coord * sizef;
+    let t_enter = ray_box_entry(data_coord, data_step, lo, hi);
+    if t_enter >= 1e30 {
+        return vec2<i32>(0, 0);
+    }
+    // we keep a step of margin on both sides so rounding never clips a step that is in bounds
+    let t_exit = ray_box_exit(data_coord, data_step, lo, hi);
+    let first_step = max(i32(floor(t_enter)) - 1, 0);
+    let last_step = min(i32(ceil(min(t_exit, f32(nsteps)))) + 1, nsteps);
+    return vec2<i32>(first_step, last_step);
+}
+
+// Count the steps after data_tex_coord that certainly sample below the threshold, so the ray marcher can skip them.
+// A sample comes from the finest scale whose chunk is resident at that position. Inside the intersection of the
+// chunks of that scale and every finer scale, that stays true, so if the chunk's intensity range can't reach the
+// threshold, none of the samples in the intersection can either.
+fn empty_space_steps(data_tex_coord: vec3<f32>, step_coord: vec3<f32>, sizef: vec3<f32>, threshold: f32) -> i32 {
+    let data_coord = data_tex_coord * sizef;
+    let data_step = step_coord * sizef;
+    var exit = 1e30;
+    $$ for i in range(num_scales)
+    {
+        let scale_factor = u_wrapping_buffer_{{ i }}.scale_factor;
+        let scaled_data_coord = data_coord * scale_factor;
+        let chunk_shape = vec3<f32>(u_wrapping_buffer_{{ i }}.chunk_shape_in_pixels);
+        let chunk = floor(scaled_data_coord / chunk_shape);
+        // the bounds of the chunk in data coordinates
+        let lo = chunk * chunk_shape / scale_factor;
+        let hi = (chunk + 1.0) * chunk_shape / scale_factor;
+        exit = min(exit, ray_box_exit(data_coord, data_step, lo, hi));
+        if is_resident_scale_{{ i }}(scaled_data_coord) {
+            let slot = vec3<i32>(chunk) % vec3<i32>(textureDimensions(t_occupancy_scale_{{ i }}));
+            let intensity_range = textureLoad(t_occupancy_scale_{{ i }}, slot, 0).rg;
+            // samples are compared by their magnitude
+            if max(abs(intensity_range.r), abs(intensity_range.g)) >= threshold {
+                return 0;
+            }
+            // the step that lands on the exit is already in the next chunk. the margin keeps rounding errors from
+            // skipping it.
+            return max(i32(floor(exit - 0.01)), 0);
+        }
+    }
+    $$ endfor
+    // nothing is resident here, so every sample is 0
+    if threshold <= 0.0 {
+        return 0;
+    }
+    return max(i32(floor(exit - 0.01)), 0);
+}
 
 // Legacy single-scale functions for backward compatibility
 fn sample_vol(data_tex_coord: vec3<f32>, sizef: vec3<f32>) -> vec4<f32> {
@@ -85,6 +245,7 @@ fn sample_vol(data_tex_coord: vec3<f32>, sizef: vec3<f32>) -> vec4<f32> {
     $$ endif
 }
 
+$$ if has_segmentations
 fn sample_segmentations_vol(data_tex_coord: vec3<f32>, sizef: vec3<f32>) -> vec4<u32>{
     $$ if num_scales > 1
         return sample_segmentations_vol_multi_scale(data_tex_coord, sizef);
@@ -92,3 +253,4 @@ fn sample_segmentations_vol(data_tex_coord: vec3<f32>, sizef: vec3<f32>) -> vec4
         return try_sample_segmentations_scale_0(data_tex_coord, sizef);
     $$ endif
 }
+$$ endif
@@ -0,0 +1,71 @@
+// Weighted average rendering
+// Instead of marching every step of the ray like LMIP, we take a fixed number of samples. The samples are spaced
+// progressively farther apart along the ray, where coarser scales are loaded anyway, so the cost of a ray is
+// bounded by the sample budget instead of growing with the size of the volume.
+fn weighted_average_raycast(sizef: vec3<f32>, nsteps: i32, start_coord: vec3<f32>, step_coord: vec3<f32>) -> RenderOutput {
+    let num_samples = max(u_material.average_samples, 1);
+    let growth = max(u_material.average_spacing_growth, 1.0);
+    let fall_off = u_material.average_fall_off;
+
+    var out: RenderOutput;
+    out.found = false;
+
+    // Only the part of the ray inside the logical rois of the scales has data, so we spread the samples over it.
+    let steps = logical_roi_steps(start_coord, step_coord, sizef, nsteps);
+    let ray_length = f32(steps.y - steps.x);
+    if ray_length <= 0.0 {
+        return out;
+    }
+
+    // The spacings (in steps) grow by a constant factor from one sample to the next. We pick the first spacing so
+    // that they add up to the length of the ray.
+    var spacing = ray_length / f32(num_samples);
+    if growth > 1.0 {
+        spacing = ray_length * (growth - 1.0) / (pow(growth, f32(num_samples)) - 1.0);
+    }
+    let step_length = length(step_coord * sizef);
+
+    var weighted_sum = vec3<f32>(0.0);
+    var total_weight = 0.0;
+    var max_contribution = -1.0;
+    var max_coord: vec3<f32>;
+    var max_offset: vec3<f32>;
+
+    var interval_start = f32(steps.x);
+    for (var i = 0; i < num_samples; i++) {
+        // each sample stands for the interval of the ray around it
+        let iter = interval_start + 0.5 * spacing;
+        let offset = iter * step_coord;
+        let coord = start_coord + offset;
+
+        // We know which scales are in bounds at this distance, so we read from the finest of them directly
+        // instead of falling through from the finest scale.
+        let first_scale = i32(scale_segment(coord, step_coord, sizef).x);
+        let sample = sample_vol_from_scale(coord, sizef, first_scale);
+
+        // Samples without data don't count towards the average. The others are weighted by the length of the
+        // interval they stand for, and fall off with their distance along the ray.
+        if sample.w > 0.0 {
+            let weight = spacing * exp(-fall_off * iter * step_length);
+            weighted_sum += weight * sample.rgb;
+            total_weight += weight;
+
+            // The sample that contributes the most stands in for the ray's position (for depth, fog and labels)
+            let contribution = weight * length(sample.rgb);
+            if contribution > max_contribution {
+                max_contribution = contribution;
+                max_coord = coord;
+                max_offset = offset;
+            }
+        }
+
+        interval_start += spacing;
+        spacing *= growth;
+    }
+
+    if total_weight <= 0.0 {
+        return out;
+    }
+    let average = vec4<f32>(weighted_sum / total_weight, 1.0);
+    return found_render_output(average, max_coord, max_offset, sizef);
+}
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from sub_volume import SubVolume, SubVolumeMaterial
+
+
+@pytest.fixture
+def volume():
+    data = np.zeros((64, 64, 64), np.uint8)
+    return SubVolume(
+        SubVolumeMaterial(0.5),
+        [(data, data), (data[::2, ::2, ::2], data[::2, ::2, ::2])],
+        [(4, 4, 4), (4, 4, 4)],
+        [(8, 8, 8), (4, 4, 4)],
+    )
+
+
+@pytest.fixture
+def requests(volume, monkeypatch):
+    """Record the rois requested from each scale."""
+    requests = []
+    for buffer in volume.wrapping_buffers:
+        request_logical_roi = buffer.request_logical_roi
+
+        def record(roi, request_logical_roi=request_logical_roi):
+            requests.append(roi)
+            request_logical_roi(roi)
+
+        monkeypatch.setattr(buffer, "request_logical_roi", record)
+    return requests
+
+
+def test_moving_within_a_chunk_skips_requests(volume, requests):
+    volume.center_on_position((32.0, 32.0, 32.0))
+    assert len(requests) == 2
+
+    # the rois still start and end in the same chunks of both scales
+    volume.center_on_position((33.0, 32.5, 32.0))
+    assert len(requests) == 2
+
+
+def test_crossing_a_chunk_requests_again(volume, requests):
+    volume.center_on_position((32.0, 32.0, 32.0))
+    roi_in_chunks = volume.wrapping_buffers[0]._current_logical_roi_in_chunks
+    volume.center_on_position((40.0, 32.0, 32.0))
+    assert len(requests) == 4
+    assert volume.wrapping_buffers[0]._current_logical_roi_in_chunks != roi_in_chunks
+
+
+def test_uniforms_are_committed_once_per_frame(volume):
+    buffer = volume.wrapping_buffers[0]
+    # pygfx only bumps the revision of a buffer on the first change after an upload, so we upload first
+    buffer.uniform_buffer._gfx_get_chunk_descriptions()
+    rev = buffer.uniform_buffer.rev
+
+    volume.center_on_position((32.0, 32.0, 32.0))
+    volume.center_on_position((40.0, 32.0, 32.0))
+    assert volume.has_uncommitted_uniforms
+    assert buffer.uniform_buffer.rev == rev
+
+    volume.commit_uniforms()
+    assert not volume.has_uncommitted_uniforms
+    assert buffer.uniform_buffer.rev > rev
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from sub_volume import ChunkCache, WrappingBuffer
+
+
+def chunk(nbytes):
+    return (np.zeros(nbytes, dtype=np.uint8),)
+
+
+def test_get_miss_and_hit():
+    cache = ChunkCache(max_bytes=100)
+    assert cache.get((0, (0, 0, 0))) is None
+    cache.put((0, (0, 0, 0)), chunk(10))
+    assert cache.get((0, (0, 0, 0))) is not None
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.nbytes == 10
+
+
+def test_evicts_least_recently_used():
+    cache = ChunkCache(max_bytes=30)
+    cache.put("a", chunk(10))
+    cache.put("b", chunk(10))
+    cache.put("c", chunk(10))
+    # touch a so that b is now the least recently used
+    cache.get("a")
+    cache.put("d", chunk(10))
+
+    assert "b" not in cache
+    assert all(key in cache for key in ("a", "c", "d"))
+    assert cache.evictions == 1
+    assert cache.nbytes == 30
+
+
+def test_never_exceeds_budget():
+    cache = ChunkCache(max_bytes=25)
+    for i in range(10):
+        cache.put(i, chunk(10))
+        assert cache.nbytes <= 25
+    assert len(cache) == 2
+    assert cache.evictions == 8
+
+
+def test_chunk_larger_than_budget_is_not_cached():
+    cache = ChunkCache(max_bytes=5)
+    cache.put("a", chunk(10))
+    assert "a" not in cache
+    assert cache.nbytes == 0
+
+
+def test_replacing_a_chunk_updates_bytes():
+    cache = ChunkCache(max_bytes=100)
+    cache.put("a", chunk(10))
+    cache.put("a", chunk(20))
+    assert len(cache) == 1
+    assert cache.nbytes == 20
+
+
+def test_cached_arrays_are_read_only():
+    cache = ChunkCache(max_bytes=100)
+    cache.put("a", chunk(10))
+    (array,) = cache.get("a")
+    with pytest.raises(ValueError, match="read-only"):
+        array[0] = 1
+
+
+def test_missing_arrays_take_no_space():
+    cache = ChunkCache(max_bytes=100)
+    cache.put("a", (*chunk(10), None))
+    assert cache.get("a")[1] is None
+    assert cache.nbytes == 10
+
+
+def test_clear():
+    cache = ChunkCache(max_bytes=100)
+    cache.put("a", chunk(10))
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_negative_budget():
+    with pytest.raises(ValueError, match="non-negative"):
+        ChunkCache(max_bytes=-1)
+
+
+def test_views_are_copied():
+    source = np.arange(1000, dtype=np.uint8)
+    view = source[100:110]
+    cache = ChunkCache(max_bytes=100)
+    cache.put("a", (view, None))
+    cached, _ = cache.get("a")
+    assert not np.shares_memory(cached, source)
+    np.testing.assert_array_equal(cached, view)
+    assert not cached.flags.writeable
+    # the caller's array stays writeable
+    assert view.flags.writeable
+    assert source.flags.writeable
+    assert cache.nbytes == 10
+
+
+def test_wrapping_buffer_caches_copies_of_numpy_sources():
+    data = np.arange(16**3, dtype=np.uint8).reshape((16, 16, 16))
+    buffer = WrappingBuffer(
+        data, None, (2, 2, 2), (4, 4, 4), chunk_cache=ChunkCache(2**20)
+    )
+    buffer.read_chunk((1, 1, 1))
+    cached, _ = buffer.chunk_cache.get((0, (1, 1, 1)))
+    assert not np.shares_memory(cached, data)
+    assert data.flags.writeable
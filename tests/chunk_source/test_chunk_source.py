@@ -0,0 +1,203 @@
+import numpy as np
+import pytest
+import tensorstore as ts
+import zarr
+from funlib.geometry import Roi
+
+from sub_volume import (
+    ArraySource,
+    ChunkSource,
+    MemmapSource,
+    ProceduralSource,
+    SubVolume,
+    SubVolumeMaterial,
+    TensorStoreSource,
+    WrappingBuffer,
+    ZarrSource,
+    as_chunk_source,
+)
+
+SHAPE = (12, 16, 20)
+ROI = Roi((2, 3, 5), (6, 8, 10))
+
+
+@pytest.fixture
+def data():
+    return np.arange(np.prod(SHAPE), dtype=np.uint16).reshape(SHAPE)
+
+
+def expected(data, roi=ROI):
+    return data[tuple(slice(b, e) for b, e in zip(roi.begin, roi.end))]
+
+
+def to_tensorstore(array, origin=(0, 0, 0)):
+    store = ts.open(
+        {
+            "driver": "zarr3",
+            "kvstore": {"driver": "memory"},
+            "metadata": {
+                "chunk_grid": {
+                    "name": "regular",
+                    "configuration": {"chunk_shape": [4, 4, 4]},
+                },
+            },
+        },
+        create=True,
+        dtype=array.dtype,
+        shape=array.shape,
+    ).result()
+    store.write(array).result()
+    return store.translate_to[origin]
+
+
+def to_zarr(array, shards=None):
+    z = zarr.create_array(
+        zarr.storage.MemoryStore(),
+        shape=array.shape,
+        chunks=(4, 4, 4),
+        shards=shards,
+        dtype=array.dtype,
+    )
+    z[...] = array
+    return z
+
+
+def to_memmap_source(array, tmp_path):
+    path = tmp_path / "data.raw"
+    # with a header in front, to check that offsets are respected
+    path.write_bytes(b"header" + array.tobytes())
+    return MemmapSource(path, array.dtype, array.shape, offset=6)
+
+
+@pytest.fixture(params=["numpy", "memmap", "zarr", "sharded_zarr", "tensorstore"])
+def source(request, data, tmp_path) -> ChunkSource:
+    if request.param == "numpy":
+        return as_chunk_source(data)
+    if request.param == "memmap":
+        return to_memmap_source(data, tmp_path)
+    if request.param == "zarr":
+        return as_chunk_source(to_zarr(data))
+    if request.param == "sharded_zarr":
+        return as_chunk_source(to_zarr(data, shards=(8, 8, 8)))
+    return as_chunk_source(to_tensorstore(data, origin=(100, -7, 3)))
+
+
+def test_metadata(source, data):
+    assert source.shape == data.shape
+    assert source.ndim == 3
+    assert source.dtype == data.dtype
+
+
+def test_read(source, data):
+    np.testing.assert_array_equal(source.read(ROI), expected(data))
+
+
+@pytest.mark.parametrize("dtype", [np.uint16, np.float32])
+def test_read_into_out(source, data, dtype):
+    out = np.zeros(ROI.shape, dtype)
+    result = source.read(ROI, out)
+    assert result is out
+    np.testing.assert_array_equal(out, expected(data).astype(dtype))
+
+
+def test_read_into_strided_out(source, data):
+    # e.g. a region of a texture's data
+    target = np.zeros((10, 10, 12), np.float32)
+    out = target[1:7, 2:10, 1:11]
+    source.read(ROI, out)
+    np.testing.assert_array_equal(out, expected(data))
+    assert target[0].sum() == 0
+
+
+def test_as_chunk_source_dispatch(data):
+    assert isinstance(as_chunk_source(data), ArraySource)
+    assert isinstance(as_chunk_source(to_zarr(data)), ZarrSource)
+    assert isinstance(as_chunk_source(to_tensorstore(data)), TensorStoreSource)
+    source = ProceduralSource(SHAPE, np.uint8, lambda roi: np.zeros(roi.shape))
+    assert as_chunk_source(source) is source
+
+
+def test_incomplete_sources_cannot_be_created():
+    class NoStartRead(ChunkSource):
+        shape = SHAPE
+        dtype = np.dtype(np.uint8)
+
+    with pytest.raises(TypeError, match="start_read"):
+        NoStartRead()
+
+
+def test_chunk_shapes(data):
+    assert as_chunk_source(data).chunk_shape is None
+    assert ArraySource(data, (4, 4, 4)).chunk_shape == (4, 4, 4)
+    assert as_chunk_source(to_tensorstore(data)).chunk_shape == (4, 4, 4)
+
+    zarr_source = as_chunk_source(to_zarr(data))
+    assert zarr_source.chunk_shape == (4, 4, 4)
+    assert zarr_source.shard_shape is None
+    sharded_source = as_chunk_source(to_zarr(data, shards=(8, 8, 8)))
+    assert sharded_source.chunk_shape == (4, 4, 4)
+    assert sharded_source.shard_shape == (8, 8, 8)
+
+
+def test_only_tensorstore_reads_concurrently(data, tmp_path):
+    assert as_chunk_source(to_tensorstore(data)).reads_concurrently
+    assert not as_chunk_source(data).reads_concurrently
+    assert not as_chunk_source(to_zarr(data)).reads_concurrently
+    assert not to_memmap_source(data, tmp_path).reads_concurrently
+
+
+def test_tensorstore_reads_in_the_background(data):
+    read = as_chunk_source(to_tensorstore(data)).start_read(ROI)
+    np.testing.assert_array_equal(read.result(), expected(data))
+    assert read.done()
+
+
+def test_procedural_source():
+    calls = []
+
+    def generate(roi):
+        calls.append(roi)
+        return np.indices(roi.shape).sum(axis=0) + sum(roi.offset)
+
+    source = ProceduralSource(SHAPE, np.uint8, generate, chunk_shape=(4, 4, 4))
+    assert source.chunk_shape == (4, 4, 4)
+    result = source.read(ROI)
+    assert result.dtype == np.uint8
+    assert calls == [ROI]
+    full = np.indices(SHAPE).sum(axis=0)
+    np.testing.assert_array_equal(result, expected(full))
+
+
+def test_wrapping_buffer_with_procedural_source(data):
+    source = ProceduralSource(
+        SHAPE, data.dtype, lambda roi: expected(data, roi), chunk_shape=(4, 4, 4)
+    )
+    # the chunk shape is taken from the source
+    buffer = WrappingBuffer(source, None, (2, 2, 2))
+    assert buffer.chunk_shape_in_pixels == (4, 4, 4)
+    assert buffer.backing_data is source
+
+    roi = Roi((4, 4, 8), (8, 8, 8))
+    buffer.load_logical_roi(roi)
+    np.testing.assert_array_equal(
+        np.roll(buffer.texture.data, (4, 4, 8), (0, 1, 2))[:8, :8, :8],
+        expected(data, roi),
+    )
+
+
+def test_wrapping_buffer_converts_in_the_source(data):
+    # int32 data is uploaded as float32, which the tensorstore converts while reading
+    store = to_tensorstore(data.astype(np.int32), origin=(5, 5, 5))
+    buffer = WrappingBuffer(store, None, (3, 4, 5))
+    assert buffer.texture_dtype == np.float32
+    buffer.load_logical_roi(Roi((0, 0, 0), SHAPE))
+    np.testing.assert_array_equal(buffer.texture.data, data)
+
+
+def test_sub_volume_infers_chunks_from_source(data):
+    source = ArraySource(data, (4, 4, 4))
+    volume = SubVolume(SubVolumeMaterial(0.5), [source], [(2, 2, 2)])
+    assert volume.wrapping_buffers[0].chunk_shape_in_pixels == (4, 4, 4)
+
+    with pytest.raises(ValueError, match="chunked"):
+        SubVolume(SubVolumeMaterial(0.5), [data], [(2, 2, 2)])
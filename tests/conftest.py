@@ -4,8 +4,14 @@ import numpy as np
 import numpy.typing as npt
 import pygfx as gfx
 import pytest
+import wgpu
 from wgpu.gui.offscreen import WgpuCanvas as OffscreenWgpuCanvas
 
+# pygfx asks for float32-filterable by default, which software adapters (like the ones CI renders with) don't have.
+# the volumes we render don't filter float32 textures, so we do without it there.
+if "float32-filterable" not in wgpu.gpu.request_adapter_sync().features:
+    gfx.renderers.wgpu.enable_wgpu_features("!float32-filterable")
+
 
 @dataclass
 class GfxContext:
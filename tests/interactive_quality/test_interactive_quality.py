@@ -0,0 +1,132 @@
+import numpy as np
+import pygfx as gfx
+import pytest
+from funlib.geometry import Roi
+
+from sub_volume import InteractiveQuality, SubVolume, SubVolumeMaterial
+
+
+@pytest.fixture
+def volume():
+    data = np.zeros((16, 16, 16), np.uint8)
+    return SubVolume(
+        SubVolumeMaterial(0.5, quality="high"),
+        [(data, data)],
+        [(2, 2, 2)],
+        [(4, 4, 4)],
+    )
+
+
+class Renderer:
+    """Resolves the pixel ratio like a pygfx renderer, which follows the screen while it is set to None."""
+
+    def __init__(self, pixel_ratio=None, screen_pixel_ratio=2.0):
+        self._pixel_ratio = pixel_ratio
+        self.screen_pixel_ratio = screen_pixel_ratio
+
+    @property
+    def pixel_ratio(self):
+        if self._pixel_ratio is not None:
+            return self._pixel_ratio
+        return self.screen_pixel_ratio
+
+    @pixel_ratio.setter
+    def pixel_ratio(self, value):
+        self._pixel_ratio = value
+
+
+@pytest.fixture
+def renderer():
+    # we only need the pixel ratio of the renderer
+    return Renderer(pixel_ratio=2.0)
+
+
+@pytest.fixture
+def camera():
+    return gfx.PerspectiveCamera()
+
+
+@pytest.fixture
+def interactive_quality(volume, renderer):
+    return InteractiveQuality(
+        volume, renderer, settle_time_in_seconds=1.0, automatic_pixel_ratio=False
+    )
+
+
+def test_still_camera_stays_at_full_quality(interactive_quality, camera):
+    assert not interactive_quality.update(camera, timestamp=0.0)
+    assert not interactive_quality.update(camera, timestamp=1.0)
+
+
+def test_moving_camera_lowers_quality(interactive_quality, volume, renderer, camera):
+    interactive_quality.update(camera, timestamp=0.0)
+    camera.world.position = (1, 0, 0)
+    assert interactive_quality.update(camera, timestamp=0.1)
+    assert volume.material.quality == "low"
+    assert renderer.pixel_ratio == 1.0
+
+
+def test_quality_is_restored_after_settling(
+    interactive_quality, volume, renderer, camera
+):
+    interactive_quality.update(camera, timestamp=0.0)
+    camera.world.position = (1, 0, 0)
+    interactive_quality.update(camera, timestamp=0.1)
+
+    # not settled yet
+    assert interactive_quality.update(camera, timestamp=0.5)
+    assert not interactive_quality.update(camera, timestamp=1.1)
+    assert volume.material.quality == "high"
+    assert renderer.pixel_ratio == 2.0
+
+
+def test_pending_loads_keep_interactive_quality(interactive_quality, volume, camera):
+    volume.wrapping_buffers[0].request_logical_roi(Roi((0, 0, 0), (8, 8, 8)))
+    assert interactive_quality.update(camera, timestamp=0.0)
+    assert interactive_quality.update(camera, timestamp=10.0)
+
+
+def test_rejects_unknown_quality(volume):
+    with pytest.raises(ValueError, match="interactive_quality"):
+        InteractiveQuality(volume, interactive_quality="ultra")
+
+
+def test_automatic_pixel_ratio_stays_automatic(volume, camera):
+    renderer = Renderer(pixel_ratio=None)
+    interactive_quality = InteractiveQuality(
+        volume, renderer, settle_time_in_seconds=1.0
+    )
+    interactive_quality.update(camera, timestamp=0.0)
+    camera.world.position = (1, 0, 0)
+    interactive_quality.update(camera, timestamp=0.1)
+    assert renderer.pixel_ratio == 1.0
+    assert not interactive_quality.update(camera, timestamp=1.1)
+    assert renderer._pixel_ratio is None
+    # e.g. after moving the window to another screen
+    renderer.screen_pixel_ratio = 1.0
+    assert renderer.pixel_ratio == 1.0
+
+
+def test_explicit_pixel_ratio_is_restored(interactive_quality, renderer, camera):
+    interactive_quality.update(camera, timestamp=0.0)
+    camera.world.position = (1, 0, 0)
+    interactive_quality.update(camera, timestamp=0.1)
+    assert renderer.pixel_ratio == 1.0
+    assert not interactive_quality.update(camera, timestamp=1.1)
+    # the renderer keeps its own setting instead of following the screen
+    assert renderer._pixel_ratio == 2.0
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda camera: setattr(camera, "fov", 30),
+        lambda camera: setattr(camera, "zoom", 2),
+        lambda camera: camera.set_view_size(100, 50),
+    ],
+    ids=["fov", "zoom", "viewport"],
+)
+def test_projection_changes_lower_quality(interactive_quality, camera, change):
+    interactive_quality.update(camera, timestamp=0.0)
+    change(camera)
+    assert interactive_quality.update(camera, timestamp=0.1)
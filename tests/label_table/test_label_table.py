@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from sub_volume import LabelTable
+
+
+def test_index_dtype_fits_capacity():
+    assert LabelTable(256).index_dtype == np.uint8
+    assert LabelTable(257).index_dtype == np.uint16
+    assert LabelTable(2**16).index_dtype == np.uint16
+
+
+@pytest.mark.parametrize("capacity", [1, 2**16 + 1])
+def test_rejects_invalid_capacity(capacity):
+    with pytest.raises(ValueError, match="capacity"):
+        LabelTable(capacity)
+
+
+def test_negative_labels_wrap_around():
+    table = LabelTable(16)
+    indices = table.acquire(np.array([0, -1], np.int64))
+    assert indices[1] != 0
+    assert table.label_of(indices)[1] == 2**64 - 1
+    # just like -1 uploaded to a uint32 texture
+    assert table.buffer.data[indices[1]] == 2**32 - 1
+    table.release(indices)
+    assert len(table) == 1
+
+
+def test_background_is_index_zero():
+    table = LabelTable(16)
+    indices = table.acquire(np.array([0, 2**40 + 7], np.uint64))
+    assert indices[0] == 0
+    assert indices[1] != 0
+    np.testing.assert_array_equal(table.label_of(indices), [0, 2**40 + 7])
+    # the shader sees the lower 32 bits of the label
+    assert table.buffer.data[indices[1]] == 7
+
+
+def test_shared_labels_keep_their_index():
+    table = LabelTable(16)
+    first = table.acquire(np.array([5, 6], np.uint64))
+    second = table.acquire(np.array([6, 7], np.uint64))
+    assert first[1] == second[0]
+
+    table.release(first)
+    # 6 is still held by the second acquire
+    assert table.acquire(np.array([6], np.uint64))[0] == second[0]
+
+
+def test_released_indices_are_reused():
+    table = LabelTable(3)
+    indices = table.acquire(np.array([5, 6], np.uint64))
+    assert len(table) == 3
+
+    table.release(indices)
+    assert len(table) == 1
+    reused = table.acquire(np.array([7, 8], np.uint64))
+    assert sorted(reused.tolist()) == sorted(indices.tolist())
+
+
+def test_full_table_falls_back_to_background():
+    table = LabelTable(2)
+    table.acquire(np.array([5], np.uint64))
+    with pytest.warns(UserWarning, match="distinct labels"):
+        indices = table.acquire(np.array([6], np.uint64))
+    assert indices[0] == 0
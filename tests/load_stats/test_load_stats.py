@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from sub_volume import FrameLoadStats, ScaleLoadStats, SubVolume, SubVolumeMaterial
+
+
+def make_volume(**kwargs) -> SubVolume:
+    data = np.arange(64 * 64 * 64, dtype=np.uint16).reshape((64, 64, 64))
+    segmentations = np.zeros(data.shape, np.uint32)
+    return SubVolume(
+        SubVolumeMaterial(0.5),
+        [(data, segmentations), data[::2, ::2, ::2]],
+        [(4, 4, 4), (4, 4, 4)],
+        [(8, 8, 8), (4, 4, 4)],
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def volume():
+    return make_volume()
+
+
+def test_stats_are_off_by_default(volume):
+    volume.center_on_position((32.0, 32.0, 32.0))
+    assert not volume.collect_load_stats
+    assert volume.load_stats is None
+    assert all(buffer.stats is None for buffer in volume.wrapping_buffers)
+
+
+def test_stats_per_scale(volume):
+    volume.collect_load_stats = True
+    volume.center_on_position((32.0, 32.0, 32.0))
+    stats = volume.load_stats
+    assert isinstance(stats, FrameLoadStats)
+    assert [scale.scale_index for scale in stats.scales] == [0, 1]
+    assert stats.backlog_in_chunks == 0
+    assert stats.center_on_position_time_in_seconds > 0
+
+    for scale, buffer in zip(stats.scales, volume.wrapping_buffers):
+        assert scale.chunks_requested > 0
+        assert scale.sub_rois == 1
+        assert scale.chunks_uploaded == scale.chunks_requested
+        assert scale.chunks_missed == scale.chunks_requested
+        assert scale.chunks_hit == 0
+        assert scale.read_latency_in_seconds > 0
+        assert scale.update_range_time_in_seconds > 0
+        # the full resolution scale reads and uploads uint16 data and uint32 segmentations, the other only data
+        bytes_per_pixel = 6 if buffer.has_segmentations else 2
+        assert (
+            scale.bytes_uploaded
+            == scale.chunks_uploaded
+            * np.prod(buffer.chunk_shape_in_pixels)
+            * bytes_per_pixel
+        )
+        assert scale.bytes_read == scale.bytes_uploaded
+
+    assert stats.total.chunks_uploaded == sum(
+        scale.chunks_uploaded for scale in stats.scales
+    )
+
+
+def test_stats_only_cover_the_last_call(volume):
+    volume.collect_load_stats = True
+    volume.center_on_position((32.0, 32.0, 32.0))
+    first = volume.load_stats.scales[0]
+    volume.center_on_position((32.0, 32.0, 32.0))
+    assert volume.load_stats.total.as_dict() == ScaleLoadStats().as_dict()
+
+    # moving by a chunk of the full resolution scale only loads a slab one chunk thick
+    volume.center_on_position((32.0, 32.0, 40.0))
+    scale = volume.load_stats.scales[0]
+    assert scale.chunks_requested == first.chunks_requested // 4
+    assert scale.chunks_uploaded == scale.chunks_requested
+
+
+def test_chunk_cache_hits():
+    volume = make_volume(chunk_cache_size_in_bytes=2**24)
+    volume.collect_load_stats = True
+    volume.center_on_position((32.0, 32.0, 32.0))
+    volume.center_on_position((32.0, 32.0, 48.0))
+    volume.center_on_position((32.0, 32.0, 32.0))
+    scale = volume.load_stats.scales[0]
+    assert scale.chunks_hit == scale.chunks_uploaded > 0
+    assert scale.chunks_missed == 0
+    assert scale.bytes_read == 0
+
+
+def test_callback_turns_on_stats(volume):
+    received = []
+    volume.load_stats_callback = received.append
+    assert volume.collect_load_stats
+    volume.center_on_position((32.0, 32.0, 32.0))
+    assert received == [volume.load_stats]
+
+    volume.collect_load_stats = False
+    volume.center_on_position((32.0, 32.0, 48.0))
+    assert len(received) == 1
+    assert volume.load_stats is None
+
+
+def test_take_resets_stats():
+    stats = ScaleLoadStats(0)
+    stats.add(chunks_hit=2, read_latency_in_seconds=0.5)
+    snapshot = stats.take()
+    assert snapshot.chunks_hit == 2
+    assert snapshot.read_latency_in_seconds == 0.5
+    assert stats.chunks_hit == 0
+    assert stats.read_latency_in_seconds == 0
@@ -0,0 +1,66 @@
+from collections.abc import Callable
+
+import numpy as np
+import numpy.typing as npt
+import pygfx as gfx
+import pytest
+from wgpu.gui.offscreen import WgpuCanvas as OffscreenWgpuCanvas
+
+from sub_volume import SubVolume, SubVolumeMaterial
+
+SHAPE = (32, 32, 32)
+
+
+@pytest.fixture
+def sparse_sub_volume() -> Callable[[SubVolumeMaterial], SubVolume]:
+    """Make a volume of scattered bright voxels with 1 or 2 scales, with half of its chunks empty."""
+
+    def make(material: SubVolumeMaterial, num_scales: int = 2) -> SubVolume:
+        rng = np.random.default_rng(0)
+        data = np.zeros(SHAPE, np.uint8)
+        bright = rng.random(SHAPE) < 0.05
+        bright[:, : SHAPE[1] // 2] = False
+        data[bright] = rng.integers(100, 256, bright.sum())
+        segmentations = (data > 0).astype(np.uint8) * 3
+        if num_scales == 1:
+            return SubVolume(
+                material, [(data, segmentations)], [(4, 4, 4)], [(8, 8, 8)]
+            )
+        return SubVolume(
+            material,
+            [
+                (data, segmentations),
+                (data[::2, ::2, ::2].copy(), segmentations[::2, ::2, ::2].copy()),
+            ],
+            # the finest scale only covers the middle of the volume, so rays pass through both scales
+            [(2, 2, 2), (4, 4, 4)],
+            [(8, 8, 8), (4, 4, 4)],
+        )
+
+    return make
+
+
+@pytest.fixture
+def render_sub_volume() -> Callable[..., npt.NDArray]:
+    """Render a SubVolume of SHAPE offscreen, looking at its center along z, and return the image."""
+
+    def render(
+        volume: SubVolume, before_draw: Callable[[], None] | None = None
+    ) -> npt.NDArray:
+        canvas = OffscreenWgpuCanvas(size=(64, 64), pixel_ratio=1)
+        renderer = gfx.renderers.WgpuRenderer(canvas)
+        scene = gfx.Scene()
+        scene.add(volume)
+        camera = gfx.PerspectiveCamera(45)
+        center = np.array(SHAPE[::-1]) / 2
+        camera.world.position = center - (0, 0, 3 * center[2])
+        camera.look_at(center)
+        volume.center_on_position(center)
+        canvas.request_draw(lambda: renderer.render(scene, camera))
+        # the first draw loads the chunks
+        canvas.draw()
+        if before_draw is not None:
+            before_draw()
+        return np.asarray(canvas.draw())
+
+    return render
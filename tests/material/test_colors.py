@@ -0,0 +1,25 @@
+import pytest
+
+from sub_volume import SubVolumeMaterial
+
+
+def test_changing_colors_keeps_the_uniform_buffer():
+    material = SubVolumeMaterial(0.5, color_capacity=8)
+    uniform_buffer = material.uniform_buffer
+    material.colors = [(0.0, 1.0, 1.0), (0.5, 1.0, 1.0)]
+    material.colors = [(0.25, 1.0, 1.0)]
+    # a new uniform buffer (or uniform type) would recompile the shader
+    assert material.uniform_buffer is uniform_buffer
+    assert material.colors == [(0.25, 1.0, 1.0)]
+    assert material.color_capacity == 8
+
+
+def test_too_many_colors():
+    material = SubVolumeMaterial(0.5, colors=[(0.0, 1.0, 1.0)], color_capacity=2)
+    with pytest.raises(ValueError, match="only holds 2"):
+        material.colors = [(0.0, 1.0, 1.0)] * 3
+
+
+def test_invalid_color_capacity():
+    with pytest.raises(ValueError, match="color_capacity"):
+        SubVolumeMaterial(0.5, color_capacity=0)
@@ -0,0 +1,31 @@
+import numpy as np
+from funlib.geometry import Roi
+
+from sub_volume import SubVolumeMaterial
+from sub_volume._wrapping_buffer import update_texture_range
+
+
+def set_occupancy(volume, intensity_range):
+    def before_draw():
+        for buffer in volume.wrapping_buffers:
+            buffer.occupancy_texture.data[...] = intensity_range
+            update_texture_range(
+                buffer.occupancy_texture, Roi((0, 0, 0), buffer.shape_in_chunks)
+            )
+
+    return before_draw
+
+
+def test_skipping_does_not_change_the_image(sparse_sub_volume, render_sub_volume):
+    skipping = render_sub_volume(sparse_sub_volume(SubVolumeMaterial(0.3)))
+    assert skipping[..., :3].any()
+
+    # chunks that seem to reach any threshold are never skipped
+    volume = sparse_sub_volume(SubVolumeMaterial(0.3))
+    not_skipping = render_sub_volume(volume, set_occupancy(volume, np.inf))
+    np.testing.assert_array_equal(skipping, not_skipping)
+
+    # while chunks that seem empty are skipped, even though they are not
+    volume = sparse_sub_volume(SubVolumeMaterial(0.3))
+    skipping_everything = render_sub_volume(volume, set_occupancy(volume, 0))
+    assert not np.array_equal(skipping, skipping_everything)
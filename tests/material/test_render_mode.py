@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from sub_volume import SubVolumeMaterial
+from sub_volume._material import RENDER_MODES
+
+
+def test_render_mode_defaults_to_lmip():
+    assert SubVolumeMaterial(0.5).render_mode == "lmip"
+
+
+def test_weighted_average_settings():
+    material = SubVolumeMaterial(
+        0.5,
+        render_mode="weighted_average",
+        average_samples=32,
+        average_spacing_growth=1.1,
+        average_fall_off=0.01,
+    )
+    assert material.render_mode == "weighted_average"
+    assert material.average_samples == 32
+    assert material.average_spacing_growth == pytest.approx(1.1)
+    assert material.average_fall_off == pytest.approx(0.01)
+
+
+def test_invalid_weighted_average_settings():
+    with pytest.raises(ValueError, match="render_mode"):
+        SubVolumeMaterial(0.5, render_mode="mip")
+    with pytest.raises(ValueError, match="average_samples"):
+        SubVolumeMaterial(0.5, average_samples=0)
+    with pytest.raises(ValueError, match="average_spacing_growth"):
+        SubVolumeMaterial(0.5, average_spacing_growth=0.5)
+    with pytest.raises(ValueError, match="average_fall_off"):
+        SubVolumeMaterial(0.5, average_fall_off=-1)
+
+
+def test_render_modes_draw(sparse_sub_volume, render_sub_volume):
+    images = {
+        render_mode: render_sub_volume(
+            sparse_sub_volume(SubVolumeMaterial(0.3, render_mode=render_mode))
+        )
+        for render_mode in RENDER_MODES
+    }
+    for image in images.values():
+        assert image[..., :3].any()
+    assert not np.array_equal(images["lmip"], images["weighted_average"])
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from sub_volume import SubVolumeMaterial
+from sub_volume._material import STEP_SIZE_PRESETS
+
+
+def test_step_size_defaults_to_automatic():
+    material = SubVolumeMaterial(0.5)
+    assert material.step_size is None
+    assert material.quality is None
+    assert material.uniform_buffer.data["step_size"] == 0
+
+
+def test_quality_sets_step_size():
+    material = SubVolumeMaterial(0.5, quality="low")
+    assert material.quality == "low"
+    assert material.step_size == STEP_SIZE_PRESETS["low"]
+
+    # setting the step size directly leaves the preset
+    material.step_size = 0.3
+    assert material.quality is None
+    assert material.step_size == pytest.approx(0.3)
+
+
+def test_invalid_step_size_settings():
+    with pytest.raises(ValueError, match="positive"):
+        SubVolumeMaterial(0.5, step_size=0)
+    with pytest.raises(ValueError, match="quality"):
+        SubVolumeMaterial(0.5, quality="ultra")
+    with pytest.raises(ValueError, match="only one"):
+        SubVolumeMaterial(0.5, step_size=0.5, quality="low")
+
+
+def test_adaptive_step_size():
+    material = SubVolumeMaterial(0.5)
+    assert material.adaptive_step_size
+    material.adaptive_step_size = False
+    assert not material.adaptive_step_size
+
+
+def test_adaptive_step_size_only_changes_coarse_scales(
+    sparse_sub_volume, render_sub_volume
+):
+    def render(adaptive_step_size, num_scales):
+        material = SubVolumeMaterial(0.3, adaptive_step_size=adaptive_step_size)
+        return render_sub_volume(sparse_sub_volume(material, num_scales))
+
+    # the finest scale is always marched one step at a time
+    single_scale = render(True, 1)
+    assert single_scale[..., :3].any()
+    np.testing.assert_array_equal(single_scale, render(False, 1))
+
+    # coarse scales take fewer samples, which moves some hits a little but keeps the image close
+    adaptive = render(True, 2).astype(np.float32)
+    fixed = render(False, 2).astype(np.float32)
+    assert not np.array_equal(adaptive, fixed)
+    assert np.abs(adaptive - fixed).mean() < 2
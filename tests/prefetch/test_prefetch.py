@@ -0,0 +1,201 @@
+import numpy as np
+import pytest
+from funlib.geometry import Roi
+
+from sub_volume import SubVolume, SubVolumeMaterial
+from sub_volume._prefetch import CameraTrajectory
+
+
+def test_velocity_of_empty_trajectory():
+    trajectory = CameraTrajectory()
+    np.testing.assert_array_equal(trajectory.velocity, (0, 0, 0))
+
+
+def test_velocity_of_constant_motion():
+    trajectory = CameraTrajectory()
+    for i in range(5):
+        trajectory.record((10.0 * i, 0.0, -2.0 * i), timestamp=0.1 * i)
+    np.testing.assert_allclose(trajectory.velocity, (100, 0, -20))
+
+
+def test_old_positions_are_ignored():
+    trajectory = CameraTrajectory(max_age_in_seconds=0.5)
+    trajectory.record((0.0, 0.0, 0.0), timestamp=0.0)
+    # the camera sat still for a while and then moved again
+    trajectory.record((100.0, 0.0, 0.0), timestamp=10.0)
+    trajectory.record((110.0, 0.0, 0.0), timestamp=10.1)
+    np.testing.assert_allclose(trajectory.velocity, (100, 0, 0))
+
+
+def test_predict_displacement_in_seconds():
+    trajectory = CameraTrajectory()
+    trajectory.record((0.0, 0.0, 0.0), timestamp=0.0)
+    trajectory.record((0.0, 5.0, 0.0), timestamp=0.5)
+    np.testing.assert_allclose(
+        trajectory.predict_displacement(horizon_in_seconds=2.0), (0, 20, 0)
+    )
+
+
+def test_predict_displacement_in_pixels():
+    trajectory = CameraTrajectory()
+    trajectory.record((0.0, 0.0, 0.0), timestamp=0.0)
+    trajectory.record((0.0, 0.0, 1.0), timestamp=0.5)
+    np.testing.assert_allclose(
+        trajectory.predict_displacement(horizon_in_pixels=(8, 8, 8)), (0, 0, 8)
+    )
+
+
+def test_predict_displacement_needs_one_horizon():
+    trajectory = CameraTrajectory()
+    with pytest.raises(ValueError, match="exactly one"):
+        trajectory.predict_displacement()
+    with pytest.raises(ValueError, match="exactly one"):
+        trajectory.predict_displacement(
+            horizon_in_seconds=1.0, horizon_in_pixels=(1, 1, 1)
+        )
+
+
+@pytest.fixture
+def prefetching_volume():
+    data = np.arange(64**3, dtype=np.float32).reshape((64, 64, 64))
+    segmentations = np.zeros(data.shape, dtype=np.uint32)
+    return SubVolume(
+        SubVolumeMaterial(lmip_threshold=0.5),
+        data_segmentation_pairs=[(data, segmentations)],
+        buffer_shape_in_chunks=[(4, 4, 4)],
+        chunk_shape_in_pixels=[(8, 8, 8)],
+        chunk_cache_size_in_bytes=1024**3,
+        prefetch_horizon_in_chunks=1,
+    )
+
+
+def test_prefetches_chunks_ahead_of_camera(prefetching_volume, monkeypatch):
+    # prefetch the whole slab at once, instead of depending on how fast the first prefetches finish
+    monkeypatch.setattr("sub_volume._wobject.MAX_PREFETCHES_IN_FLIGHT_PER_SCALE", None)
+    # world x is the last axis in data coordinates
+    prefetching_volume.center_on_position((20, 32, 32))
+    prefetching_volume.center_on_position((24, 32, 32))
+    prefetching_volume.close()
+
+    cache = prefetching_volume.chunk_cache
+    buffer = prefetching_volume.wrapping_buffers[0]
+    assert buffer._current_logical_roi_in_chunks.end[2] == 5
+    # the slab just ahead of the buffer is cached, but nothing behind or beyond it
+    assert (0, (2, 2, 5)) in cache
+    assert (0, (2, 2, 6)) not in cache
+    assert (0, (2, 2, 0)) not in cache
+
+
+def test_prefetching_requires_cache():
+    data = np.zeros((16, 16, 16), dtype=np.float32)
+    with pytest.raises(ValueError, match="chunk_cache_size_in_bytes"):
+        SubVolume(
+            SubVolumeMaterial(lmip_threshold=0.5),
+            data_segmentation_pairs=[(data, data)],
+            buffer_shape_in_chunks=[(2, 2, 2)],
+            chunk_shape_in_pixels=[(8, 8, 8)],
+            prefetch_horizon_in_seconds=0.5,
+        )
+
+
+def make_two_scale_volume(**kwargs):
+    data = np.zeros((64, 64, 64), dtype=np.float32)
+    return SubVolume(
+        SubVolumeMaterial(lmip_threshold=0.5),
+        data_segmentation_pairs=[data, data[::2, ::2, ::2]],
+        buffer_shape_in_chunks=[(4, 4, 4)] * 2,
+        chunk_shape_in_pixels=[(8, 8, 8)] * 2,
+        chunk_cache_size_in_bytes=1024**3,
+        **kwargs,
+    )
+
+
+def record_prefetches(volume):
+    prefetched = []
+    for buffer in volume.wrapping_buffers:
+        buffer.prefetch_logical_roi = (
+            lambda _roi, _executor, max_in_flight=None, scale=buffer.scale_index: (
+                prefetched.append((scale, max_in_flight))
+            )
+        )
+    return prefetched
+
+
+def test_prefetch_displacement_in_seconds_is_predicted_once():
+    volume = make_two_scale_volume(prefetch_horizon_in_seconds=0.5)
+    prefetched = record_prefetches(volume)
+    predictions = []
+    volume.camera_trajectory.predict_displacement = lambda **kwargs: (
+        predictions.append(kwargs) or np.ones(3)
+    )
+    volume._prefetch((32.0, 32.0, 32.0), [(32, 32, 32)] * 2)
+    assert len(predictions) == 1
+    assert [scale for scale, _ in prefetched] == [0, 1]
+    volume.close()
+
+
+def test_prefetch_continues_after_a_scale_without_displacement():
+    volume = make_two_scale_volume(prefetch_horizon_in_chunks=1)
+    prefetched = record_prefetches(volume)
+    displacements = iter([np.zeros(3), np.ones(3)])
+    volume.camera_trajectory.predict_displacement = lambda **_kwargs: next(
+        displacements
+    )
+    volume._prefetch((32.0, 32.0, 32.0), [(32, 32, 32)] * 2)
+    assert [scale for scale, _ in prefetched] == [1]
+    # every scale caps its prefetches
+    assert all(max_in_flight is not None for _, max_in_flight in prefetched)
+    volume.close()
+
+
+def test_prefetch_has_its_own_pool():
+    volume = make_two_scale_volume(prefetch_horizon_in_chunks=1, loader_workers=2)
+    assert volume._prefetch_executor is not None
+    assert volume._prefetch_executor is not volume.executor
+
+    volume.close()
+    for executor in (volume.executor, volume._prefetch_executor):
+        with pytest.raises(RuntimeError):
+            executor.submit(print)
+
+
+def test_prefetches_in_flight_are_capped():
+    class PendingExecutor:
+        # never runs anything, so every submitted prefetch stays in flight
+        def __init__(self):
+            self.submitted = []
+
+        def submit(self, _fn, *args):
+            self.submitted.append(args)
+
+    volume = make_two_scale_volume()
+    buffer = volume.wrapping_buffers[0]
+    executor = PendingExecutor()
+    roi = Roi((0, 0, 0), (32, 32, 32))
+    assert buffer.prefetch_logical_roi(roi, executor, max_in_flight=5) == 5
+    assert buffer.prefetch_logical_roi(roi, executor, max_in_flight=5) == 0
+    assert len(executor.submitted) == 5
+    assert buffer.prefetch_logical_roi(roi, executor) == 64 - 5
+
+
+def test_invalid_prefetch_arguments_dont_start_pools(monkeypatch):
+    def fail(*_args, **_kwargs):
+        raise AssertionError("a thread pool was created")
+
+    monkeypatch.setattr("sub_volume._wobject.ThreadPoolExecutor", fail)
+    with pytest.raises(ValueError, match="only one"):
+        make_two_scale_volume(
+            loader_workers=2,
+            prefetch_horizon_in_seconds=0.5,
+            prefetch_horizon_in_chunks=1,
+        )
+    data = np.zeros((16, 16, 16), dtype=np.float32)
+    with pytest.raises(ValueError, match="chunk_cache_size_in_bytes"):
+        SubVolume(
+            SubVolumeMaterial(lmip_threshold=0.5),
+            data_segmentation_pairs=[data],
+            buffer_shape_in_chunks=[(2, 2, 2)],
+            chunk_shape_in_pixels=[(8, 8, 8)],
+            loader_workers=2,
+            prefetch_horizon_in_seconds=0.5,
+        )
@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pygfx as gfx
+import pytest
+from funlib.geometry import Roi
+
+from sub_volume import RenderOnDemand, SubVolume, SubVolumeMaterial
+
+
+@pytest.fixture
+def volume():
+    data = np.zeros((16, 16, 16), np.uint8)
+    return SubVolume(
+        SubVolumeMaterial(0.5),
+        [(data, data)],
+        [(2, 2, 2)],
+        [(4, 4, 4)],
+    )
+
+
+@pytest.fixture
+def camera():
+    return gfx.PerspectiveCamera()
+
+
+@pytest.fixture
+def canvas():
+    # we only need to count the requested draws
+    canvas = SimpleNamespace(draws_requested=0)
+
+    def request_draw():
+        canvas.draws_requested += 1
+
+    canvas.request_draw = request_draw
+    return canvas
+
+
+@pytest.fixture
+def render_on_demand(volume, canvas, camera):
+    return RenderOnDemand(volume, canvas, camera)
+
+
+def draw(render_on_demand, volume, function=None):
+    """Run a frame, with the renderer drawing the volume."""
+
+    def draw_function():
+        # the renderer calls this right before drawing the volume
+        volume._update_object()
+        # and then uploads everything that changed. pygfx only bumps the revision of a resource on the first
+        # change after an upload.
+        resources = [volume.uniform_buffer, volume.material.uniform_buffer]
+        for buffer in volume.wrapping_buffers:
+            resources.extend(buffer.resources)
+        for resource in resources:
+            resource._gfx_get_chunk_descriptions()
+        if function is not None:
+            function()
+
+    render_on_demand(draw_function)()
+
+
+def test_needs_a_first_draw(render_on_demand, canvas):
+    assert render_on_demand.needs_redraw
+    assert render_on_demand.request_draw_if_needed()
+    assert canvas.draws_requested == 1
+
+
+def test_idle_volume_stops_drawing(render_on_demand, volume, canvas):
+    draw(render_on_demand, volume)
+    assert not render_on_demand.needs_redraw
+    assert canvas.draws_requested == 0
+
+
+def test_camera_movement_past_threshold(render_on_demand, volume, camera):
+    draw(render_on_demand, volume)
+    camera.world.position = (1e-7, 0, 0)
+    assert not render_on_demand.needs_redraw
+    camera.world.position = (1, 0, 0)
+    assert render_on_demand.needs_redraw
+
+
+def test_material_changes_need_a_redraw(render_on_demand, volume):
+    draw(render_on_demand, volume)
+    volume.material.lmip_threshold = 0.25
+    assert render_on_demand.needs_redraw
+    draw(render_on_demand, volume)
+    volume.material.render_mode = "weighted_average"
+    assert render_on_demand.needs_redraw
+
+
+def test_uploads_after_drawing_request_another_draw(render_on_demand, volume, canvas):
+    # like center_on_position, the roi is loaded after the frame is rendered
+    draw(
+        render_on_demand,
+        volume,
+        lambda: volume.wrapping_buffers[0].load_logical_roi(Roi((0, 0, 0), (4, 4, 4))),
+    )
+    assert canvas.draws_requested == 1
+    draw(render_on_demand, volume)
+    assert canvas.draws_requested == 1
+
+
+def test_pending_loads_need_a_redraw(render_on_demand, volume):
+    draw(render_on_demand, volume)
+    volume.wrapping_buffers[0].request_logical_roi(Roi((0, 0, 0), (4, 4, 4)))
+    assert render_on_demand.needs_redraw
+
+
+def test_prewarm_does_not_count_as_drawn(volume, monkeypatch):
+    class OffscreenRenderer:
+        # like the renderer, this updates the volume right before drawing it
+        def __init__(self, *_args, **_kwargs):
+            pass
+
+        def render(self, obj, _camera):
+            obj._update_object()
+
+    monkeypatch.setattr(gfx.renderers, "WgpuRenderer", OffscreenRenderer)
+    volume.center_on_position((8.0, 8.0, 8.0))
+    volume.prewarm_pipeline()
+    # nothing has been drawn to the real canvas yet
+    assert volume.needs_redraw()
@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from funlib.geometry import Roi
+
+from sub_volume import WrappingBuffer
+from sub_volume._scheduler import ChunkLoadScheduler
+
+
+@pytest.fixture
+def data():
+    return np.arange(32**3, dtype=np.float32).reshape((32, 32, 32))
+
+
+@pytest.fixture
+def buffers(data):
+    # scale 1 is half the resolution of scale 0, but uses the same chunk shape
+    downsampled = np.ascontiguousarray(data[::2, ::2, ::2])
+    return [
+        WrappingBuffer(
+            data, np.zeros(data.shape, np.uint32), (4, 4, 4), (4, 4, 4), scale_index=0
+        ),
+        WrappingBuffer(
+            downsampled,
+            np.zeros(downsampled.shape, np.uint32),
+            (4, 4, 4),
+            (4, 4, 4),
+            scale_factor=(0.5, 0.5, 0.5),
+            scale_index=1,
+        ),
+    ]
+
+
+def test_coarse_scales_come_first(buffers):
+    for buffer in buffers:
+        buffer.request_logical_roi(Roi((0, 0, 0), (16, 16, 16)))
+    scheduler = ChunkLoadScheduler(buffers)
+
+    prioritized = scheduler.prioritized_chunks((0, 0, 0))
+    scales = [buffers.index(buffer) for buffer, _ in prioritized]
+    assert scales == sorted(scales, reverse=True)
+    assert len(prioritized) == 2 * 4**3
+
+
+def test_near_chunks_come_first_within_a_scale(buffers):
+    buffers[0].request_logical_roi(Roi((0, 0, 0), (16, 16, 16)))
+    scheduler = ChunkLoadScheduler(buffers)
+
+    prioritized = scheduler.prioritized_chunks((15, 15, 15))
+    assert prioritized[0] == (buffers[0], (3, 3, 3))
+    assert prioritized[-1] == (buffers[0], (0, 0, 0))
+
+
+def test_distance_is_measured_in_base_pixels(buffers):
+    buffers[1].request_logical_roi(Roi((0, 0, 0), (16, 16, 16)))
+    scheduler = ChunkLoadScheduler(buffers)
+
+    # chunk (1, 1, 1) of scale 1 covers base pixels 8 to 16
+    prioritized = scheduler.prioritized_chunks((12, 12, 12))
+    assert prioritized[0] == (buffers[1], (1, 1, 1))
+
+
+def test_load_fills_every_scale(buffers):
+    for buffer in buffers:
+        buffer.request_logical_roi(Roi((0, 0, 0), (16, 16, 16)))
+    ChunkLoadScheduler(buffers).load((0, 0, 0))
+
+    for buffer in buffers:
+        assert not buffer.has_pending_loads
+        np.testing.assert_array_equal(
+            buffer.texture.data, buffer.backing_data[:16, :16, :16]
+        )
+        assert buffer._committed_logical_roi_in_pixels == Roi((0, 0, 0), (16, 16, 16))
+
+
+def test_max_reads_in_flight(buffers):
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for buffer in buffers:
+            buffer.executor = executor
+            buffer.request_logical_roi(Roi((0, 0, 0), (16, 16, 16)))
+        scheduler = ChunkLoadScheduler(buffers, max_reads_in_flight=5)
+        scheduler.load((0, 0, 0))
+
+        # only the coarsest scale has been submitted so far
+        assert sum(buffer.reads_in_flight for buffer in buffers) <= 5
+        assert buffers[0].reads_in_flight == 0
+        assert len(buffers[0].pending_chunks) == 4**3
+
+        while any(buffer.has_pending_loads for buffer in buffers):
+            for buffer in buffers:
+                buffer.commit_loads(wait=True)
+            scheduler.load((0, 0, 0))
+
+    for buffer in buffers:
+        np.testing.assert_array_equal(
+            buffer.texture.data, buffer.backing_data[:16, :16, :16]
+        )
+
+
+def test_byte_budget_spreads_loads_across_frames(buffers):
+    buffer = buffers[0]
+    buffer.request_logical_roi(Roi((0, 0, 0), (16, 4, 4)))
+    # a 4x4x4 chunk is 256 bytes of float32 data and 256 bytes of uint32 segmentations
+    scheduler = ChunkLoadScheduler(buffers, max_upload_bytes_per_frame=1024)
+
+    assert scheduler.backlog_in_chunks == 4
+    scheduler.load((0, 0, 0))
+    assert scheduler.backlog_in_chunks == 2
+    # the shader must not see the chunks that haven't been written yet
+    assert buffer._committed_logical_roi_in_pixels is None
+    scheduler.load((0, 0, 0))
+    assert scheduler.backlog_in_chunks == 0
+    assert buffer._committed_logical_roi_in_pixels == Roi((0, 0, 0), (16, 4, 4))
+    np.testing.assert_array_equal(
+        buffer.texture.data[:16, :4, :4], buffer.backing_data[:16, :4, :4]
+    )
+
+
+def test_budget_always_loads_one_chunk(buffers):
+    buffers[0].request_logical_roi(Roi((0, 0, 0), (8, 4, 4)))
+    scheduler = ChunkLoadScheduler(
+        buffers, max_upload_bytes_per_frame=0, max_upload_milliseconds_per_frame=0
+    )
+    scheduler.load((0, 0, 0))
+    assert scheduler.backlog_in_chunks == 1
+
+
+def test_budget_limits_background_commits(buffers):
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        buffer = buffers[0]
+        buffer.executor = executor
+        buffer.request_logical_roi(Roi((0, 0, 0), (16, 4, 4)))
+        scheduler = ChunkLoadScheduler(buffers, max_upload_bytes_per_frame=512)
+        # submits all 4 reads
+        scheduler.load((0, 0, 0))
+        assert buffer.reads_in_flight == 4
+        executor.submit(lambda: None).result()
+
+        # each frame commits one finished read, nearest to the camera first
+        scheduler.load((16, 0, 0))
+        assert buffer.reads_in_flight == 3
+        np.testing.assert_array_equal(
+            buffer.texture.data[12:16, :4, :4], buffer.backing_data[12:16, :4, :4]
+        )
+        assert np.all(buffer.texture.data[:12] == 0)
+        for _ in range(3):
+            scheduler.load((16, 0, 0))
+        assert scheduler.backlog_in_chunks == 0
+        assert buffer._committed_logical_roi_in_pixels == Roi((0, 0, 0), (16, 4, 4))
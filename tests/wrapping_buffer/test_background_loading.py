@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+import numpy as np
+import pytest
+from funlib.geometry import Roi
+
+from sub_volume import WrappingBuffer
+
+
+@pytest.fixture
+def executor():
+    # a single worker lets us block every read behind a single task
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        yield executor
+
+
+@pytest.fixture
+def background_buffer(backing_data, segmentations, chunk_size, buffer_chunks, executor):
+    return WrappingBuffer(
+        backing_data, segmentations, buffer_chunks, chunk_size, executor=executor
+    )
+
+
+@pytest.fixture
+def block_executor(executor):
+    """Block the executor until the returned event is set."""
+    events = []
+
+    def block():
+        event = Event()
+        executor.submit(event.wait)
+        events.append(event)
+        return event
+
+    yield block
+    # make sure we never leave the executor hanging
+    for event in events:
+        event.set()
+
+
+def test_background_load_matches_sync(buffer, background_buffer):
+    roi = Roi((0, 0, 0), (20, 20, 20))
+    buffer.load_logical_roi(roi)
+    background_buffer.load_logical_roi(roi)
+    background_buffer.commit_loads(wait=True)
+
+    assert not background_buffer.has_pending_loads
+    np.testing.assert_array_equal(background_buffer.texture.data, buffer.texture.data)
+    assert (
+        background_buffer._committed_logical_roi_in_pixels
+        == buffer._committed_logical_roi_in_pixels
+    )
+
+
+def test_background_load_does_not_write_before_commit(
+    backing_data, background_buffer, block_executor
+):
+    event = block_executor()
+    background_buffer.load_logical_roi(Roi((0, 0, 0), (4, 4, 4)))
+    background_buffer.commit_loads()
+
+    assert background_buffer.has_pending_loads
+    assert np.all(background_buffer.texture.data == 0)
+    assert background_buffer._current_logical_roi_in_pixels == Roi((0, 0, 0), (4, 4, 4))
+    assert background_buffer._committed_logical_roi_in_pixels is None
+
+    event.set()
+    background_buffer.commit_loads(wait=True)
+    np.testing.assert_array_equal(
+        background_buffer.texture.data[0:4, 0:4, 0:4], backing_data[0:4, 0:4, 0:4]
+    )
+    assert background_buffer._committed_logical_roi_in_pixels == Roi(
+        (0, 0, 0), (4, 4, 4)
+    )
+
+
+def test_committed_roi_shrinks_while_loading(background_buffer, block_executor):
+    background_buffer.load_logical_roi(Roi((0, 0, 0), (8, 8, 8)))
+    background_buffer.commit_loads(wait=True)
+    assert background_buffer._committed_logical_roi_in_pixels == Roi(
+        (0, 0, 0), (8, 8, 8)
+    )
+
+    event = block_executor()
+    background_buffer.load_logical_roi(Roi((4, 0, 0), (8, 8, 8)))
+    # only the overlap between the old and new rois is guaranteed to be valid
+    assert background_buffer._committed_logical_roi_in_pixels == Roi(
+        (4, 0, 0), (4, 8, 8)
+    )
+
+    event.set()
+    background_buffer.commit_loads(wait=True)
+    assert background_buffer._committed_logical_roi_in_pixels == Roi(
+        (4, 0, 0), (8, 8, 8)
+    )
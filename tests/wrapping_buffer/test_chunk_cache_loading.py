@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from funlib.geometry import Roi
+
+from sub_volume import ChunkCache, WrappingBuffer
+
+
+@pytest.fixture
+def chunk_cache():
+    return ChunkCache(max_bytes=1024**3)
+
+
+@pytest.fixture
+def cached_buffer(backing_data, segmentations, chunk_size, buffer_chunks, chunk_cache):
+    return WrappingBuffer(
+        backing_data, segmentations, buffer_chunks, chunk_size, chunk_cache=chunk_cache
+    )
+
+
+def test_cached_load_matches_uncached(buffer, cached_buffer):
+    roi = Roi((4, 8, 12), (20, 20, 20))
+    buffer.load_logical_roi(roi)
+    cached_buffer.load_logical_roi(roi)
+    np.testing.assert_array_equal(cached_buffer.texture.data, buffer.texture.data)
+
+
+def test_revisit_hits_cache(cached_buffer, chunk_cache):
+    # 2 x 1 x 1 chunks
+    cached_buffer.load_logical_roi(Roi((0, 0, 0), (8, 4, 4)))
+    assert chunk_cache.misses == 2
+    assert chunk_cache.hits == 0
+
+    # move far enough away that both chunks leave the buffer, then come back
+    cached_buffer.load_logical_roi(Roi((20, 0, 0), (8, 4, 4)))
+    cached_buffer.load_logical_roi(Roi((0, 0, 0), (8, 4, 4)))
+    assert chunk_cache.misses == 4
+    assert chunk_cache.hits == 2
+    np.testing.assert_array_equal(
+        cached_buffer.texture.data[0:8, 0:4, 0:4],
+        cached_buffer.backing_data[0:8, 0:4, 0:4],
+    )
+
+
+def test_scales_do_not_share_keys(backing_data, segmentations, chunk_size, chunk_cache):
+    downsampled = np.ascontiguousarray(backing_data[::2, ::2, ::2])
+    buffers = [
+        WrappingBuffer(
+            data, segs, (2, 2, 2), chunk_size, chunk_cache=chunk_cache, scale_index=i
+        )
+        for i, (data, segs) in enumerate(
+            [(backing_data, segmentations), (downsampled, segmentations[::2, ::2, ::2])]
+        )
+    ]
+    for buffer in buffers:
+        buffer.load_logical_roi(Roi((0, 0, 0), (4, 4, 4)))
+    assert chunk_cache.hits == 0
+    np.testing.assert_array_equal(
+        buffers[1].texture.data[0:4, 0:4, 0:4], downsampled[0:4, 0:4, 0:4]
+    )
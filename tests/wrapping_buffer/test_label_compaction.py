@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from funlib.geometry import Coordinate, Roi
+
+from sub_volume import LabelTable, WrappingBuffer
+from sub_volume._label_table import CompactLabels
+
+
+@pytest.fixture
+def labels():
+    # 64-bit ids with one label per chunk (and some background)
+    chunk_ids = np.arange(4**3, dtype=np.uint64).reshape((4, 4, 4)) + 2**40
+    labels = np.kron(chunk_ids, np.ones((4, 4, 4), np.uint64))
+    labels[::2] = 0
+    return labels
+
+
+@pytest.fixture
+def label_table():
+    return LabelTable(256)
+
+
+@pytest.fixture
+def compact_buffer(labels, label_table):
+    return WrappingBuffer(
+        np.zeros(labels.shape, np.uint8),
+        labels,
+        (2, 2, 2),
+        (4, 4, 4),
+        label_table=label_table,
+    )
+
+
+def test_segmentations_texture_uses_index_dtype(compact_buffer):
+    assert compact_buffer.segmentations_texture.data.dtype == np.uint8
+
+
+def test_compact_indices_map_back_to_labels(compact_buffer, label_table, labels):
+    compact_buffer.load_logical_roi(Roi((4, 4, 4), (8, 8, 8)))
+    texture = compact_buffer.segmentations_texture.data
+    # the roi wraps around the buffer, so we unwrap it
+    unwrapped = np.roll(texture, (-4, -4, -4), axis=(0, 1, 2))
+    np.testing.assert_array_equal(
+        label_table.label_of(unwrapped), labels[4:12, 4:12, 4:12]
+    )
+
+
+def test_moving_releases_labels(compact_buffer, label_table):
+    compact_buffer.load_logical_roi(Roi((0, 0, 0), (8, 8, 8)))
+    # 8 chunks with 1 label each, plus the background
+    assert len(label_table) == 9
+
+    # each move overwrites 4 slots, whose labels are released
+    for x in range(4, 16, 4):
+        compact_buffer.load_logical_roi(Roi((x, 0, 0), (8, 8, 8)))
+        assert len(label_table) == 9
+
+
+def test_labels_are_found_where_they_are_read(
+    compact_buffer, label_table, labels, monkeypatch
+):
+    compact_buffer.request_logical_roi(Roi((0, 0, 0), (8, 8, 8)))
+    chunk = (1, 0, 1)
+    read_result = compact_buffer.read_chunk(chunk)
+    compact_labels = read_result[2]
+    assert isinstance(compact_labels, CompactLabels)
+    ((roi, chunk_labels, local_indices),) = compact_labels.chunks
+    assert roi == Roi((0, 0, 0), (4, 4, 4))
+    np.testing.assert_array_equal(chunk_labels, [0, 2**40 + 17])
+    assert local_indices.dtype == np.uint8
+
+    # committing only looks the labels up in the label table
+    def unique(*_args, **_kwargs):
+        raise AssertionError("np.unique was called while committing")
+
+    monkeypatch.setattr(np, "unique", unique)
+    compact_buffer.write_chunk(chunk, read_result)
+    np.testing.assert_array_equal(
+        label_table.label_of(compact_buffer.segmentations_texture.data[4:8, :4, 4:8]),
+        labels[4:8, :4, 4:8],
+    )
+
+
+def test_chunks_with_many_labels(label_table):
+    # more labels in a chunk than the uint8 index texture can address
+    labels = np.arange(8**3, dtype=np.uint64).reshape((8, 8, 8))
+    compact_labels = CompactLabels.from_segmentations(labels, Coordinate(8, 8, 8))
+    ((_, chunk_labels, local_indices),) = compact_labels.chunks
+    assert local_indices.dtype == np.uint16
+    np.testing.assert_array_equal(chunk_labels[local_indices], labels)
+
+    buffer = WrappingBuffer(
+        np.zeros(labels.shape, np.uint8),
+        labels,
+        (1, 1, 1),
+        (8, 8, 8),
+        label_table=label_table,
+    )
+    with pytest.warns(UserWarning, match="distinct labels"):
+        buffer.load_logical_roi(Roi((0, 0, 0), (8, 8, 8)))
+    assert len(label_table) == 256
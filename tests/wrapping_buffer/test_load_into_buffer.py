@@ -1,6 +1,8 @@
 import numpy as np
 from funlib.geometry import Roi
 
+from sub_volume import ArraySource, ChunkCache, WrappingBuffer
+
 # todo: use the chunk size fixture somehow and don't hardcode chunk size as 4?
 
 
@@ -28,3 +30,53 @@ def test_load_into_buffer_offset(buffer):
     source_data = buffer.backing_data[4:8, 4:8, 4:8]
 
     np.testing.assert_array_equal(source_data, written_data)
+
+
+class RecordingSource(ArraySource):
+    def __init__(self, array):
+        super().__init__(array)
+        self.outs = []
+
+    def start_read(self, roi_in_pixels, out=None):
+        self.outs.append(out)
+        return super().start_read(roi_in_pixels, out)
+
+
+def test_load_into_buffer_reads_into_textures(backing_data, buffer_chunks):
+    # int32 data has to be converted to float32, which the sources do while they read into the textures
+    data_source = RecordingSource(backing_data.astype(np.int32))
+    segmentations_source = RecordingSource(backing_data.astype(np.uint64))
+    buffer = WrappingBuffer(data_source, segmentations_source, buffer_chunks, (4, 4, 4))
+
+    buffer.load_into_buffer(Roi((1, 1, 1), (2, 2, 2)), Roi((3, 3, 3), (2, 2, 2)))
+
+    assert np.shares_memory(data_source.outs[0], buffer.texture.data)
+    assert np.shares_memory(
+        segmentations_source.outs[0], buffer.segmentations_texture.data
+    )
+    np.testing.assert_array_equal(
+        buffer.texture.data[4:12, 4:12, 4:12], backing_data[12:20, 12:20, 12:20]
+    )
+    np.testing.assert_array_equal(
+        buffer.segmentations_texture.data[4:12, 4:12, 4:12],
+        backing_data[12:20, 12:20, 12:20],
+    )
+    assert buffer.occupancy_texture.data[1, 1, 1].tolist() == [
+        backing_data[12:16, 12:16, 12:16].min(),
+        backing_data[12:16, 12:16, 12:16].max(),
+    ]
+
+
+def test_load_into_buffer_stages_with_chunk_cache(backing_data, buffer_chunks):
+    # the chunk cache needs its own copy of the data, so it isn't read into the textures
+    data_source = RecordingSource(backing_data)
+    buffer = WrappingBuffer(
+        data_source, None, buffer_chunks, (4, 4, 4), chunk_cache=ChunkCache(2**20)
+    )
+
+    buffer.load_into_buffer(Roi((0, 0, 0), (1, 1, 1)), Roi((0, 0, 0), (1, 1, 1)))
+
+    assert data_source.outs == [None]
+    np.testing.assert_array_equal(
+        buffer.texture.data[0:4, 0:4, 0:4], backing_data[0:4, 0:4, 0:4]
+    )
@@ -0,0 +1,23 @@
+import numpy as np
+from funlib.geometry import Roi
+
+from sub_volume import WrappingBuffer
+
+
+def test_occupancy_holds_chunk_intensity_range(buffer, backing_data):
+    buffer.load_logical_roi(Roi((0, 0, 0), (8, 8, 8)))
+    chunk = backing_data[4:8, 0:4, 4:8]
+    np.testing.assert_array_equal(
+        buffer.occupancy_texture.data[1, 0, 1], (chunk.min(), chunk.max())
+    )
+
+
+def test_occupancy_of_partial_chunks_ignores_stale_data(chunk_size, buffer_chunks):
+    # 6 pixels is one and a half chunks, so the second chunk only partially overwrites its slot
+    backing_data = np.full((6, 4, 4), 10, np.uint8)
+    buffer = WrappingBuffer(
+        backing_data, np.zeros_like(backing_data), buffer_chunks, chunk_size
+    )
+    buffer.texture.data[...] = 255
+    buffer.load_logical_roi(Roi((0, 0, 0), (6, 4, 4)))
+    np.testing.assert_array_equal(buffer.occupancy_texture.data[1, 0, 0], (10, 10))
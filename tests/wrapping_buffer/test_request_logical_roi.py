@@ -0,0 +1,38 @@
+import numpy as np
+from funlib.geometry import Roi
+
+
+def test_request_does_not_load(buffer):
+    buffer.request_logical_roi(Roi((0, 0, 0), (8, 4, 4)))
+    assert buffer.pending_chunks == [(0, 0, 0), (1, 0, 0)]
+    assert buffer.has_pending_loads
+    assert np.all(buffer.texture.data == 0)
+    assert buffer._committed_logical_roi_in_pixels is None
+
+
+def test_load_chunk(buffer):
+    buffer.request_logical_roi(Roi((0, 0, 0), (8, 4, 4)))
+    buffer.load_chunk((1, 0, 0))
+    assert buffer.pending_chunks == [(0, 0, 0)]
+    np.testing.assert_array_equal(
+        buffer.texture.data[4:8, 0:4, 0:4], buffer.backing_data[4:8, 0:4, 0:4]
+    )
+    assert np.all(buffer.texture.data[0:4, 0:4, 0:4] == 0)
+
+
+def test_request_drops_chunks_outside_new_roi(buffer):
+    buffer.request_logical_roi(Roi((0, 0, 0), (8, 4, 4)))
+    buffer.request_logical_roi(Roi((4, 0, 0), (8, 4, 4)))
+    assert buffer.pending_chunks == [(1, 0, 0), (2, 0, 0)]
+
+
+def test_stale_chunks_are_not_written(buffer):
+    buffer.request_logical_roi(Roi((0, 0, 0), (4, 4, 4)))
+    result = buffer.read_chunk((0, 0, 0))
+    # chunk (5, 0, 0) shares a slot with chunk (0, 0, 0) in a buffer that is 5 chunks wide
+    buffer.request_logical_roi(Roi((20, 0, 0), (4, 4, 4)))
+    buffer.load_chunk((5, 0, 0))
+    buffer.write_chunk((0, 0, 0), result)
+    np.testing.assert_array_equal(
+        buffer.texture.data[0:4, 0:4, 0:4], buffer.backing_data[20:24, 0:4, 0:4]
+    )
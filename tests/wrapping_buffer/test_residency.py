@@ -0,0 +1,44 @@
+import numpy as np
+from funlib.geometry import Roi
+
+from sub_volume._wrapping_buffer import chunk_coordinates
+
+
+def resident_chunks(buffer):
+    """Map each resident slot to the logical chunk it holds in (x, y, z) order."""
+    residency = buffer.residency_texture.data
+    return {
+        slot: tuple(int(c) for c in residency[slot][2::-1])
+        for slot in chunk_coordinates(Roi((0, 0, 0), buffer.shape_in_chunks))
+        if residency[slot][3] == 1
+    }
+
+
+def test_nothing_is_resident_initially(buffer):
+    assert resident_chunks(buffer) == {}
+
+
+def test_loaded_chunks_are_resident(buffer):
+    buffer.load_logical_roi(Roi((0, 0, 0), (8, 8, 8)))
+    assert resident_chunks(buffer) == {
+        chunk: chunk for chunk in chunk_coordinates(Roi((0, 0, 0), (2, 2, 2)))
+    }
+
+
+def test_wrapped_slots_hold_new_chunks(buffer):
+    buffer.load_logical_roi(Roi((0, 0, 0), (20, 4, 4)))
+    buffer.load_logical_roi(Roi((4, 0, 0), (20, 4, 4)))
+    # the chunk at x=5 wrapped around into the slot of the chunk at x=0
+    assert resident_chunks(buffer)[(0, 0, 0)] == (5, 0, 0)
+    assert resident_chunks(buffer)[(1, 0, 0)] == (1, 0, 0)
+
+
+def test_pending_chunks_are_not_resident(buffer):
+    buffer.request_logical_roi(Roi((0, 0, 0), (8, 4, 4)))
+    buffer.load_chunk((1, 0, 0))
+    # the shader samples the whole requested roi, but only the loaded chunk is resident
+    assert buffer._current_logical_roi_in_pixels == Roi((0, 0, 0), (8, 4, 4))
+    assert resident_chunks(buffer) == {(1, 0, 0): (1, 0, 0)}
+    np.testing.assert_array_equal(
+        buffer.uniform_buffer.data["current_logical_shape_in_pixels"], (4, 4, 8)
+    )
@@ -0,0 +1,83 @@
+from itertools import product
+from types import SimpleNamespace
+
+import numpy as np
+from funlib.geometry import Coordinate, Roi
+from hypothesis import given
+from hypothesis import strategies as st
+
+# noinspection PyProtectedMember
+from sub_volume._roi_array import box_chunks, chunks_in_box, roi_to_box
+
+# noinspection PyProtectedMember
+from sub_volume._wrapping_buffer import (
+    WrappingBuffer,
+    chunk_coordinates,
+)
+
+# the loop based implementation that wrap_box replaced. the array backed version must give the exact same results,
+# in the same order, since the order decides which chunks are loaded first.
+
+
+def reference_wrap(logical_roi_in_chunks: Roi, grid_shape: tuple[int, ...]):
+    if logical_roi_in_chunks.empty:
+        return []
+    offset = logical_roi_in_chunks.offset
+    end = logical_roi_in_chunks.end
+    split_coords = []
+    for d in range(len(offset)):
+        boundary = (offset[d] // grid_shape[d] + 1) * grid_shape[d]
+        if boundary < end[d]:
+            split_coords.append([offset[d], boundary, end[d]])
+        else:
+            split_coords.append([offset[d], end[d]])
+
+    result = []
+    for corner in product(*[range(len(s) - 1) for s in split_coords]):
+        sub_offset = tuple(split_coords[d][i] for d, i in enumerate(corner))
+        sub_end = tuple(split_coords[d][i + 1] for d, i in enumerate(corner))
+        sub_shape = tuple(e - o for o, e in zip(sub_offset, sub_end))
+        if any(s == 0 for s in sub_shape):
+            continue
+        buffer_offset = tuple((o % s) for o, s in zip(sub_offset, grid_shape))
+        result.append((Roi(buffer_offset, sub_shape), Roi(sub_offset, sub_shape)))
+    return result
+
+
+@st.composite
+def roi_in_buffer(draw, max_dims=4, max_grid=7):
+    dims = draw(st.integers(min_value=1, max_value=max_dims))
+    grid_shape = tuple(
+        draw(st.integers(min_value=1, max_value=max_grid)) for _ in range(dims)
+    )
+    offset = tuple(draw(st.integers(min_value=0, max_value=100)) for _ in range(dims))
+    shape = tuple(draw(st.integers(min_value=0, max_value=g)) for g in grid_shape)
+    return Roi(offset, shape), grid_shape
+
+
+@given(roi_in_buffer())
+def test_wrap_matches_reference(data):
+    roi, grid_shape = data
+    # wrapping only needs the buffer's shape, so we don't build a whole buffer for every number of dimensions
+    buffer = SimpleNamespace(shape_in_chunks=Coordinate(grid_shape))
+    result = WrappingBuffer.wrap_logical_roi_into_buffer_rois(buffer, roi)
+    assert result == reference_wrap(roi, grid_shape)
+
+
+@given(roi_in_buffer(max_grid=5))
+def test_box_chunks_match_chunk_coordinates(data):
+    roi, _ = data
+    assert list(map(tuple, box_chunks(roi_to_box(roi)).tolist())) == chunk_coordinates(
+        roi
+    )
+
+
+def test_box_chunks_concatenates_boxes():
+    boxes = np.array([[[0, 0], [1, 2]], [[5, 5], [6, 6]]])
+    np.testing.assert_array_equal(box_chunks(boxes), [[0, 0], [0, 1], [5, 5]])
+
+
+def test_chunks_in_box():
+    chunks = np.array([[0, 0], [1, 1], [2, 2]])
+    box = roi_to_box(Roi((1, 1), (2, 2)))
+    np.testing.assert_array_equal(chunks_in_box(chunks, box), [False, True, True])
@@ -1,6 +1,6 @@
 from itertools import combinations
 
-from funlib.geometry import Roi
+from funlib.geometry import Coordinate, Roi
 from hypothesis import given
 from hypothesis import strategies as st
 
@@ -136,3 +136,52 @@ def test_property_no_overlap_with_b(data):
     assert actual_size == expected_size
 
     assert all(not a.intersects(b) for a, b in combinations(result, 2))
+
+
+# the loop based implementation that subtract_boxes replaced. subtract_rois must give the exact same slabs, in the
+# same order, since the order decides which chunks are loaded first.
+
+
+def set_dim(coord: Coordinate, dim: int, value) -> Coordinate:
+    return Coordinate(*coord[:dim], value, *coord[dim + 1 :])
+
+
+def reference_subtract_rois(roi_a: Roi, roi_b: Roi) -> list[Roi]:
+    if roi_a.empty:
+        return []
+    if roi_b.empty or not roi_a.intersects(roi_b):
+        return [roi_a]
+
+    roi_b = roi_a.intersect(roi_b)
+    result = []
+
+    base_begin = roi_a.begin
+    base_end = roi_a.end
+
+    for d in range(roi_a.dims):
+        a0, a1 = roi_a.begin[d], roi_a.end[d]
+        b0, b1 = roi_b.begin[d], roi_b.end[d]
+
+        if a0 < b0:
+            slab_begin = base_begin
+            slab_end = set_dim(base_end, d, b0)
+            result.append(
+                Roi(slab_begin, tuple(e - o for o, e in zip(slab_begin, slab_end)))
+            )
+            base_begin = set_dim(base_begin, d, b0)
+
+        if b1 < a1:
+            slab_begin = set_dim(base_begin, d, b1)
+            slab_end = base_end
+            result.append(
+                Roi(slab_begin, tuple(e - o for o, e in zip(slab_begin, slab_end)))
+            )
+            base_end = set_dim(base_end, d, b1)
+
+    return result
+
+
+@given(two_random_rois())
+def test_property_matches_reference(data):
+    a, b, _ = data
+    assert subtract_rois(a, b) == reference_subtract_rois(a, b)
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import tensorstore as ts
+from funlib.geometry import Roi
+
+from sub_volume import WrappingBuffer
+from sub_volume._scheduler import ChunkLoadScheduler
+from sub_volume._wrapping_buffer import ChunkRead
+
+
+def to_tensorstore(array):
+    store = ts.open(
+        {
+            "driver": "zarr",
+            "kvstore": {"driver": "memory"},
+            "metadata": {"chunks": [4, 4, 4]},
+        },
+        create=True,
+        dtype=array.dtype,
+        shape=array.shape,
+    ).result()
+    store[...].write(array).result()
+    return store
+
+
+@pytest.fixture
+def tensorstore_buffer(backing_data, segmentations, chunk_size, buffer_chunks):
+    return WrappingBuffer(
+        to_tensorstore(backing_data),
+        to_tensorstore(segmentations),
+        buffer_chunks,
+        chunk_size,
+    )
+
+
+def test_tensorstore_reads_concurrently(tensorstore_buffer, buffer):
+    assert tensorstore_buffer.reads_concurrently
+    assert not buffer.reads_concurrently
+
+
+def test_start_read_chunk_returns_futures(tensorstore_buffer, backing_data):
+    chunk_read = tensorstore_buffer.start_read_chunk((1, 0, 0))
+    assert isinstance(chunk_read, ChunkRead)
+    roi, data, _ = chunk_read.result()
+    assert roi == Roi((4, 0, 0), (4, 4, 4))
+    assert chunk_read.done()
+    np.testing.assert_array_equal(data, backing_data[4:8, 0:4, 0:4])
+
+
+def test_tensorstore_load_matches_numpy(tensorstore_buffer, buffer):
+    roi = Roi((4, 8, 12), (20, 20, 20))
+    buffer.load_logical_roi(roi)
+    tensorstore_buffer.load_logical_roi(roi)
+    assert not tensorstore_buffer.has_pending_loads
+    np.testing.assert_array_equal(tensorstore_buffer.texture.data, buffer.texture.data)
+
+
+def test_scheduler_issues_all_reads_before_committing(tensorstore_buffer):
+    tensorstore_buffer.request_logical_roi(Roi((0, 0, 0), (16, 4, 4)))
+    # a 4x4x4 chunk is 128 bytes of uint16 data and 128 bytes of uint16 segmentations, so only 2 chunks fit in
+    # the budget, but all 4 reads should be issued
+    scheduler = ChunkLoadScheduler([tensorstore_buffer], max_upload_bytes_per_frame=512)
+    scheduler.load((0, 0, 0))
+    assert tensorstore_buffer.pending_chunks == []
+    assert tensorstore_buffer.reads_in_flight == 2
+
+    scheduler.load((0, 0, 0))
+    assert not tensorstore_buffer.has_pending_loads
+    np.testing.assert_array_equal(
+        tensorstore_buffer.texture.data[:16, :4, :4],
+        tensorstore_buffer.backing_data[:16, :4, :4].read().result(),
+    )
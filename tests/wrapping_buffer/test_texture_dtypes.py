@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from funlib.geometry import Roi
+
+from sub_volume import WrappingBuffer
+from sub_volume._wrapping_buffer import segmentations_texture_dtype, texture_dtype
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.float16, np.float32])
+def test_texture_keeps_supported_dtypes(dtype):
+    assert texture_dtype(dtype) == np.dtype(dtype)
+
+
+@pytest.mark.parametrize("dtype", [np.int8, np.int32, np.uint64, np.float64])
+def test_texture_converts_other_dtypes_to_float32(dtype):
+    assert texture_dtype(dtype) == np.dtype(np.float32)
+
+
+@pytest.mark.parametrize(
+    ("dtype", "expected"),
+    [
+        (np.bool_, np.uint8),
+        (np.uint8, np.uint8),
+        (np.int16, np.uint16),
+        (np.uint32, np.uint32),
+        (np.uint64, np.uint32),
+    ],
+)
+def test_segmentations_texture_uses_narrowest_dtype(dtype, expected):
+    assert segmentations_texture_dtype(dtype) == np.dtype(expected)
+
+
+def test_load_keeps_source_dtype(chunk_size, buffer_chunks):
+    backing_data = np.arange(16**3, dtype=np.uint32).reshape((16, 16, 16)) % 256
+    backing_data = backing_data.astype(np.uint8)
+    segmentations = np.arange(16**3, dtype=np.uint8).reshape((16, 16, 16))
+    buffer = WrappingBuffer(backing_data, segmentations, buffer_chunks, chunk_size)
+
+    assert buffer.texture.data.dtype == np.uint8
+    assert buffer.segmentations_texture.data.dtype == np.uint8
+    # uint8 segmentations need an integer format so the shader sees the ids
+    assert buffer.segmentations_texture.format == "r8uint"
+
+    buffer.load_logical_roi(Roi((0, 0, 0), (16, 16, 16)))
+    np.testing.assert_array_equal(buffer.texture.data[:16, :16, :16], backing_data)
+    np.testing.assert_array_equal(
+        buffer.segmentations_texture.data[:16, :16, :16], segmentations
+    )
@@ -0,0 +1,35 @@
+import numpy as np
+from funlib.geometry import Roi
+
+from sub_volume import ChunkCache, WrappingBuffer
+
+
+def test_no_segmentations_texture_is_allocated(backing_data, buffer_chunks, chunk_size):
+    buffer = WrappingBuffer(backing_data, None, buffer_chunks, chunk_size)
+    assert not buffer.has_segmentations
+    assert buffer.segmentations_texture is None
+
+
+def test_loads_only_the_data(backing_data, buffer_chunks, chunk_size):
+    buffer = WrappingBuffer(backing_data, None, buffer_chunks, chunk_size)
+    buffer.load_logical_roi(Roi((0, 0, 0), (8, 8, 8)))
+    np.testing.assert_array_equal(
+        buffer.texture.data[0:8, 0:8, 0:8], backing_data[0:8, 0:8, 0:8]
+    )
+
+
+def test_loads_only_the_data_through_the_cache(backing_data, buffer_chunks, chunk_size):
+    buffer = WrappingBuffer(
+        backing_data,
+        None,
+        buffer_chunks,
+        chunk_size,
+        chunk_cache=ChunkCache(2**20),
+    )
+    buffer.load_logical_roi(Roi((0, 0, 0), (8, 8, 8)))
+    # the second load is served from the cache
+    buffer.load_logical_roi(Roi((20, 0, 0), (8, 8, 8)))
+    buffer.load_logical_roi(Roi((0, 0, 0), (8, 8, 8)))
+    np.testing.assert_array_equal(
+        buffer.texture.data[0:8, 0:8, 0:8], backing_data[0:8, 0:8, 0:8]
+    )